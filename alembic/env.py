@@ -29,10 +29,8 @@ from sqlmodel import SQLModel
 from pikesquares.domain.base import (
     ServiceBase,
 )
-from pikesquares.domain.runtime import (
-    AppCodebase,
-    AppRuntime,
-)
+from pikesquares.domain.python_runtime import PythonAppRuntime
+from pikesquares.domain.runtime import PythonAppCodebase
 from pikesquares.domain.device import (
     Device,
     DeviceUWSGIOption,
@@ -41,9 +39,11 @@ from pikesquares.domain.managed_services import AttachedDaemon
 from pikesquares.domain.monitors import DirMonitor, ZMQMonitor
 from pikesquares.domain.project import Project
 from pikesquares.domain.router import (
+    HttpRouter,
     TuntapDevice,
     TuntapRouter,
 )
+from pikesquares.domain.vassal_config import VassalConfig
 from pikesquares.domain.wsgi_app import WsgiApp
 
 target_metadata = SQLModel.metadata
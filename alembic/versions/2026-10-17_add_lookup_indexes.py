@@ -0,0 +1,65 @@
+import sqlmodel
+
+"""add lookup indexes
+
+indexes on the columns the repositories filter on, the composite
+(machine_id, sort_order_index) index lets the emperor read the
+uwsgi options of a machine in order without a sort.
+
+the cli creates missing tables, and on new databases their indexes,
+with SQLModel.metadata.create_all, so every index is created only if
+it does not exist yet.
+
+Revision ID: eb587388d411
+Revises:
+Create Date: 2026-10-17 10:12:41.208533
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "eb587388d411"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOOKUP_INDEXES = [
+    ("uwsgi_options", ["machine_id", "sort_order_index"]),
+    ("uwsgi_options", ["device_id", "sort_order_index"]),
+    ("projects", ["name"]),
+    ("projects", ["device_id"]),
+    ("attached_daemons", ["project_id", "name"]),
+    ("project_http_routers", ["address"]),
+    ("project_http_routers", ["project_id"]),
+    ("project_tuntap_routers", ["name"]),
+    ("project_tuntap_routers", ["ip"]),
+    ("project_tuntap_routers", ["project_id"]),
+    ("tuntap_devices", ["name"]),
+    ("tuntap_devices", ["ip"]),
+    ("tuntap_devices", ["tuntap_router_id"]),
+    ("python_wsgi_apps", ["name"]),
+    ("python_wsgi_apps", ["project_id"]),
+    ("python_wsgi_apps", ["python_app_runtime_id"]),
+    ("python_wsgi_apps", ["python_app_codebase_id"]),
+    ("python_app_runtimes", ["version"]),
+    ("python_app_codebases", ["root_dir"]),
+    ("zmq_monitors", ["transport"]),
+]
+
+
+def index_name(table_name: str, columns: list[str]) -> str:
+    return f"ix_{table_name}_{'_'.join(columns)}"
+
+
+def upgrade() -> None:
+    for table_name, columns in LOOKUP_INDEXES:
+        op.create_index(index_name(table_name, columns), table_name, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for table_name, columns in reversed(LOOKUP_INDEXES):
+        op.drop_index(index_name(table_name, columns), table_name=table_name, if_exists=True)
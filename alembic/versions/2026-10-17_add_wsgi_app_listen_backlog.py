@@ -0,0 +1,36 @@
+import sqlmodel
+
+"""add wsgi app listen backlog
+
+the listen queue size proposed by the sizing of wsgi apps.
+
+create_all does not alter existing tables, databases created after
+the column was added to the model already have it.
+
+Revision ID: e0be483cf7e3
+Revises: eb587388d411
+Create Date: 2026-10-17 11:02:17.540216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e0be483cf7e3"
+down_revision: Union[str, None] = "eb587388d411"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("python_wsgi_apps")}
+    if "listen_backlog" not in columns:
+        op.add_column("python_wsgi_apps", sa.Column("listen_backlog", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("python_wsgi_apps") as batch_op:
+        batch_op.drop_column("listen_backlog")
@@ -0,0 +1,44 @@
+import sqlmodel
+
+"""add wsgi app preload and gc threshold
+
+whether wsgi apps are loaded in the uWSGI master and frozen before the
+workers fork, and the gc thresholds of their preload hook.
+
+create_all does not alter existing tables, databases created after
+the columns were added to the model already have them. existing apps
+are not preloaded.
+
+Revision ID: b6e6e89fad4c
+Revises: 2af4617f62bc
+Create Date: 2026-10-17 11:06:30.674829
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6e6e89fad4c"
+down_revision: Union[str, None] = "2af4617f62bc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("python_wsgi_apps")}
+    if "preload" not in columns:
+        op.add_column(
+            "python_wsgi_apps",
+            sa.Column("preload", sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+    if "gc_threshold" not in columns:
+        op.add_column("python_wsgi_apps", sa.Column("gc_threshold", sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("python_wsgi_apps") as batch_op:
+        batch_op.drop_column("gc_threshold")
+        batch_op.drop_column("preload")
@@ -0,0 +1,41 @@
+import sqlmodel
+
+"""add wsgi app static and media dirs
+
+the urls and directories of the static and media files served by the
+offload threads of wsgi apps and by caddy.
+
+create_all does not alter existing tables, databases created after
+the columns were added to the model already have them.
+
+Revision ID: 2af4617f62bc
+Revises: e0be483cf7e3
+Create Date: 2026-10-17 11:04:52.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2af4617f62bc"
+down_revision: Union[str, None] = "e0be483cf7e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATIC_COLUMNS = ["static_url", "static_dir", "media_url", "media_dir"]
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("python_wsgi_apps")}
+    for name in STATIC_COLUMNS:
+        if name not in columns:
+            op.add_column("python_wsgi_apps", sa.Column(name, sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("python_wsgi_apps") as batch_op:
+        for name in reversed(STATIC_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark for uWSGI config formatting.
+
+Compares the previous JSON formatter (re-joining the comma separated
+plugin string for every plugin option) with the single pass formatter in
+`pikesquares.presets`. The device configs hold many vassal level options.
+It also times rewriting an unchanged config file against the
+skip-if-unchanged `Configuration.tofile`.
+
+    python benchmarks/bench_config_formatting.py
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from uwsgiconf.formatters import FormatterBase
+
+from pikesquares.presets import Section
+
+ROUNDS = 20
+
+
+class PreviousJSONFormatter(FormatterBase):
+    """the JSON formatter as it was before the single pass change"""
+
+    def format(self) -> str:
+        config = {}
+        for section_name, key, value in self.iter_options():
+            if section_name not in config:
+                config[section_name] = {}
+            if isinstance(key, tuple):
+                _, key = key
+            if str(key) == "plugin":
+                try:
+                    existing_plugins = config[section_name]["plugin"]
+                except KeyError:
+                    config[section_name][str(key)] = str(value).strip()
+                else:
+                    existing_plugins = existing_plugins.split(",")
+                    existing_plugins.append(str(value).strip())
+                    config[section_name][str(key)] = ",".join(existing_plugins)
+            else:
+                config[section_name][str(key)] = str(value).strip()
+        return json.dumps(config)
+
+
+def device_section(vassals: int, plugins: int) -> Section:
+    section = Section(name="uwsgi")
+    for i in range(plugins):
+        section._set("plugin", f"plugin_{i:04d}", multi=True)
+    section._set("emperor", "zmq://ipc:///var/run/pikesquares/device-zmq-monitor.sock")
+    for i in range(vassals):
+        # per vassal options, as the emperor of a large device carries them
+        section._set("emperor-on-demand-extension", f".vassal_{i:04d}.socket", multi=True)
+        section._set("env", f"VASSAL_{i:04d}=/var/lib/pikesquares/vassals/{i:04d}", multi=True)
+        section._set("route-host", f"^vassal-{i:04d}.pikesquares.dev$ goto:vassal_{i:04d}", multi=True)
+    return section
+
+
+def timeit(func) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+def bench(vassals: int, plugins: int, run_dir: Path) -> None:
+    configuration = device_section(vassals, plugins).as_configuration()
+    sections = configuration.sections
+    assert json.loads(PreviousJSONFormatter(sections).format()) == json.loads(configuration.format(formatter="json"))
+
+    filepath = run_dir / f"device-{vassals}-{plugins}.ini"
+    formatted = configuration.format()
+
+    def rewrite():
+        filepath.write_text(configuration.format())
+
+    rows = [
+        ("json, previous formatter", timeit(lambda: PreviousJSONFormatter(sections).format())),
+        ("json, single pass", timeit(lambda: configuration.format(formatter="json"))),
+        ("ini", timeit(configuration.format)),
+        ("ini, unconditional rewrite", timeit(rewrite)),
+        ("ini, tofile skipping unchanged", timeit(lambda: configuration.tofile(filepath))),
+    ]
+    print(f"{vassals} vassals, {plugins} plugins: {len(formatted) / 1024:.0f} KiB ini, {ROUNDS} rounds")
+    for label, elapsed in rows:
+        print(f"  {label:<32} {elapsed:8.2f} ms")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as run_dir:
+        for vassals, plugins in ((100, 50), (1000, 500), (2000, 2000)):
+            bench(vassals, plugins, Path(run_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the control plane database under the sqlite defaults and
+under the PRAGMA profile of `pikesquares.conf.SQLITE_PRAGMAS_PROFILE`.
+
+Provisions 200 projects with a wsgi app each, committing every row the
+way the cli does, while a second connection keeps reading the apps as
+the api does.
+
+    python benchmarks/bench_sqlite_pragmas.py
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.adapters.database import DatabaseSessionManager
+from pikesquares.conf import SQLITE_PRAGMAS_PROFILE
+from pikesquares.domain.project import Project
+from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.service_layer.uow import UnitOfWork
+
+PROJECTS = 200
+
+
+async def provision(sessionmanager: DatabaseSessionManager) -> None:
+    for i in range(PROJECTS):
+        async with sessionmanager.session() as session:
+            async with UnitOfWork(session=session) as uow:
+                project = await uow.projects.add(
+                    Project(service_id=f"project-{i:04d}", name=f"p{i:04d}", uwsgi_plugins="emperor_zeromq")
+                )
+                await uow.commit()
+                await uow.wsgi_apps.add(
+                    WsgiApp(
+                        service_id=f"wsgi-app-{i:04d}",
+                        name=f"app{i:04d}",
+                        uwsgi_plugins="tuntap",
+                        project_id=project.id,
+                        root_dir=f"/srv/app{i:04d}",
+                        wsgi_file=f"/srv/app{i:04d}/wsgi.py",
+                        wsgi_module="application",
+                        venv_dir=f"/srv/app{i:04d}/.venv",
+                    )
+                )
+                await uow.commit()
+
+
+async def read_while(sessionmanager: DatabaseSessionManager, provisioning: asyncio.Task) -> tuple[int, int]:
+    reads = errors = 0
+    while not provisioning.done():
+        try:
+            async with sessionmanager.session() as session:
+                async with UnitOfWork(session=session) as uow:
+                    await uow.wsgi_apps.list()
+            reads += 1
+        except OperationalError:
+            errors += 1
+        await asyncio.sleep(0)
+    return reads, errors
+
+
+async def bench(label: str, db_path: Path, pragmas: dict | None) -> None:
+    writer = DatabaseSessionManager(f"sqlite+aiosqlite:///{db_path}", pragmas=pragmas)
+    reader = DatabaseSessionManager(f"sqlite+aiosqlite:///{db_path}", pragmas=pragmas)
+    async with writer.connect() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    started = time.perf_counter()
+    provisioning = asyncio.create_task(provision(writer))
+    reads, errors = await read_while(reader, provisioning)
+    await provisioning
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"  {label:<10} {elapsed * 1000:8.0f} ms for {PROJECTS} projects and apps, "
+        f"{reads} concurrent reads, {errors} lock errors"
+    )
+    await writer.close()
+    await reader.close()
+
+
+async def main() -> None:
+    print(f"{PROJECTS} projects with a wsgi app each, one commit per row")
+    with tempfile.TemporaryDirectory() as data_dir:
+        await bench("defaults", Path(data_dir) / "defaults.db", None)
+        await bench("tuned", Path(data_dir) / "tuned.db", SQLITE_PRAGMAS_PROFILE)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Micro-benchmark for uWSGI stats socket decoding.
+
+Compares the previous reader (str concatenation of 4 KB chunks followed by
+json.loads + model validation) with the bytearray reader in
+`pikesquares.services.stats`, for a 1,000 vassal emperor payload and a
+500 subscription router payload.
+
+    python benchmarks/bench_stats_decoding.py
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from pikesquares.services.data import DeviceStats, RouterStats
+from pikesquares.services.stats import json_loads, read_stats_socket
+
+ROUNDS = 20
+
+
+def device_stats_payload(vassals: int = 1000) -> dict:
+    return {
+        "version": "2.0.28",
+        "pid": 1,
+        "uid": 0,
+        "gid": 0,
+        "cwd": "/",
+        "emperor": ["zmq://tcp://127.0.0.1:5250"],
+        "emperor_tyrant": 0,
+        "throttle_level": 0,
+        "blacklist": [],
+        "vassals": [
+            {
+                "id": f"project_{i:04d}.json",
+                "pid": 1000 + i,
+                "born": 1700000000,
+                "last_mod": 1700000000,
+                "last_heartbeat": 1700000100,
+                "loyal": 1700000010,
+                "ready": 1,
+                "accepting": 1,
+                "last_loyal": 1700000010,
+                "last_ready": 1700000010,
+                "last_accepting": 1700000010,
+                "first_run": 1700000000,
+                "last_run": 1700000000,
+                "cursed": 0,
+                "zerg": 0,
+                "on_demand": "",
+                "uid": 0,
+                "gid": 0,
+                "monitor": "zmq://tcp://127.0.0.1:5250",
+                "respawns": 0,
+            }
+            for i in range(vassals)
+        ],
+    }
+
+
+def router_stats_payload(subscriptions: int = 500) -> dict:
+    return {
+        "version": "2.0.28",
+        "pid": 1,
+        "uid": 0,
+        "gid": 0,
+        "cwd": "/",
+        "active_sessions": 0,
+        "http": ["0.0.0.0:8034", "127.0.0.1:5700"],
+        "cheap": 0,
+        "subscriptions": [
+            {
+                "key": f"app-{i:03d}.pikesquares.dev:8034",
+                "hash": i,
+                "hits": i * 10,
+                "sni_enabled": 0,
+                "nodes": [
+                    {
+                        "name": f"127.0.0.1:{4000 + i}",
+                        "modifier1": 0,
+                        "modifier2": 0,
+                        "last_check": 1700000000,
+                        "pid": 2000 + i,
+                        "uid": 0,
+                        "gid": 0,
+                        "requests": i * 10,
+                        "last_requests": 0,
+                        "tx": 0,
+                        "rx": 0,
+                        "cores": 1,
+                        "load": 0,
+                        "weight": 1,
+                        "wrr": 0,
+                        "ref": 0,
+                        "failcnt": 0,
+                        "death_mark": 0,
+                    }
+                ],
+            }
+            for i in range(subscriptions)
+        ],
+    }
+
+
+async def read_stats_str_concat(stats_address: Path, model):
+    """the reader as it was before the bytearray change"""
+    reader, writer = await asyncio.open_unix_connection(path=str(stats_address))
+    js = ""
+    while True:
+        data = await reader.read(4096)
+        if len(data) < 1:
+            break
+        js += data.decode("utf8", "ignore")
+    writer.close()
+    await writer.wait_closed()
+    return model(**json.loads(js))
+
+
+async def serve(stats_address: Path, payload: bytes):
+    async def handle(reader, writer):
+        writer.write(payload)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_unix_server(handle, path=str(stats_address))
+
+
+async def timeit(coro_factory) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await coro_factory()
+    return (time.perf_counter() - started) / ROUNDS * 1000
+
+
+async def bench(name: str, payload: dict, model, run_dir: Path) -> None:
+    raw = json.dumps(payload).encode()
+    stats_address = run_dir / f"{name}-stats.sock"
+    server = await serve(stats_address, raw)
+    async with server:
+        baseline = await timeit(lambda: read_stats_str_concat(stats_address, model))
+        as_dict = await timeit(lambda: read_stats_socket(stats_address))
+        as_model = await timeit(lambda: read_stats_socket(stats_address, model=model))
+
+    print(f"{name}: {len(raw) / 1024:.0f} KiB payload, {ROUNDS} rounds")
+    rows = [
+        ("str concat + json.loads + model(**js)", baseline),
+        (f"bytearray + {json_loads.__module__}.loads", as_dict),
+        ("bytearray + TypeAdapter.validate_json", as_model),
+    ]
+    for label, elapsed in rows:
+        print(f"  {label:<40} {elapsed:8.2f} ms")
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as run_dir:
+        await bench("device", device_stats_payload(), DeviceStats, Path(run_dir))
+        await bench("router", router_stats_payload(), RouterStats, Path(run_dir))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
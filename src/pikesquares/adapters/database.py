@@ -1,10 +1,13 @@
 import contextlib
+import re
 import traceback
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Iterator
 
 import structlog
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
+    AsyncEngine,
     async_sessionmaker,
     create_async_engine,
 )
@@ -18,13 +21,97 @@ from sqlmodel.ext.asyncio.session import AsyncSession as SQLModelAsyncSession
 
 logger = structlog.get_logger()
 
+PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+PRAGMA_VALUE = re.compile(r"^(-?\d+|[A-Za-z_]+)$")
+
+
+def pragma_statements(pragmas: dict[str, str | int]) -> list[str]:
+    """`PRAGMA name = value` statements, names and values are checked as they can not be bound"""
+    statements = []
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"invalid sqlite pragma {name}={value}")
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+def set_sqlite_pragmas(engine: AsyncEngine, pragmas: dict[str, str | int]) -> None:
+    """run `pragmas` on every new connection of the engine"""
+    statements = pragma_statements(pragmas)
+    if not statements:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+class QueryCounter:
+    """statements run on an engine while the counter is entered"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.statements: list[str] = []
+        self.parameters: list[Any] = []
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self.before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self.before_cursor_execute)
+
+
+@contextlib.contextmanager
+def assert_query_count(engine: AsyncEngine, expected: int) -> Iterator[QueryCounter]:
+    """pin the number of statements a block runs, for tests of handlers and repositories"""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count != expected:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"expected {expected} statements, {counter.count} were run:\n{statements}")
+
+
+async def explain_query_plan(conn: AsyncConnection, statement: str, parameters: Any = ()) -> list[str]:
+    """
+    the sqlite `EXPLAIN QUERY PLAN` of a statement, one line per step,
+    indented under its parent step
+    """
+    rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+    depths = {0: -1}
+    plan = []
+    for step_id, parent_id, _, detail in rows:
+        depths[step_id] = depths.get(parent_id, -1) + 1
+        plan.append(f"{'  ' * depths[step_id]}{detail}")
+    return plan
+
 
 class DatabaseSessionManager:
-    def __init__(self, host: str, engine_kwargs: dict[str, Any] = {}):
+    def __init__(
+        self,
+        host: str,
+        engine_kwargs: dict[str, Any] = {},
+        pragmas: dict[str, str | int] | None = None,
+    ):
         connect_args = {"check_same_thread": False}
         self._engine = create_async_engine(
             host, connect_args=connect_args, **engine_kwargs
         )
+        if pragmas and self._engine.dialect.name == "sqlite":
+            set_sqlite_pragmas(self._engine, pragmas)
         self._sessionmaker = async_sessionmaker(
             autocommit=False,
             bind=self._engine,
@@ -1,12 +1,19 @@
 # import logging
+import inspect
+import typing
 from abc import ABC, abstractmethod
 from typing import Generic, NewType, Sequence, TypeVar
 
+import pydantic
 import structlog
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import and_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import SelectOfScalar
 
+from pikesquares.adapters.database import QueryCounter, explain_query_plan
 from pikesquares.domain.base import ServiceBase
 from pikesquares.domain.device import Device, DeviceUWSGIOption
 from pikesquares.domain.managed_services import AttachedDaemon
@@ -20,6 +27,7 @@ from pikesquares.domain.router import (
     TuntapRouter,
 )
 from pikesquares.domain.runtime import PythonAppCodebase
+from pikesquares.domain.vassal_config import VassalConfig
 from pikesquares.domain.wsgi_app import WsgiApp
 
 # logger = logging.getLogger("uvicorn.error")
@@ -30,15 +38,31 @@ logger = structlog.get_logger()
 
 T = TypeVar("T", bound=ServiceBase)
 
+
+def project_topology(project) -> list[ExecutableOption]:
+    """
+    joined loads of the project behind the `project` relationship,
+    with its zmq monitor and routers
+
+    a project has a router or two of each kind, joining them keeps the
+    whole graph in the one SELECT of the service.
+    """
+    return [
+        joinedload(project).joinedload(Project.zmq_monitor),
+        joinedload(project).joinedload(Project.http_routers),
+        joinedload(project).joinedload(Project.tuntap_routers),
+    ]
+
 class GenericRepository(Generic[T], ABC):
     """Generic base repository."""
 
     @abstractmethod
-    async def get_by_id(self, id: str) -> T | None:
+    async def get_by_id(self, id: str, *options: ExecutableOption) -> T | None:
         """Get a single record by id.
 
         Args:
             id (str): Record id.
+            *options (ExecutableOption): Loader options, e.g. selectinload/joinedload.
 
         Returns:
             T | None: Record or none.
@@ -46,11 +70,12 @@ class GenericRepository(Generic[T], ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def get_by_service_id(self, service_id: str) -> T | None:
+    async def get_by_service_id(self, service_id: str, *options: ExecutableOption) -> T | None:
         """Get a single record by service_id.
 
         Args:
             service_id (str): Record service_id.
+            *options (ExecutableOption): Loader options, e.g. selectinload/joinedload.
 
         Returns:
             T | None: Record or none.
@@ -58,10 +83,11 @@ class GenericRepository(Generic[T], ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def list(self, **filters) -> list[T]:
+    async def list(self, *options: ExecutableOption, **filters) -> list[T]:
         """Gets a list of records
 
         Args:
+            *options (ExecutableOption): Loader options, e.g. selectinload/joinedload.
             **filters: Filter conditions, several criteria are linked with a logical 'and'.
 
          Raises:
@@ -119,35 +145,41 @@ class GenericSqlRepository(GenericRepository[T], ABC):
         self._session = session
         self._model_cls = model_cls
 
-    def _construct_get_stmt(self, id: str) -> SelectOfScalar:
+    def _construct_get_stmt(self, id: str, *options: ExecutableOption) -> SelectOfScalar:
         """Creates a SELECT query for retrieving a single record.
 
         Args:
             id (str):  Record id.
+            *options (ExecutableOption): Loader options.
 
         Returns:
             SelectOfScalar: SELECT statement.
         """
         stmt = select(self._model_cls).where(self._model_cls.id == id)
+        if options:
+            stmt = stmt.options(*options)
         return stmt
 
-    async def get_by_id(self, id: str) -> T | None:
-        stmt = self._construct_get_stmt(id)
+    async def get_by_id(self, id: str, *options: ExecutableOption) -> T | None:
+        stmt = self._construct_get_stmt(id, *options)
         results = await self._session.exec(stmt)
         if results:
-            obj = results.one_or_none()
+            # joined eager loads of collections repeat the parent row
+            obj = results.unique().one_or_none()
             return obj
 
-    async def get_by_service_id(self, service_id: str) -> T | None:
+    async def get_by_service_id(self, service_id: str, *options: ExecutableOption) -> T | None:
         stmt = select(self._model_cls).\
             where(self._model_cls.service_id == service_id)
+        if options:
+            stmt = stmt.options(*options)
         results = await self._session.exec(stmt)
         if results:
-            obj = results.one_or_none()
+            obj = results.unique().one_or_none()
             logger.debug(f"sql repo: retrieved by service_id {obj}")
             return obj
 
-    def _construct_list_stmt(self, **filters) -> SelectOfScalar:
+    def _construct_list_stmt(self, *options: ExecutableOption, **filters) -> SelectOfScalar:
         """Creates a SELECT query for retrieving a multiple records.
 
         Raises:
@@ -167,12 +199,14 @@ class GenericSqlRepository(GenericRepository[T], ABC):
             stmt = stmt.where(where_clauses[0])
         elif len(where_clauses) > 1:
             stmt = stmt.where(and_(*where_clauses))
+        if options:
+            stmt = stmt.options(*options)
         return stmt
 
-    async def list(self, **filters) -> list[T]:
-        stmt = self._construct_list_stmt(**filters)
+    async def list(self, *options: ExecutableOption, **filters) -> list[T]:
+        stmt = self._construct_list_stmt(*options, **filters)
         results = await self._session.exec(stmt)
-        return results.all()
+        return results.unique().all()
 
     async def add(self, record: T) -> T:
         self._session.add(record)
@@ -216,7 +250,9 @@ class DeviceRepository(GenericSqlRepository[Device], DeviceReposityBase):
 class DeviceUWSGIOptionsReposityBase(GenericRepository[DeviceUWSGIOption], ABC):
     """uwsgi options repository."""
 
-    pass
+    @abstractmethod
+    async def sync(self, machine_id: str, uwsgi_options: list[DeviceUWSGIOption]) -> tuple[int, int, int]:
+        raise NotImplementedError()
 
 
 class DeviceUWSGIOptionsRepository(GenericSqlRepository[DeviceUWSGIOption], DeviceUWSGIOptionsReposityBase):
@@ -233,6 +269,71 @@ class DeviceUWSGIOptionsRepository(GenericSqlRepository[DeviceUWSGIOption], Devi
         if results:
             return results.all()
 
+    async def sync(self, machine_id: str, uwsgi_options: list[DeviceUWSGIOption]) -> tuple[int, int, int]:
+        """Replaces the stored options of a machine with `uwsgi_options`.
+
+        Rows are matched by position in sort order, only the rows that
+        differ are written, each kind of change as a single executemany
+        in the current transaction. The options are not added to the
+        session.
+
+        Args:
+            machine_id (str): Machine the options belong to.
+            uwsgi_options (list[DeviceUWSGIOption]): Options in emperor order.
+
+        Returns:
+            tuple[int, int, int]: Inserted, updated and deleted row counts.
+        """
+        table = DeviceUWSGIOption.__table__
+        stmt = (
+            select(table.c.id, table.c.option_key, table.c.option_value, table.c.sort_order_index)
+            .where(table.c.machine_id == machine_id)
+            .order_by(table.c.sort_order_index)
+        )
+        stored = (await self._session.exec(stmt)).all()
+
+        inserts, updates = [], []
+        for sort_order_index, uwsgi_option in enumerate(uwsgi_options):
+            if sort_order_index >= len(stored):
+                inserts.append(
+                    uwsgi_option.model_dump() | {"machine_id": machine_id, "sort_order_index": sort_order_index}
+                )
+                continue
+            row = stored[sort_order_index]
+            # rows stored with gaps or duplicates in their sort order are renumbered too
+            if (row.option_key, row.option_value, row.sort_order_index) != (
+                uwsgi_option.option_key,
+                uwsgi_option.option_value,
+                sort_order_index,
+            ):
+                updates.append({
+                    "row_id": row.id,
+                    "option_key": uwsgi_option.option_key,
+                    "option_value": uwsgi_option.option_value,
+                    "sort_order_index": sort_order_index,
+                })
+        deletes = [row.id for row in stored[len(uwsgi_options):]]
+
+        if deletes:
+            await self._session.exec(delete(table).where(table.c.id.in_(deletes)))
+        if updates:
+            await self._session.exec(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(
+                    option_key=bindparam("option_key"),
+                    option_value=bindparam("option_value"),
+                    sort_order_index=bindparam("sort_order_index"),
+                ),
+                params=updates,
+            )
+        if inserts:
+            await self._session.exec(insert(table), params=inserts)
+        logger.info(
+            f"uwsgi options of {machine_id}: {len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted"
+        )
+        return len(inserts), len(updates), len(deletes)
+
 
     """Project repository."""
 class ProjectReposityBase(GenericRepository[Project], ABC):
@@ -241,6 +342,10 @@ class ProjectReposityBase(GenericRepository[Project], ABC):
     async def get_by_name(self, name: str) -> Project | None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_project_with_topology(self, service_id: str) -> Project | None:
+        raise NotImplementedError()
+
     async def get_by_device_id(self, device_id: str) -> Sequence[Project] | None:
         raise NotImplementedError()
 
@@ -261,6 +366,17 @@ class ProjectRepository(GenericSqlRepository[Project], ProjectReposityBase):
         if results:
             return results.all()
 
+    async def get_project_with_topology(self, service_id: str) -> Project | None:
+        """project with its device, zmq monitors, routers and attached daemons in one SELECT"""
+        return await self.get_by_service_id(
+            service_id,
+            joinedload(Project.device).joinedload(Device.zmq_monitor),
+            joinedload(Project.zmq_monitor),
+            joinedload(Project.http_routers),
+            joinedload(Project.tuntap_routers),
+            joinedload(Project.attached_daemons),
+        )
+
 
 class HttpRouterRepositoryBase(GenericRepository[HttpRouter], ABC):
     """Router repository."""
@@ -277,6 +393,10 @@ class HttpRouterRepositoryBase(GenericRepository[HttpRouter], ABC):
     async def get_by_address(self, address: str) -> HttpRouter | None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_http_router_with_topology(self, service_id: str) -> HttpRouter | None:
+        raise NotImplementedError()
+
 
 class HttpRouterRepository(GenericSqlRepository[HttpRouter], HttpRouterRepositoryBase):
     def __init__(self, session: AsyncSession) -> None:
@@ -302,6 +422,10 @@ class HttpRouterRepository(GenericSqlRepository[HttpRouter], HttpRouterRepositor
             obj = results.first()
             return obj
 
+    async def get_http_router_with_topology(self, service_id: str) -> HttpRouter | None:
+        """http router with its project, the project zmq monitor and routers in one SELECT"""
+        return await self.get_by_service_id(service_id, *project_topology(HttpRouter.project))
+
 
 
 class WsgiAppReposityBase(GenericRepository[WsgiApp], ABC):
@@ -311,6 +435,10 @@ class WsgiAppReposityBase(GenericRepository[WsgiApp], ABC):
     async def get_by_name(self, name: str) -> WsgiApp | None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_wsgi_app_with_topology(self, service_id: str) -> WsgiApp | None:
+        raise NotImplementedError()
+
 
 class WsgiAppRepository(GenericSqlRepository[WsgiApp], WsgiAppReposityBase):
     def __init__(self, session: AsyncSession) -> None:
@@ -329,6 +457,14 @@ class WsgiAppRepository(GenericSqlRepository[WsgiApp], WsgiAppReposityBase):
         if results:
             return results.all()
 
+    async def get_wsgi_app_with_topology(self, service_id: str) -> WsgiApp | None:
+        """wsgi app with its codebase, project, the project zmq monitor and routers in one SELECT"""
+        return await self.get_by_service_id(
+            service_id,
+            joinedload(WsgiApp.python_app_codebase),
+            *project_topology(WsgiApp.project),
+        )
+
 
 class ZMQMonitorRepositoryBase(GenericRepository[ZMQMonitor], ABC):
     """ZMQMonitor repository."""
@@ -475,6 +611,10 @@ class AttachedDaemonRepositoryBase(GenericRepository[AttachedDaemon], ABC):
     async def for_project_by_name(self, name: str, project_id: str) -> Sequence[AttachedDaemon] | None:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_attached_daemon_with_topology(self, service_id: str) -> AttachedDaemon | None:
+        raise NotImplementedError()
+
 
 class AttachedDaemonRepository(GenericSqlRepository[AttachedDaemon], AttachedDaemonRepositoryBase):
     def __init__(self, session: AsyncSession) -> None:
@@ -488,6 +628,10 @@ class AttachedDaemonRepository(GenericSqlRepository[AttachedDaemon], AttachedDae
         results = await self._session.exec(stmt)
         return results.all()
 
+    async def get_attached_daemon_with_topology(self, service_id: str) -> AttachedDaemon | None:
+        """attached daemon with its project, the project zmq monitor and routers in one SELECT"""
+        return await self.get_by_service_id(service_id, *project_topology(AttachedDaemon.project))
+
 
 class PythonAppRuntimeRepositoryBase(GenericRepository[PythonAppRuntime], ABC):
     """PythonAppRuntime repository."""
@@ -530,3 +674,114 @@ class PythonAppCodebaseRepository(GenericSqlRepository[PythonAppCodebase], Pytho
         if results:
             obj = results.first()
             return obj
+
+
+class VassalConfigRepositoryBase(GenericRepository[VassalConfig], ABC):
+    """VassalConfig repository."""
+
+    @abstractmethod
+    async def changed(self, service_id: str, config_hash: str) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def record(self, service_id: str, config_hash: str) -> VassalConfig:
+        raise NotImplementedError()
+
+
+class VassalConfigRepository(GenericSqlRepository[VassalConfig], VassalConfigRepositoryBase):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, VassalConfig)
+
+    async def changed(self, service_id: str, config_hash: str) -> bool:
+        """whether config_hash differs from the one last pushed for service_id"""
+        vassal_config = await self.get_by_service_id(service_id)
+        return vassal_config is None or vassal_config.config_hash != config_hash
+
+    async def record(self, service_id: str, config_hash: str) -> VassalConfig:
+        vassal_config = await self.get_by_service_id(service_id)
+        if vassal_config is None:
+            return await self.add(VassalConfig(service_id=service_id, config_hash=config_hash))
+        vassal_config.config_hash = config_hash
+        return await self.update(vassal_config)
+
+
+SQL_REPOSITORIES: list[type[GenericSqlRepository]] = [
+    DeviceRepository,
+    DeviceUWSGIOptionsRepository,
+    ProjectRepository,
+    HttpRouterRepository,
+    WsgiAppRepository,
+    ZMQMonitorRepository,
+    TuntapRouterRepository,
+    TuntapDeviceRepository,
+    AttachedDaemonRepository,
+    PythonAppRuntimeRepository,
+    PythonAppCodebaseRepository,
+    VassalConfigRepository,
+]
+
+# methods that write a record passed in, their statements are not lookups
+WRITE_METHODS = {"add", "update", "delete", "record"}
+
+
+class QueryPlan(pydantic.BaseModel):
+    """sqlite query plan of a statement run by a repository method"""
+
+    query: str
+    statement: str
+    plan: list[str]
+
+
+def placeholder_args(method) -> list:
+    """an argument for each positional parameter of a repository method"""
+    args = []
+    for parameter in inspect.signature(method).parameters.values():
+        if parameter.kind is not inspect.Parameter.POSITIONAL_OR_KEYWORD:
+            continue
+        annotation = typing.get_origin(parameter.annotation) or parameter.annotation
+        args.append([] if annotation is list else "explain")
+    return args
+
+
+async def explain_repository_queries(session: AsyncSession) -> list[QueryPlan]:
+    """
+    run every lookup of the sql repositories with placeholder arguments
+    and explain the statements they run
+
+    nothing matches the placeholders, `sync` of the uwsgi options only
+    reads, and the transaction is rolled back.
+    """
+    query_plans = []
+    try:
+        for repository_cls in SQL_REPOSITORIES:
+            repository = repository_cls(session)
+            for name, method in inspect.getmembers(repository, inspect.iscoroutinefunction):
+                if name.startswith("_") or name in WRITE_METHODS:
+                    continue
+                if name == "get_by_service_id" and not hasattr(repository._model_cls, "service_id"):
+                    continue
+                with QueryCounter(session.bind) as counter:
+                    try:
+                        await method(*placeholder_args(method))
+                    except AttributeError as exc:
+                        # a lookup on a column the model does not have
+                        query_plans.append(
+                            QueryPlan(
+                                query=f"{repository_cls.__name__}.{name}",
+                                statement="",
+                                plan=[f"not runnable: {exc!r}"],
+                            )
+                        )
+                        continue
+                conn = await session.connection()
+                for statement, parameters in zip(counter.statements, counter.parameters):
+                    query_plans.append(
+                        QueryPlan(
+                            query=f"{repository_cls.__name__}.{name}",
+                            statement=statement,
+                            plan=await explain_query_plan(conn, statement, parameters),
+                        )
+                    )
+    finally:
+        await session.rollback()
+    return query_plans
@@ -0,0 +1,107 @@
+import asyncio
+from collections import OrderedDict
+
+import structlog
+import zmq
+import zmq.asyncio
+
+from pikesquares import services
+
+logger = structlog.get_logger()
+
+# ms queued messages are given to reach the emperor when a socket is closed
+DEFAULT_LINGER_MS = 1000
+# ms a send waits on a full queue before giving up
+DEFAULT_SEND_TIMEOUT_MS = 5000
+DEFAULT_MAX_SOCKETS = 64
+
+
+class ZMQSocketPool:
+    """
+    One zmq context and a connected PUSH socket per emperor monitor address.
+
+    Sockets are created on first use and reused afterwards, the least
+    recently used one is closed once there are `max_sockets`. asyncio
+    sockets belong to the event loop they were created in, a socket from
+    another loop is replaced.
+    """
+
+    def __init__(
+        self,
+        context: zmq.asyncio.Context | None = None,
+        linger_ms: int = DEFAULT_LINGER_MS,
+        send_timeout_ms: int = DEFAULT_SEND_TIMEOUT_MS,
+        max_sockets: int = DEFAULT_MAX_SOCKETS,
+    ):
+        self.context = context or zmq.asyncio.Context()
+        self.linger_ms = linger_ms
+        self.send_timeout_ms = send_timeout_ms
+        self.max_sockets = max_sockets
+        self.sockets: OrderedDict[str, tuple[asyncio.AbstractEventLoop, zmq.asyncio.Socket]] = OrderedDict()
+
+    def socket(self, address: str) -> zmq.asyncio.Socket:
+        loop = asyncio.get_running_loop()
+        if address in self.sockets:
+            socket_loop, sock = self.sockets[address]
+            if socket_loop is loop and not sock.closed:
+                self.sockets.move_to_end(address)
+                return sock
+            self._close_socket(address)
+
+        while len(self.sockets) >= self.max_sockets:
+            self._close_socket(next(iter(self.sockets)))
+
+        sock = self.context.socket(zmq.PUSH)
+        sock.setsockopt(zmq.LINGER, self.linger_ms)
+        sock.setsockopt(zmq.SNDTIMEO, self.send_timeout_ms)
+        sock.connect(address)
+        self.sockets[address] = (loop, sock)
+        logger.debug(f"connected zmq PUSH socket to {address}")
+        return sock
+
+    async def send_multipart(self, address: str, frames: list[bytes]) -> None:
+        try:
+            await self.socket(address).send_multipart(frames)
+        except zmq.ZMQError:
+            self._close_socket(address)
+            raise
+
+    def _close_socket(self, address: str) -> None:
+        _, sock = self.sockets.pop(address)
+        sock.close(linger=self.linger_ms)
+
+    def close(self) -> None:
+        """close every socket, queued messages get `linger_ms` to go out"""
+        for address in list(self.sockets):
+            self._close_socket(address)
+        if not self.context.closed:
+            self.context.term()
+
+
+_socket_pool: ZMQSocketPool | None = None
+
+
+def get_socket_pool() -> ZMQSocketPool:
+    """the process wide socket pool"""
+    global _socket_pool
+    if _socket_pool is None or _socket_pool.context.closed:
+        _socket_pool = ZMQSocketPool()
+    return _socket_pool
+
+
+def close_socket_pool() -> None:
+    global _socket_pool
+    if _socket_pool is not None:
+        _socket_pool.close()
+        _socket_pool = None
+
+
+async def register_zmq_pool(context: dict) -> None:
+    pool = get_socket_pool()
+    services.register_value(context, zmq.asyncio.Context, pool.context)
+    services.register_value(
+        context,
+        ZMQSocketPool,
+        pool,
+        on_registry_close=close_socket_pool,
+    )
@@ -2,6 +2,8 @@ from fastapi import APIRouter
 
 from pikesquares.app.api.routes.services import (
     devices,
+    metrics,
+    routers,
     # items,
     # login,
     # private,
@@ -14,6 +16,8 @@ from pikesquares.conf import APISettings
 api_router = APIRouter()
 
 api_router.include_router(devices.router)
+api_router.include_router(metrics.router)
+api_router.include_router(routers.router)
 # api_router.include_router(login.router)
 # api_router.include_router(users.router)
 # api_router.include_router(utils.router)
@@ -67,6 +67,3 @@ async def update_device(
 
     async with UnitOfWork(session=session) as uow:
         device = await uow.devices.get_by_machine_id(machine_id)
-
-
-)
\ No newline at end of file
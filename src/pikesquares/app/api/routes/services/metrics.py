@@ -0,0 +1,55 @@
+import structlog
+import svcs
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from svcs.fastapi import DepContainer
+
+from pikesquares.presets.cache import RenderCacheStats, render_cache
+from pikesquares.services.metrics_history import HistoryAggregate, MetricsHistory
+from pikesquares.services.openmetrics import CONTENT_TYPE, MetricsExporter
+
+logger = structlog.getLogger()
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(
+        services: DepContainer,
+    ) -> PlainTextResponse:
+    """
+    OpenMetrics exposition of the last background stats collection.
+    """
+    exporter = await services.aget(MetricsExporter)
+    return PlainTextResponse(exporter.rendered, media_type=CONTENT_TYPE)
+
+
+@router.get("/metrics/history/{service_id}/{metric}", response_model=HistoryAggregate)
+async def metrics_history(
+        service_id: str,
+        metric: str,
+        services: DepContainer,
+        window: float = 86400,
+        worker_id: str | None = None,
+    ):
+    """
+    Aggregate and percentiles of a metric over the last `window` seconds,
+    read from the metrics history rollups.
+    """
+    try:
+        history = await services.aget(MetricsHistory)
+    except svcs.exceptions.ServiceNotFoundError:
+        raise HTTPException(status_code=404, detail="Metrics history is disabled") from None
+    aggregate = await history.aggregate(service_id, metric, window, worker_id=worker_id)
+    if not aggregate:
+        raise HTTPException(status_code=404, detail="No history for this metric")
+    return aggregate
+
+
+@router.get("/metrics/render-cache", response_model=RenderCacheStats)
+async def metrics_render_cache():
+    """
+    Hits, misses and entries of the uWSGI config render cache.
+    """
+    return render_cache.stats()
@@ -0,0 +1,38 @@
+import structlog
+from fastapi import APIRouter, HTTPException
+from svcs.fastapi import DepContainer
+
+from pikesquares.services.router_analytics import HOT_KEYS_LIMIT, KeyReport, RouterAnalytics, RouterReport
+
+logger = structlog.getLogger()
+
+
+router = APIRouter(prefix="/routers", tags=["services"])
+
+
+@router.get("/analytics", response_model=list[RouterReport])
+async def routers_analytics(
+        services: DepContainer,
+    ):
+    """
+    Request rates, load skew and failing nodes of every HTTP router,
+    since the previous background stats collection.
+    """
+    analytics = await services.aget(RouterAnalytics)
+    return list(analytics.reports.values())
+
+
+@router.get("/{service_id}/hot-keys", response_model=list[KeyReport])
+async def router_hot_keys(
+        service_id: str,
+        services: DepContainer,
+        limit: int = HOT_KEYS_LIMIT,
+    ):
+    """
+    Busiest subscription keys of an HTTP router.
+    """
+    analytics = await services.aget(RouterAnalytics)
+    report = analytics.reports.get(service_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Router not found")
+    return report.hot_keys(limit)
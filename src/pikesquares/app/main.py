@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from collections.abc import AsyncGenerator
 
@@ -15,8 +16,16 @@ from asgi_lifespan import LifespanManager
 from pikesquares.app.api.main import api_router
 from pikesquares.adapters.database import DatabaseSessionManager
 from pikesquares.conf import  settings
-
-# from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.domain.base import ServiceBase
+from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.services.autoscaler import Autoscaler
+from pikesquares.services.metrics import MetricsStore
+from pikesquares.services.metrics_history import MetricsHistory
+from pikesquares.services.openmetrics import MetricsExporter
+from pikesquares.services.overload import OverloadDetector
+from pikesquares.services.recycling import MiB, RecyclePolicy, RecyclingController
+from pikesquares.services.router_analytics import RouterAnalytics
+from pikesquares.services.stats import FleetStats, StatsCollector, stats_cache
 
 # logger = logging.getLogger("uvicorn.error")
 # logger.setLevel(logging.DEBUG)
@@ -33,7 +42,7 @@ if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
 sessionmanager = DatabaseSessionManager(
-    settings.SQLALCHEMY_DATABASE_URI, {"echo": True}
+    settings.SQLALCHEMY_DATABASE_URI, {"echo": True}, pragmas=settings.SQLITE_PRAGMAS
 )
 
 
@@ -42,6 +51,17 @@ async def get_session() -> AsyncSession:
         return session
 
 
+async def collect_device_stats(collector: StatsCollector) -> FleetStats | None:
+    machine_id = await ServiceBase.read_machine_id()
+    async with sessionmanager.session() as session:
+        async with UnitOfWork(session=session) as uow:
+            device = await uow.devices.get_by_machine_id(machine_id)
+            if not device:
+                logger.warning(f"unable to locate device by machine id {machine_id}")
+                return None
+            return await collector.collect_device(device, uow)
+
+
 @svcs.fastapi.lifespan
 async def lifespan(
         app: FastAPI,
@@ -52,6 +72,64 @@ async def lifespan(
 
     registry.register_factory(AsyncSession, get_session)
 
+    router_analytics = RouterAnalytics()
+    registry.register_value(RouterAnalytics, router_analytics)
+    overload_detector = OverloadDetector(threshold=settings.LISTEN_QUEUE_SATURATION)
+    registry.register_value(OverloadDetector, overload_detector)
+    metrics_store = MetricsStore(
+        capacity=settings.METRICS_CAPACITY,
+        max_series=settings.METRICS_MAX_SERIES,
+    )
+    registry.register_value(MetricsStore, metrics_store)
+    on_refresh = [
+        router_analytics.update_fleet,
+        overload_detector.observe_fleet,
+        metrics_store.record_fleet_stats,
+    ]
+
+    background_tasks = []
+    metrics_history = None
+    if settings.METRICS_HISTORY_ENABLED:
+        metrics_history = await MetricsHistory(
+            settings.metrics_db_path,
+            retention=settings.METRICS_HISTORY_RETENTION,
+        ).open()
+        registry.register_value(MetricsHistory, metrics_history)
+        on_refresh.append(metrics_history.record_fleet_stats)
+        background_tasks.append(
+            asyncio.create_task(metrics_history.run(settings.METRICS_HISTORY_INTERVAL))
+        )
+
+    if settings.WORKER_RECYCLING_ENABLED:
+        recycling_controller = RecyclingController(
+            RecyclePolicy(
+                rss_budget=settings.WORKER_RSS_BUDGET * MiB,
+                rss_growth=settings.WORKER_RSS_GROWTH * MiB,
+                cooldown=settings.WORKER_RECYCLE_COOLDOWN,
+            )
+        )
+        registry.register_value(RecyclingController, recycling_controller)
+        on_refresh.append(recycling_controller.observe_fleet)
+
+    if settings.AUTOSCALE_ENABLED:
+        autoscaler = Autoscaler(device_max_workers=settings.AUTOSCALE_DEVICE_MAX_WORKERS)
+        registry.register_value(Autoscaler, autoscaler)
+        on_refresh.append(autoscaler.observe_fleet)
+
+    stats_cache.ttl = settings.STATS_CACHE_TTL
+    metrics_exporter = MetricsExporter(
+        StatsCollector(
+            max_concurrency=settings.STATS_MAX_CONCURRENCY,
+            timeout=settings.STATS_TIMEOUT,
+            cache=stats_cache,
+        ),
+        collect_device_stats,
+        interval=settings.METRICS_REFRESH_INTERVAL,
+        on_refresh=on_refresh,
+    )
+    registry.register_value(MetricsExporter, metrics_exporter)
+    background_tasks.append(asyncio.create_task(metrics_exporter.run()))
+
     # async def uow_factory():
     #    async with UnitOfWork(session=session) as uow:
     #        yield uow
@@ -60,6 +138,11 @@ async def lifespan(
     yield {"your": "other", "initial": "state"}
 
     logger.debug("Shutting down!")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    if metrics_history:
+        await metrics_history.close()
 
 
 app = FastAPI(
@@ -115,8 +198,12 @@ async def healthy(
             code = 500
     """
 
+    # apps whose listen queue is close to full or dropping connections
+    overload_detector = await services.aget(OverloadDetector)
+
     return JSONResponse(
-        content={"ok": ok, "failing": failing}, status_code=code
+        content={"ok": ok, "failing": failing, "saturated": overload_detector.saturated_apps},
+        status_code=code,
     )
 
 
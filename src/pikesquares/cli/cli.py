@@ -1,4 +1,3 @@
-import asyncio
 import atexit
 import grp
 import logging
@@ -22,6 +21,7 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 
 from pikesquares import __app_name__, __version__, services
 from pikesquares.adapters.database import DatabaseSessionManager
+from pikesquares.adapters.zmq_pool import register_zmq_pool
 from pikesquares.conf import (
     AppConfig,
     AppConfigError,
@@ -50,6 +50,21 @@ from pikesquares.service_layer.handlers.routers import http_router_up
 from pikesquares.service_layer.handlers.runtimes import provision_app_codebase, provision_python_app_runtime
 from pikesquares.service_layer.handlers.wsgi_app import provision_wsgi_app, wsgi_app_up
 from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.services.metrics import register_metrics_store
+from pikesquares.services.metrics_history import MetricsHistory, register_metrics_history
+from pikesquares.services.launches import register_vassal_launches
+from pikesquares.services.readiness import register_readiness
+from pikesquares.services.router_analytics import register_router_analytics
+from pikesquares.services.retry import (
+    PROCESS_COMPOSE_PING_POLICY,
+    deadline_budget,
+    retry_call,
+)
+from pikesquares.services.stats import (
+    StatsCollector,
+    register_stats_cache,
+    register_stats_collector,
+)
 
 from .console import console
 
@@ -145,7 +160,8 @@ def run_async(func):
 
 
 @app.command(rich_help_panel="Control", short_help="Reset device")
-def reset(
+@run_async
+async def reset(
     ctx: typer.Context,
     shutdown: str | None = typer.Option("", "--shutdown", help="Shutdown PikeSquares server after reset."),
 ):
@@ -166,7 +182,7 @@ def reset(
 
     if all(
         [
-            device.get_service_status() == "running",
+            await device.is_running(),
             shutdown or questionary.confirm("Shutdown PikeSquares Server").ask(),
         ]
     ):
@@ -447,6 +463,7 @@ async def info(
 async def up(
     ctx: typer.Context,
     # foreground: Annotated[bool, typer.Option(help="Run in foreground.")] = True
+    force: bool = typer.Option(False, "--force", help="Push vassal configs even when unchanged, reloading running vassals."),
 ):
     """Launch PikeSquares Server"""
 
@@ -475,25 +492,26 @@ async def up(
     #######################
     # process-compose processes
     #    caddy, dnsmasq, device, api
-    try:
+    # a single budget for all processes, a process that is slow to start
+    # leaves less time for the ones after it
+    with deadline_budget(PROCESS_COMPOSE_PING_POLICY.deadline):
         for name, process, messages in zip(
             process_compose.config.processes.keys(),
             process_compose.config.processes.values(),
             process_compose.config.custom_messages.values(),
             strict=True,
         ):
+            console.success(f"{messages.title_start} {process.description}")
             try:
-                console.success(f"{messages.title_start} {process.description}")
-                process_stats = await process_compose.ping_api(name)
-                if process_stats.is_running and process_stats.status == "Running":
-                    console.success(f":heavy_check_mark:     {process.description}... Launched!")
-                else:
-                    console.warning(f":heavy_exclamation_mark:     {process.description} unable to launch.")
-            except PCAPIUnavailableError:
-                await asyncio.sleep(1)
-                continue
-    except (StopIteration, IndexError):
-        pass
+                await retry_call(
+                    PROCESS_COMPOSE_PING_POLICY,
+                    process_compose.ping_api,
+                    name,
+                    until=lambda stats: stats.is_running and stats.status == "Running",
+                )
+                console.success(f":heavy_check_mark:     {process.description}... Launched!")
+            except (tenacity.RetryError, PCAPIUnavailableError):
+                console.warning(f":heavy_exclamation_mark:     {process.description} unable to launch.")
 
     #######################
     # emperor zeromq monitors
@@ -504,13 +522,29 @@ async def up(
         console.error(f"cli up: unable to locate device by machine id {machine_id}")
         raise typer.Exit(code=0) from None
 
+    stats_collector = await services.aget(context, StatsCollector)
     async with uow:
+        fleet_stats = await stats_collector.collect_device(device, uow)
+        if conf.METRICS_HISTORY_ENABLED:
+            metrics_history = await services.aget(context, MetricsHistory)
+            metrics_history.record_fleet_stats(fleet_stats)
+            await metrics_history.maintain()
+            await metrics_history.close()
         projects = await device.awaitable_attrs.projects
         for project in projects:
             try:
-                if await project_up(project) or \
-                    not await project.read_stats():
-                    console.success(f":heavy_check_mark:     Launched project [{project.name}]. Done!")
+                # a running project with an unchanged config is left alone
+                running = fleet_stats.is_running(project.service_id)
+                if await project_up(
+                    project,
+                    project.awaitable_attrs.tuntap_routers,
+                    uow,
+                    force=force,
+                ):
+                    if running:
+                        console.success(f":heavy_check_mark:     Project [{project.name}] is running.")
+                    else:
+                        console.success(f":heavy_check_mark:     Launched project [{project.name}]. Done!")
                     #await process_compose.add_tail_log_process(project.name, project.log_file)
             except tenacity.RetryError:
                     console.warning(f"Project {project.name} has not launched. Giving up.")
@@ -522,11 +556,13 @@ async def up(
 
             project_http_routers = await project.awaitable_attrs.http_routers
             for http_router in project_http_routers:
-                http_router_up_result = await http_router_up(uow, http_router)
-                if http_router_up_result:
+                running = fleet_stats.is_running(http_router.service_id)
+                http_router_up_result = await http_router_up(uow, http_router, force=force)
+                if http_router_up_result and not running:
                     console.success(":heavy_check_mark:     Launching http router.. Done!")
                     console.success(":heavy_check_mark:     Launching http router subscription server.. Done!")
                     #await process_compose.add_tail_log_process(http_router.service_id, http_router.log_file)
+        await uow.commit()
 
     console.success()
     console.success("PikeSquares API is available at: http://127.0.0.1:9000")
@@ -593,13 +629,14 @@ def tail_service_log(
     #     console.info(line)
 
 
-from .commands import apps, devices, managed_services, projects, routers
+from .commands import apps, db, devices, managed_services, projects, routers
 
 app.add_typer(apps.app, name="apps")
 app.add_typer(routers.app, name="routers")
 app.add_typer(projects.app, name="projects")
 app.add_typer(devices.app, name="devices")
 app.add_typer(managed_services.app, name="services")
+app.add_typer(db.app, name="db")
 
 
 def _version_callback(value: bool) -> None:
@@ -717,7 +754,17 @@ async def main(
         console.error("invalid config. giving up.")
         raise typer.Abort() from None
 
+    await register_stats_cache(context)
+    await register_stats_collector(context)
+    await register_metrics_store(context)
+    await register_readiness(context)
+    await register_vassal_launches(context)
+    await register_router_analytics(context)
+    await register_zmq_pool(context)
+
     conf = services.get(context, AppConfig)
+    if conf.METRICS_HISTORY_ENABLED:
+        await register_metrics_history(context)
 
     if conf.SENTRY_DSN:
         sentry_sdk.init(
@@ -732,7 +779,8 @@ async def main(
 
     sessionmanager = DatabaseSessionManager(
         conf.SQLALCHEMY_DATABASE_URI,
-        {"echo": False}
+        {"echo": False},
+        pragmas=conf.SQLITE_PRAGMAS,
     )
 
     async def get_session() -> AsyncSession:
@@ -824,10 +872,8 @@ async def main(
                     raise typer.Exit(1)
                 logger.info(f"created device zmq_monitor @ {zmq_monitor.socket_address}")
 
-            uwsgi_options = await device.awaitable_attrs.uwsgi_options
-            if not uwsgi_options:
-                for uwsgi_option in await device.get_uwsgi_options():
-                    await uow.uwsgi_options.add(uwsgi_option)
+            # the emperor reads these rows at every start, only what changed is written
+            await uow.uwsgi_options.sync(device.machine_id, await device.get_uwsgi_options())
 
         except Exception as exc:
             logger.exception(exc)
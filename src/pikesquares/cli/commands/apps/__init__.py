@@ -1,6 +1,6 @@
+import asyncio
 import shutil
 import tempfile
-import time
 import traceback
 from enum import Enum
 from glob import glob
@@ -39,10 +39,17 @@ from pikesquares.cli.console import (
 from pikesquares import services
 from pikesquares.cli.cli import run_async
 from pikesquares.conf import AppConfig
+from pikesquares.domain.base import ServiceBase
 from pikesquares.domain.project import Project
 from pikesquares.domain.router import HttpRouter
 from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.service_layer.handlers.wsgi_app import apply_sizing, size_wsgi_apps, wsgi_app_up
+from pikesquares.service_layer.uow import UnitOfWork
 from pikesquares.services.data import Router, WsgiAppOptions
+from pikesquares.services.overload import OverloadDetector
+from pikesquares.services.preload import read_app_memory
+from pikesquares.services.sizing import MiB
+from pikesquares.services.stats import StatsCollector
 
 from ...console import console
 from .utils import (
@@ -85,7 +92,8 @@ def detect(
 
 @app.command(short_help="Create new app\nAliases: [i] create, new")
 @app.command()
-def create(
+@run_async
+async def create(
     ctx: typer.Context,
     project: Optional[str] = typer.Option("", "--in", "--in-project", help="Name or id of project to add new app"),
     name: Annotated[str, typer.Option("--name", "-n", help="app name")] = "",
@@ -277,7 +285,7 @@ def create(
     with console.status(f"`{app_name}` is starting...", spinner="earth"):
         wsgi_app.up()
         for _ in range(10):
-            if wsgi_app.get_service_status() == "running":
+            if await wsgi_app.get_service_status() == "running":
                 for router in routers:
                     url = console.render_link(
                         f"{router.app_name}.pikesquares.dev",
@@ -286,7 +294,7 @@ def create(
                     )
                     console.success(f"🚀 App is available at {url}")
                 raise typer.Exit()
-            time.sleep(3)
+            await asyncio.sleep(3)
 
         console.warning(f"could not start app [{app_name}]. giving up.")
         # wsgi_app.service_config.unlink()
@@ -744,10 +752,19 @@ async def ls(
     ctx: typer.Context,
     project: str = typer.Argument("", help="Project name"),
     show_id: bool = False,
+    interval: float = typer.Option(
+        1.0,
+        "--interval",
+        "-i",
+        help="seconds between the two stats samples, 0 ignores dropped connections",
+    ),
 ):
     """
     Show all apps in specific project
 
+    An app is flagged saturated when its listen queue is nearly full or
+    connections were dropped between the two stats samples.
+
     Aliases:[i] apps, app list
     """
     context = ctx.ensure_object(dict)
@@ -756,28 +773,131 @@ async def ls(
 
     conf = await services.aget(context, AppConfig)
     uow = await services.aget(context, UnitOfWork)
-    device = context.get("device")
-    if not device:
-        console.error("unable to locate device in app context")
-        raise typer.Exit(code=0) from None
+    stats_collector = await services.aget(context, StatsCollector)
 
     async with uow:
-        attached_daemons = await uow.attached_daemons.list()
-        for daemon in attached_daemons:
-            try:
-                daemon_stats_available  = bool(daemon.__class__.read_stats(daemon.stats_address))
-            except StatsReadError:
-                daemon_stats_available = False
+        machine_id = await ServiceBase.read_machine_id()
+        device = await uow.devices.get_by_machine_id(machine_id)
+        if not device:
+            console.error(f"unable to locate device by machine id {machine_id}")
+            raise typer.Exit(code=0) from None
+
+        fleet_stats = await stats_collector.collect_device(device, uow)
+        overload_detector = OverloadDetector(threshold=conf.LISTEN_QUEUE_SATURATION)
+        overload_detector.observe_fleet(fleet_stats)
+        if interval > 0:
+            # listen_queue_errors only tells about dropped connections as a delta
+            await asyncio.sleep(interval)
+            if stats_collector.cache:
+                stats_collector.cache.invalidate()
+            fleet_stats = await stats_collector.collect_device(device, uow)
+            overload_detector.observe_fleet(fleet_stats)
+
+        for wsgi_app in await uow.wsgi_apps.list():
+            console.info(
+                f"""{wsgi_app.name} | \
+{wsgi_app.service_id} | \
+{'running' if fleet_stats.is_running(wsgi_app.service_id) else 'stopped'}\
+{' | saturated' if overload_detector.saturated(wsgi_app.service_id) else ''}"""
+            )
 
+        for daemon in await uow.attached_daemons.list():
             console.info(
                 f"""{daemon.name} | \
 {daemon.service_id} | \
-{'Stats Up' if daemon_stats_available else 'Stats Down'} | \
-{Path(daemon.pid_file).read_text()}
-                """
+{'Stats Up' if fleet_stats.is_running(daemon.service_id) else 'Stats Down'}\
+{' | saturated' if overload_detector.saturated(daemon.service_id) else ''}"""
             )
 
 
+@app.command(short_help="Propose workers, threads and listen backlog for every app")
+@run_async
+async def tune(
+    ctx: typer.Context,
+    apply: bool = typer.Option(False, "--apply", help="Save the proposals and reload the running apps"),
+):
+    """
+    Size workers, threads and listen backlog of every app
+
+    Splits the cores and memory of the device between its apps by their
+    busy time, per worker rss and average response time.
+    """
+    context = ctx.ensure_object(dict)
+
+    uow = await services.aget(context, UnitOfWork)
+    stats_collector = await services.aget(context, StatsCollector)
+
+    async with uow:
+        wsgi_apps = await uow.wsgi_apps.list()
+        if not wsgi_apps:
+            console.info("no apps to tune")
+            raise typer.Exit(code=0) from None
+
+        sizing = await size_wsgi_apps(wsgi_apps, stats_collector)
+        for wsgi_app in wsgi_apps:
+            proposed = sizing[wsgi_app.service_id]
+            console.info(
+                f"""{wsgi_app.name} | \
+{wsgi_app.service_id} | \
+workers {wsgi_app.workers} -> {proposed.workers} | \
+threads {wsgi_app.threads} -> {proposed.threads} | \
+listen {wsgi_app.listen_backlog or 'default'} -> {proposed.listen_backlog}"""
+            )
+
+        if not apply:
+            return
+
+        for wsgi_app in wsgi_apps:
+            if not apply_sizing(wsgi_app, sizing[wsgi_app.service_id]):
+                continue
+            await uow.wsgi_apps.update(wsgi_app)
+            # the changed config reloads a running app, stopped apps pick it up on the next up
+            if await wsgi_app.is_running():
+                await wsgi_app_up(wsgi_app, uow, console)
+        await uow.commit()
+        console.success(":heavy_check_mark:     Applied app sizing. Done!")
+
+
+@app.command(short_help="Show shared and private memory of the workers of every app")
+@run_async
+async def memory(
+    ctx: typer.Context,
+):
+    """
+    Show shared and private memory of the workers of every app
+
+    Read from /proc/<pid>/smaps_rollup. Preloaded apps share most of
+    their pages with the master.
+    """
+    context = ctx.ensure_object(dict)
+
+    uow = await services.aget(context, UnitOfWork)
+    stats_collector = await services.aget(context, StatsCollector)
+
+    async with uow:
+        wsgi_apps = await uow.wsgi_apps.list()
+        fleet_stats = await stats_collector.collect(wsgi_apps)
+
+        for wsgi_app in wsgi_apps:
+            app_stats = fleet_stats.wsgi_apps.get(wsgi_app.service_id)
+            if not app_stats:
+                console.info(f"{wsgi_app.name} | {wsgi_app.service_id} | stopped")
+                continue
+            app_memory = read_app_memory(app_stats)
+            console.info(
+                f"""{wsgi_app.name} | \
+{wsgi_app.service_id} | \
+{'preloaded' if wsgi_app.preload else 'not preloaded'} | \
+shared {app_memory.shared / MiB:.1f} MiB | \
+private {app_memory.private / MiB:.1f} MiB | \
+pss {app_memory.pss / MiB:.1f} MiB"""
+            )
+            for worker in app_memory.workers:
+                console.info(
+                    f"    worker {worker.pid} | rss {worker.rss / MiB:.1f} MiB | "
+                    f"shared {worker.shared / MiB:.1f} MiB | private {worker.private / MiB:.1f} MiB"
+                )
+
 
 @app.command(short_help="Show all apps in specific project.\nAliases:[i] apps, app list")
 @app.command()
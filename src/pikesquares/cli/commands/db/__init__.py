@@ -0,0 +1,41 @@
+from typing import Annotated
+
+import structlog
+import typer
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from pikesquares import services
+from pikesquares.adapters.repositories import explain_repository_queries
+from pikesquares.cli.cli import run_async
+from pikesquares.cli.console import console
+
+logger = structlog.get_logger()
+
+app = typer.Typer()
+
+
+@app.command(short_help="Show the sqlite query plan of every repository query")
+@run_async
+async def explain(
+    ctx: typer.Context,
+    sql: Annotated[bool, typer.Option(help="Show the SQL of each statement.")] = False,
+):
+    """
+    Show the sqlite query plan of every repository query
+
+    Lookups are run with placeholder arguments in a transaction that is
+    rolled back. A SCAN step reads the whole table, only `list` is
+    expected to need one.
+    """
+    context = ctx.ensure_object(dict)
+    session = await services.aget(context, AsyncSession)
+
+    for query_plan in await explain_repository_queries(session):
+        console.info(query_plan.query)
+        if sql:
+            console.info(f"    {query_plan.statement}")
+        for step in query_plan.plan:
+            if step.lstrip().startswith("SCAN") and not query_plan.query.endswith(".list"):
+                console.warning(f"    {step}")
+            else:
+                console.info(f"    {step}")
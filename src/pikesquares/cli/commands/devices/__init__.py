@@ -4,6 +4,7 @@ import typer
 import questionary
 import structlog
 
+from pikesquares.cli.cli import run_async
 from pikesquares.cli.console import console
 from pikesquares import services
 from pikesquares.domain.base import StatsReadError
@@ -16,7 +17,8 @@ app = typer.Typer()
 
 @app.command(short_help="Launch the PikeSquares Server (if stopped)")
 @app.command()
-def up(
+@run_async
+async def up(
     ctx: typer.Context,
     # foreground: Annotated[bool, typer.Option(help="Run in foreground.")] = True
 ):
@@ -24,10 +26,10 @@ def up(
     context = ctx.ensure_object(dict)
     # client_conf = services.get(context, conf.ClientConfig)
     device = services.get(context, Device)
-    if device.get_service_status() == "running":
+    if await device.is_running():
         console.info("Looks like a PikeSquares Server is already running")
         if questionary.confirm("Stop the running PikeSquares Server and launch a new instance?").ask():
-            device.stop()
+            await device.stop()
             console.success("PikeSquares Server has been shut down.")
         else:
             raise typer.Exit()
@@ -35,7 +37,8 @@ def up(
 
 
 @app.command(rich_help_panel="Control", short_help="Stop the PikeSquares Server (if running)")
-def down(
+@run_async
+async def down(
     ctx: typer.Context,
     noinput: Annotated[bool, typer.Option(help="Do not prompt.")] = False
 ):
@@ -45,11 +48,11 @@ def down(
     obj["cli-style"] = console.custom_style_dope
 
     svc_device = services.get(obj, Device)
-    if svc_device.get_service_status() == "running":
+    if await svc_device.is_running():
         if noinput:
-            svc_device.stop()
+            await svc_device.stop()
         elif questionary.confirm("Stop the running PikeSquares Server?").ask():
-            svc_device.stop()
+            await svc_device.stop()
             console.success("PikeSquares Server has been shut down.")
         else:
             raise typer.Exit()
@@ -5,7 +5,6 @@ import structlog
 import questionary
 import typer
 from pluggy import PluginManager
-import tenacity
 
 from pikesquares import services
 from pikesquares.cli.cli import run_async
@@ -103,13 +102,7 @@ async def list_(ctx: typer.Context):
                 console.success(f"Appears there are no managed services in project {project.name} [{project.service_id}].")
                 raise typer.Exit(0) from None
 
-            async def check_vassal_state(daemon: AttachedDaemon) -> str:
-                try:
-                    if bool(await daemon.read_stats()):
-                        return "running"
-                except tenacity.RetryError:
-                    pass
-                return "stopped"
+            vassal_states = await AttachedDaemon.get_services_status(attached_daemons)
 
             #plugin_manager = await services.aget(context, PluginManager)
             for attached_daemon in attached_daemons:
@@ -134,7 +127,7 @@ async def list_(ctx: typer.Context):
                     plugin_manager.register(plugin_instance)
 
                 """
-                vassal_state = "running" #await check_vassal_state(attached_daemon)
+                vassal_state = vassal_states[attached_daemon.service_id]
                 if vassal_state == "running":
                     daemon_ping = True #plugin_manager.hook.ping()
                 else:
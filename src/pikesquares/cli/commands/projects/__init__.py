@@ -6,7 +6,6 @@ import apluggy as pluggy
 import questionary
 import randomname
 import structlog
-import tenacity
 import typer
 
 # from pikesquares import (
@@ -29,7 +28,7 @@ from pikesquares.service_layer.handlers.routers import http_router_up
 from pikesquares.service_layer.handlers.attached_daemon import attached_daemon_up
 
 from pikesquares.service_layer.uow import UnitOfWork
-from pikesquares.services.data import DeviceStats
+from pikesquares.services.stats import StatsCollector
 
 #, NameValidator
 
@@ -300,37 +299,27 @@ async def list_(ctx: typer.Context, show_id: bool = False):
     #device_zmq_monitor = await uow.zmq_monitors.get_by_device_id(device.id)
     #zmq_monitor = await uow.zmq_monitors.get_by_project_id(project.id)
 
-    projects = await uow.projects.list()
-    if not len(projects):
-        console.warning("No projects were initialized, nothing to show!")
-        raise typer.Exit()
+        projects = await uow.projects.list()
+        if not len(projects):
+            console.warning("No projects were initialized, nothing to show!")
+            raise typer.Exit()
 
-    projects_out = []
-    try:
-        stats = await device.read_stats()
-        device_stats = DeviceStats(**stats)
-    except tenacity.RetryError:
-        console.error(f"Unable to read stats for device [{device.machine_id}]")
-        raise typer.Exit(0) from None
+        stats_collector = await services.aget(context, StatsCollector)
+        fleet_stats = await stats_collector.collect_device(device, uow)
 
-    if not device_stats:
-        console.warning("unable to lookup device stats")
+    if not fleet_stats.device:
+        console.error(f"Unable to read stats for device [{device.machine_id}]")
         raise typer.Exit(0) from None
 
+    projects_out = []
     for project in projects:
-        try:
-            vassal_stats = next(
-                filter(lambda v: v.id.split(".ini")[0], device_stats.vassals)
-            )
-            projects_out.append(
-                {
-                    "name": project.name,
-                    "status": "running" if vassal_stats else "stopped",
-                    "id": project.service_id,
-                }
-            )
-        except StopIteration:
-            continue
+        projects_out.append(
+            {
+                "name": project.name,
+                "status": "running" if fleet_stats.is_running(project.service_id) else "stopped",
+                "id": project.service_id,
+            }
+        )
 
     console.print_response(projects_out, title=f"Projects count: {len(projects)}", show_id=show_id)
 
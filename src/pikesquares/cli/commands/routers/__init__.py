@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 
 # from cuid import cuid
@@ -17,6 +18,8 @@ from pikesquares.domain import project
 from pikesquares.exceptions import StatsReadError
 from pikesquares.service_layer.handlers.monitors import destroy_instance
 from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.services.router_analytics import HOT_KEYS_LIMIT, RouterAnalytics
+from pikesquares.services.stats import StatsCollector
 
 # from tests.unit_tests.service_layer_tests.conftest import project
 
@@ -71,19 +74,22 @@ async def list_(
     context = ctx.ensure_object(dict)
     conf = await services.aget(context, AppConfig)
     uow = await services.aget(context, UnitOfWork)
-    device = context.get("device")
+    stats_collector = await services.aget(context, StatsCollector)
 
-    tuntap_routers = await uow.tuntap_routers.list()
+    async with uow:
+        tuntap_routers = await uow.tuntap_routers.list()
     if not len(tuntap_routers):
         console.warning("No Routers were initialized, nothing to show!")
         raise typer.Exit()
 
+    fleet_stats = await stats_collector.collect(tuntap_routers)
+
     routers_out = []
     for router in tuntap_routers:
         routers_out.append(
             {
                 "name": router.name,
-                "status": "status",  # router.get_service_status( Path(conf.run_dir) / router.get('service_id') + "-stats.sock",) or "Unknown",
+                "status": "running" if fleet_stats.is_running(router.service_id) else "stopped",
                 "id": router.service_id,
             }
         )
@@ -107,6 +113,53 @@ async def list_(
     """
 
 
+@app.command(short_help="Show the busiest subscription keys of HTTP routers.")
+@run_async
+async def top(
+    ctx: typer.Context,
+    interval: Annotated[float, typer.Option("--interval", "-i", help="seconds between the two stats samples")] = 2.0,
+    limit: Annotated[int, typer.Option("--limit", "-n", help="number of keys to show per router")] = HOT_KEYS_LIMIT,
+):
+    """
+    Request rates, load skew and failing nodes of HTTP router subscriptions
+    """
+
+    context = ctx.ensure_object(dict)
+    uow = await services.aget(context, UnitOfWork)
+    stats_collector = await services.aget(context, StatsCollector)
+    router_analytics = await services.aget(context, RouterAnalytics)
+
+    async with uow:
+        http_routers = await uow.http_routers.list()
+    if not len(http_routers):
+        console.warning("No HTTP Routers were initialized, nothing to show!")
+        raise typer.Exit()
+
+    router_analytics.update_fleet(await stats_collector.collect(http_routers))
+    await asyncio.sleep(interval)
+    if stats_collector.cache:
+        stats_collector.cache.invalidate()
+    reports = router_analytics.update_fleet(await stats_collector.collect(http_routers))
+    if not reports:
+        console.warning("No HTTP Routers are running, nothing to show!")
+        raise typer.Exit()
+
+    for service_id, report in reports.items():
+        keys_out = []
+        for key in report.hot_keys(limit):
+            keys_out.append(
+                {
+                    "key": key.key,
+                    "hits/s": f"{key.hits_rate:.1f}",
+                    "requests/s": f"{key.requests_rate:.1f}",
+                    "nodes": len(key.nodes),
+                    "imbalance": f"{key.imbalance:.1f}" if key.imbalance is not None else "-",
+                    "failing": ", ".join(node.name for node in key.failing_nodes) or "-",
+                }
+            )
+        console.print_response(keys_out, title=f"HTTP Router {service_id} hot keys")
+
+
 @app.command("stop", hidden=True)
 @app.command(short_help="Stop router\nAliases:[i] stop")
 @run_async
@@ -33,6 +33,22 @@ from pikesquares.services import register_factory
 logger = structlog.get_logger()
 
 
+# run on every new connection to the control plane db, shared by the cli,
+# the api and the sqlite3 plugin of the emperor
+SQLITE_PRAGMAS_PROFILE: dict[str, str | int] = {
+    # readers do not block the writer and the other way round
+    "journal_mode": "WAL",
+    # durable at checkpoints, safe with WAL
+    "synchronous": "NORMAL",
+    # ms to wait on a locked db instead of failing with "database is locked"
+    "busy_timeout": 10000,
+    "mmap_size": 256 * 1024 * 1024,
+    # KiB when negative
+    "cache_size": -16000,
+    "temp_store": "MEMORY",
+}
+
+
 class AppConfigError(Exception):
     pass
 
@@ -75,6 +91,38 @@ class APISettings(BaseSettings):
         return [str(origin).rstrip("/") for origin in self.BACKEND_CORS_ORIGINS] + [self.FRONTEND_HOST]
 
     PROJECT_NAME: str = "PikeSquares API"
+    # the data dir of the cli, AppConfig.data_dir
+    data_dir: Path = pydantic.Field(default=Path("/var/lib/pikesquares"), alias="PIKESQUARES_DATA_DIR")
+    # seconds between stats collections served by /metrics
+    METRICS_REFRESH_INTERVAL: float = 10.0
+    # stats sockets read at once, seconds per socket and seconds a read is reused
+    STATS_MAX_CONCURRENCY: int = 32
+    STATS_TIMEOUT: float = 1.0
+    STATS_CACHE_TTL: float = 2.0
+    # samples kept per metrics series and max number of series
+    METRICS_CAPACITY: int = 360
+    METRICS_MAX_SERIES: int = 10_000
+    METRICS_HISTORY_ENABLED: bool = False
+    # seconds of history kept per rollup resolution, key 0 are the raw samples
+    METRICS_HISTORY_RETENTION: dict[int, int] = {}
+    # seconds between metrics history flushes and rollups
+    METRICS_HISTORY_INTERVAL: float = 60.0
+    # reload the workers of wsgi apps whose rss is over budget or keeps growing
+    WORKER_RECYCLING_ENABLED: bool = False
+    # MiB per worker
+    WORKER_RSS_BUDGET: int = 512
+    # MiB per hour
+    WORKER_RSS_GROWTH: int = 64
+    # seconds between two reloads of the same app
+    WORKER_RECYCLE_COOLDOWN: float = 600.0
+    # grow and shrink the workers of wsgi apps in cheaper mode
+    AUTOSCALE_ENABLED: bool = False
+    # workers of all apps together, defaults to twice the cpu count
+    AUTOSCALE_DEVICE_MAX_WORKERS: int | None = None
+    # listen queue fill, of max_queue, at which an app is reported saturated
+    LISTEN_QUEUE_SATURATION: float = 0.8
+    # {} keeps the sqlite defaults
+    SQLITE_PRAGMAS: dict[str, str | int] = SQLITE_PRAGMAS_PROFILE
     SENTRY_DSN: pydantic.HttpUrl | None = None
     # POSTGRES_SERVER: str
     # POSTGRES_PORT: int = 5432
@@ -97,11 +145,15 @@ class APISettings(BaseSettings):
     @pydantic.computed_field  # type: ignore[prop-decorator]
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
-        path_to_db = ensure_system_path(Path("/var/lib/pikesquares") / "pikesquares.db", is_dir=False)
-        return f"sqlite+aiosqlite:///{path_to_db}"
+        return f"sqlite+aiosqlite:///{self.db_path}"
 
-        db_path: Path = ensure_system_path(self.data_dir / "pikesquares.db")
-        return f"sqlite+aiosqlite:///{db_path}"
+    @property
+    def db_path(self) -> Path:
+        return ensure_system_path(self.data_dir / "pikesquares.db", is_dir=False)
+
+    @property
+    def metrics_db_path(self) -> Path:
+        return ensure_system_path(self.db_path.with_name("metrics.db"), is_dir=False)
 
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
@@ -259,6 +311,21 @@ class AppConfig(BaseSettings):
     API_ENABLED: bool = True
     DEVICE_ENABLED: bool = True
 
+    STATS_MAX_CONCURRENCY: int = 32
+    STATS_TIMEOUT: float = 1.0
+    STATS_CACHE_TTL: float = 2.0
+    # samples kept per metrics series and max number of series
+    METRICS_CAPACITY: int = 360
+    METRICS_MAX_SERIES: int = 10_000
+    # persistent metrics history in a sqlite file next to the control plane db
+    METRICS_HISTORY_ENABLED: bool = False
+    # seconds of history kept per rollup resolution, key 0 are the raw samples
+    METRICS_HISTORY_RETENTION: dict[int, int] = {}
+    # listen queue fill, of max_queue, at which an app is reported saturated
+    LISTEN_QUEUE_SATURATION: float = 0.8
+    # {} keeps the sqlite defaults
+    SQLITE_PRAGMAS: dict[str, str | int] = SQLITE_PRAGMAS_PROFILE
+
     # CADDY_DIR: Optional[str] = None
     # CLI_STYLE: QuestionaryStyle
 
@@ -279,6 +346,10 @@ class AppConfig(BaseSettings):
     def db_path(self) -> Path:
         return ensure_system_path(self.data_dir / "pikesquares.db", is_dir=False)
 
+    @property
+    def metrics_db_path(self) -> Path:
+        return ensure_system_path(self.db_path.with_name("metrics.db"), is_dir=False)
+
     @property
     def caddy_config_path(self) -> Path:
         return ensure_system_path(self.config_dir / "caddy.json", is_dir=False)
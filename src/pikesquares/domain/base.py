@@ -17,6 +17,7 @@ import structlog
 from aiopath import AsyncPath
 from sqlalchemy import (
     DateTime,
+    event,
     func,
 )
 from sqlalchemy.ext.asyncio import AsyncAttrs
@@ -26,6 +27,16 @@ from pikesquares.exceptions import (
     ServiceUnavailableError,
     StatsReadError,
 )
+from pikesquares.presets.cache import render_cache
+from pikesquares.services.liveness import (
+    DEFAULT_TIMEOUT_MS,
+    probe,
+    probe_many,
+    service_status,
+)
+from pikesquares.services.master_fifo import write_master_fifo
+from pikesquares.services.retry import STATS_READ_POLICY, retry
+from pikesquares.services.stats import read_stats_socket
 
 logger = structlog.getLogger()
 
@@ -160,44 +171,33 @@ class ServiceBase(AsyncAttrs, TimeStampedBase):
         section = self.uwsgi_config_section_class(self)
         return section.as_configuration()
 
+    def render_uwsgi_config(self, formatter: str = "ini") -> str:
+        """
+        the formatted uwsgi config of the preset section, served from the
+        render cache while the model is unchanged
+        """
+        return render_cache.render(self, formatter=formatter)
+
     @classmethod
     async def read_machine_id(cls) -> str:
         machine_id = await AsyncPath("/var/lib/dbus/machine-id").read_text(encoding="utf-8")
         return machine_id.strip()
 
 
-    @tenacity.retry(
-        retry=tenacity.retry_if_exception_type((
-            StatsReadError,
-            ConnectionRefusedError,
-            IOError,
-            FileNotFoundError,
-        )),
-        wait=tenacity.wait_fixed(1),
-        stop=tenacity.stop_after_attempt(3),
-        reraise=False,
-    )
-    async def read_stats(self) -> dict | None:
+    @retry(STATS_READ_POLICY)
+    async def read_stats(self, model: type[pydantic.BaseModel] | None = None):
         """
         read from uWSGI Stats Server socket
+
+        a missing or refused socket is raised right away, other errors are
+        retried with backoff and end in tenacity.RetryError.
+
+        pass one of the `services.data` stats models to get a validated
+        instance instead of a dict.
         """
-        writer = None
         logger.debug(f"reading stats from {self.stats_address}")
         try:
-            js = ""
-            reader, writer = await asyncio.open_unix_connection(
-                path=AsyncPath(self.stats_address),
-            )
-            while True:
-                data = await reader.read(4096)
-                if len(data) < 1:
-                    break
-                js += data.decode("utf8", "ignore")
-            try:
-                return json.loads(js)
-            except json.JSONDecodeError:
-                logger.error(traceback.format_exc())
-                logger.debug(js)
+            return await read_stats_socket(self.stats_address, model=model)
         except ConnectionRefusedError as e:
             raise e
         except FileNotFoundError as e:
@@ -211,12 +211,8 @@ class ServiceBase(AsyncAttrs, TimeStampedBase):
             if not isinstance(exc, tenacity.RetryError):
                 logger.exception(exc)
             raise exc
-        finally:
-            if writer:
-                writer.close()
-                await writer.wait_closed()
 
-    def write_master_fifo(self, command: str) -> None:
+    def write_master_fifo(self, command: str) -> bool:
         """
         Write command to master fifo named pipe
 
@@ -242,38 +238,39 @@ class ServiceBase(AsyncAttrs, TimeStampedBase):
         'w' - gracefully reload workers
         """
 
-        if command not in {"r", "q", "s"}:
-            logger.warning(f"unknown master fifo command '{command}'")
-            return
-
-        if not all(
-            [
-                self.master_fifo_file,
-                self.master_fifo_file.exists(),
-            ]
-        ):
-            logger.warning(f"invalid fifo file @ {self.master_fifo_file}")
-            return
-
-        with open(str(self.master_fifo_file), "w") as master_fifo:
-            master_fifo.write(command)
-            logger.info(f"[pikesquares-services] : sent command [{command}] to master fifo")
-
-    def ping_stats(self) -> bool:
-        if not self.get_service_status() == "running":
+        return write_master_fifo(self.master_fifo_file, command)
+
+    async def is_running(self, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> bool:
+        """
+        connect-only probe of the stats socket
+        """
+        return await probe(self.stats_address, timeout_ms)
+
+    async def ping_stats(self) -> bool:
+        if not await self.is_running():
             raise ServiceUnavailableError()
         return True
 
-    def get_service_status(self) -> str | None:
+    async def get_service_status(self) -> str:
         """
-        read stats socket
+        "running" if the stats socket accepts connections, "stopped" otherwise
         """
-        if self.stats_address.exists() and self.stats_address.is_socket():
-            try:
-                if self.read_stats():
-                    return "running"
-            except StatsReadError:
-                return "stopped"
+        return service_status(await self.is_running())
+
+    @classmethod
+    async def get_services_status(
+        cls,
+        services: list["ServiceBase"],
+        timeout_ms: int = DEFAULT_TIMEOUT_MS,
+    ) -> dict[str, str]:
+        """
+        probe many services in parallel, service_id -> status
+        """
+        alive = await probe_many(
+            {service.service_id: service.stats_address for service in services},
+            timeout_ms,
+        )
+        return {service_id: service_status(is_alive) for service_id, is_alive in alive.items()}
 
     def startup_log(self, show_config_start_marker: str, show_config_end_marker: str) -> tuple[list, list]:
         """
@@ -289,6 +286,12 @@ class ServiceBase(AsyncAttrs, TimeStampedBase):
         return latest_running_config, latest_startup_log
 
 
+@event.listens_for(ServiceBase, "after_update", propagate=True)
+@event.listens_for(ServiceBase, "after_delete", propagate=True)
+def invalidate_rendered_config(mapper, connection, target: ServiceBase) -> None:
+    render_cache.invalidate(target.service_id)
+
+
 async def main():
 
     class StatsTest(pydantic.BaseModel):
@@ -103,6 +103,25 @@ class CaddyConfig(pydantic.BaseModel):
     storage: dict = {"module": "file_system", "root": "/var/lib/pikesquares/caddy"}
 
 
+def static_file_routes(wsgi_app) -> list[dict]:
+    """file_server routes for the static map of a wsgi app, ahead of the reverse proxy"""
+    routes = []
+    for mountpoint, directory in wsgi_app.static_map.items():
+        routes.append({
+            "@id": f"{wsgi_app.service_id}-static-{mountpoint.strip('/').replace('/', '-')}",
+            "match": [{
+                "host": [f"{wsgi_app.name}.pikesquares.dev"],
+                "path": [f"{mountpoint}*"],
+            }],
+            "handle": [
+                {"handler": "rewrite", "strip_path_prefix": mountpoint.rstrip("/")},
+                {"handler": "file_server", "root": directory},
+            ],
+            "terminal": True,
+        })
+    return routes
+
+
 def caddy_close():
     pass
     #logger.debug("caddy closed")
@@ -145,6 +164,8 @@ async def register_caddy_process(context: dict) -> None:
             #          [0]["dial" ] = "{http_router.address}"
             #
             routes = []
+            for wsgi_app in await uow.wsgi_apps.list():
+                routes.extend(static_file_routes(wsgi_app))
             for router in routers:
                 routes.append({
                     "@id": router.service_id,
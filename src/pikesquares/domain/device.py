@@ -16,6 +16,7 @@ from sqlmodel import (
 )
 
 #from sqlalchemy import event
+from sqlalchemy import Index
 
 from pikesquares.presets.device import DeviceSection
 from pikesquares import services
@@ -80,15 +81,16 @@ class Device(ServiceBase, DevicePKIMixin, table=True):
                 spawn_asap=True,
                 stats_address=str(self.stats_address),
             )
-            for key, value in section._get_options():
-                uwsgi_option = DeviceUWSGIOption(
-                    option_key=key.key,
-                    option_value=str(value).strip(),
-                    device=self,
-                    machine_id=self.machine_id,
+            for sort_order_index, (key, value) in enumerate(section._get_options()):
+                uwsgi_options.append(
+                    DeviceUWSGIOption(
+                        option_key=key.key,
+                        option_value=str(value).strip(),
+                        device_id=self.id,
+                        machine_id=self.machine_id,
+                        sort_order_index=sort_order_index,
+                    )
                 )
-                uwsgi_options.append(uwsgi_option)
-                uwsgi_option.sort_order_index = uwsgi_options.index(uwsgi_option)
             return uwsgi_options
 
         except Exception as exc:
@@ -111,8 +113,8 @@ class Device(ServiceBase, DevicePKIMixin, table=True):
 
         pyuwsgi.run(["--json", f"{str(self.service_config.resolve())}"])
 
-    def stop(self):
-        if self.get_service_status() == "running":
+    async def stop(self):
+        if await self.is_running():
             self.write_master_fifo("q")
 
         # res = device_config.main_process.actions.fifo_write(target, command)
@@ -185,6 +187,11 @@ class Device(ServiceBase, DevicePKIMixin, table=True):
 class DeviceUWSGIOption(TimeStampedBase, SQLModel, table=True):
 
     __tablename__ = "uwsgi_options"
+    __table_args__ = (
+        # the emperor reads the options of a machine in sort order
+        Index("ix_uwsgi_options_machine_id_sort_order_index", "machine_id", "sort_order_index"),
+        Index("ix_uwsgi_options_device_id_sort_order_index", "device_id", "sort_order_index"),
+    )
 
     id: str = Field(
         primary_key=True,
@@ -6,6 +6,7 @@ import pydantic
 import structlog
 from plumbum import ProcessExecutionError
 from plumbum import local as pl_local
+from sqlalchemy import Index
 from sqlmodel import (
     Field,
     Relationship,
@@ -165,6 +166,9 @@ class AttachedDaemon(ServiceBase, table=True):
     """uWSGI Attached Daemons model class."""
 
     __tablename__ = "attached_daemons"
+    __table_args__ = (
+        Index("ix_attached_daemons_project_id_name", "project_id", "name"),
+    )
 
     name: str = Field(max_length=32)
     for_legion: bool = Field(default=False)
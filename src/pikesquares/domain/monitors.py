@@ -6,8 +6,6 @@ import structlog
 
 # from pathlib import Path
 # from typing import Any
-import zmq
-import zmq.asyncio
 
 # from sqlalchemy_utils import ChoiceType
 from sqlmodel import (
@@ -18,6 +16,9 @@ from sqlmodel import (
     SQLModel,
 )
 
+from pikesquares.adapters.zmq_pool import get_socket_pool
+from pikesquares.services.stats import stats_cache
+
 from .base import TimeStampedBase  # , enum_values
 
 #from .device import Device
@@ -68,7 +69,7 @@ class ZMQMonitor(AppMonitorBase, table=True):
 
     ip: str | None = Field(max_length=25, default=None)
     port: int | None = Field(default=None)
-    transport: str | None = Field(max_length=10, default=None)
+    transport: str | None = Field(max_length=10, default=None, index=True)
     socket_address: str | None = Field(max_length=150, default=None)
 
     device_id: int | None = Field(foreign_key="devices.id", unique=True)
@@ -101,23 +102,22 @@ class ZMQMonitor(AppMonitorBase, table=True):
         return f"zmq://{self.zmq_address}"
 
     async def create_or_restart_instance(self, name: str, model) -> None:
-        ctx = zmq.asyncio.Context()
-        sock = ctx.socket(zmq.PUSH)
         if self.zmq_address:
             logger.info(f"Launching {model.__class__.__name__} {model.service_id} in ZMQ Monitor @ {self.socket_address}")
-            uwsgi_config = model.get_uwsgi_config()
-            sock.connect(self.zmq_address)
-            await sock.send_multipart([b"touch", name.encode(), uwsgi_config.format(do_print=True).encode()])
+            uwsgi_config = model.render_uwsgi_config()
+            await get_socket_pool().send_multipart(
+                self.zmq_address,
+                [b"touch", name.encode(), uwsgi_config.encode()],
+            )
+            stats_cache.invalidate_service(model.service_id)
         else:
             logger.info(f"{model.__class__.__name__} no zmq socket found @ {self.socket_address}")
 
     async def destroy_instance(self, name: str, model) -> None:
-        ctx = zmq.asyncio.Context()
-        sock = ctx.socket(zmq.PUSH)
         if self.zmq_address:
-            sock.connect(self.zmq_address)
             logger.debug(f"Stopping {model.__class__.__name__} {model.service_id} in ZMQ Monitor @ {self.zmq_address}")
-            await sock.send_multipart([b"destroy", name.encode()])
+            await get_socket_pool().send_multipart(self.zmq_address, [b"destroy", name.encode()])
+            stats_cache.invalidate_service(model.service_id)
 
 
 class DirMonitor(AppMonitorBase, table=True):
@@ -16,16 +16,13 @@ from svcs.exceptions import ServiceNotFoundError
 from pikesquares import services
 from pikesquares.conf import AppConfig, AppConfigError
 from pikesquares.domain.managed_services import ManagedServiceBase
+from pikesquares.exceptions import ServiceUnavailableError
 from pikesquares.service_layer.handlers.routers import http_router_ips
 from pikesquares.service_layer.uow import UnitOfWork
 
 logger = structlog.get_logger()
 
 
-class ServiceUnavailableError(Exception):
-    pass
-
-
 class PCAPIUnavailableError(ServiceUnavailableError):
     pass
 
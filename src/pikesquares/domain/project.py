@@ -15,9 +15,9 @@ class Project(ServiceBase, table=True):
 
     __tablename__ = "projects"
 
-    name: str = Field(default="sandbox", max_length=32)
+    name: str = Field(default="sandbox", max_length=32, index=True)
 
-    device_id: str | None = Field(default=None, foreign_key="devices.id")
+    device_id: str | None = Field(default=None, foreign_key="devices.id", index=True)
     device: "Device" = Relationship(back_populates="projects")
 
     wsgi_apps: list["WsgiApp"] = Relationship(back_populates="project")
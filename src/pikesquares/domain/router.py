@@ -20,11 +20,11 @@ class TuntapRouter(ServiceBase, table=True):
 
     __tablename__ = "project_tuntap_routers"
 
-    name: str = Field(default="device0", max_length=32)
-    ip: str | None = Field(max_length=25, default=None)
+    name: str = Field(default="device0", max_length=32, index=True)
+    ip: str | None = Field(max_length=25, default=None, index=True)
     netmask: str | None = Field(max_length=25, default=None)
 
-    project_id: str | None = Field(default=None, foreign_key="projects.id")
+    project_id: str | None = Field(default=None, foreign_key="projects.id", index=True)
     project: "Project" = Relationship(back_populates="tuntap_routers")
 
     tuntap_devices: list["TuntapDevice"] = Relationship(back_populates="tuntap_router")
@@ -49,12 +49,12 @@ class TuntapDevice(TimeStampedBase, table=True):
         default_factory=lambda: str(uuid.uuid4()),
         max_length=36,
     )
-    name: str = Field(default="device0", max_length=32)
+    name: str = Field(default="device0", max_length=32, index=True)
     linked_service_id: str = Field(default=None, unique=True)
-    ip: str | None = Field(max_length=25, default=None)
+    ip: str | None = Field(max_length=25, default=None, index=True)
     netmask: str | None = Field(max_length=25, default=None)
 
-    tuntap_router_id: int | None = Field(foreign_key="project_tuntap_routers.id")
+    tuntap_router_id: int | None = Field(foreign_key="project_tuntap_routers.id", index=True)
     tuntap_router: TuntapRouter | None = Relationship(back_populates="tuntap_devices")
 
     @property
@@ -70,8 +70,8 @@ class HttpRouter(ServiceBase, table=True):
 
     __tablename__ = "project_http_routers"
 
-    address: str | None = Field(default=None, max_length=100)
-    project_id: str | None = Field(default=None, foreign_key="projects.id")
+    address: str | None = Field(default=None, max_length=100, index=True)
+    project_id: str | None = Field(default=None, foreign_key="projects.id", index=True)
     project: "Project" = Relationship(back_populates="http_routers")
 
     @property
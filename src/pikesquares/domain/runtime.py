@@ -1,4 +1,5 @@
 
+import re
 import shutil
 import traceback
 import uuid
@@ -18,6 +19,8 @@ from sqlmodel import Field, Relationship
 from pikesquares.domain.base import TimeStampedBase
 from pikesquares.exceptions import (
     DjangoCheckError,
+    DjangoCollectStaticError,
+    DjangoDiffSettingsError,
     UvCommandExecutionError,
     UvPipInstallError,
     UvPipListError,
@@ -62,6 +65,16 @@ PY_TMP_DIR_IGNORE_PATTERNS: set[str] = set(
 )
 py_runtime_emoji: str = ":snake:"
 
+# collectstatic with STATIC_ROOT pointed at the directory passed as the first argument
+DJANGO_COLLECTSTATIC = (
+    "import sys, django; "
+    "from django.conf import settings; "
+    "from django.core.management import call_command; "
+    "django.setup(); "
+    "settings.STATIC_ROOT = sys.argv[1]; "
+    "call_command('collectstatic', interactive=False, clear=True, verbosity=0)"
+)
+
 
 class DjangoCheckMessage(pydantic.BaseModel):
     # 4_0.E001
@@ -104,6 +117,10 @@ class DjangoSettings(pydantic.BaseModel):
     root_urlconf: str
     wsgi_application: str
     base_dir: Path | None = None
+    static_url: str | None = None
+    static_root: str | None = None
+    media_url: str | None = None
+    media_root: str | None = None
 
     def settings_with_titles(self) -> list[tuple[str, str]]:
         return [
@@ -123,7 +140,7 @@ class AppRuntime(AsyncAttrs, TimeStampedBase):
         default_factory=lambda: str(uuid.uuid4()),
         max_length=36,
     )
-    version: str = Field(max_length=25)
+    version: str = Field(max_length=25, index=True)
 
     class Config:
         populate_by_name = True
@@ -138,7 +155,7 @@ class BaseAppCodebase(AsyncAttrs, TimeStampedBase):
         default_factory=lambda: str(uuid.uuid4()),
         max_length=36,
     )
-    root_dir: str = Field(max_length=255)
+    root_dir: str = Field(max_length=255, index=True)
     repo_dir: str = Field(max_length=255)
     repo_git_url: str = Field(max_length=255)
     venv_dir: str = Field(max_length=255)
@@ -536,7 +553,8 @@ class PythonAppCodebase(BaseAppCodebase, table=True):
             for line in stdout.splitlines():
                 for fld in DjangoSettings.model_fields.keys():
                     if fld.upper() in line:
-                        match = re.search(fr"{fld.upper()}\s*=\s*['\"](.*?)['\"]", line)
+                        # paths are printed as PosixPath('...')
+                        match = re.search(fr"{fld.upper()}\s*=\s*(?:\w+\()?['\"](.*?)['\"]", line)
                         if match:
                             dj_settings[fld] = match.group(1)
                         else:
@@ -550,3 +568,26 @@ class PythonAppCodebase(BaseAppCodebase, table=True):
         except UvCommandExecutionError:
             raise DjangoDiffSettingsError(f"[pikesquares] UvExecError: unable to run django diffsettings in {chdir}")
 
+    async def django_collectstatic(
+        self,
+        django_settings: DjangoSettings,
+        static_dir: AsyncPath,
+        cmd_env: dict | None = None,
+    ) -> None:
+        """collect the static files of the app into `static_dir` instead of its STATIC_ROOT"""
+        logger.info(f"[pikesquares] django collectstatic into {static_dir}")
+        await static_dir.mkdir(parents=True, exist_ok=True)
+        cmd_args = ["run", "python", "-c", DJANGO_COLLECTSTATIC, str(static_dir)]
+        cmd_env = {"DJANGO_SETTINGS_MODULE": django_settings.settings_module, **(cmd_env or {})}
+        try:
+            await uv_cmd(
+                AsyncPath(self.uv_bin),
+                cmd_args,
+                cmd_env,
+                chdir=AsyncPath(self.repo_dir),
+            )
+        except UvCommandExecutionError:
+            raise DjangoCollectStaticError(
+                f"[pikesquares] UvExecError: unable to run django collectstatic in {self.repo_dir}"
+            ) from None
+
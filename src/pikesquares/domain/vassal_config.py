@@ -0,0 +1,31 @@
+import hashlib
+import uuid
+
+from sqlmodel import Field, SQLModel
+
+from .base import TimeStampedBase
+
+
+def config_hash(uwsgi_config: str) -> str:
+    """sha256 of a rendered vassal configuration"""
+    return hashlib.sha256(uwsgi_config.encode()).hexdigest()
+
+
+class VassalConfig(TimeStampedBase, SQLModel, table=True):
+    """hash of the configuration last pushed to the emperor for a vassal"""
+
+    __tablename__ = "vassal_configs"
+
+    id: str = Field(
+        primary_key=True,
+        default_factory=lambda: str(uuid.uuid4()),
+        max_length=36,
+    )
+    service_id: str = Field(unique=True, index=True)
+    config_hash: str = Field(max_length=64)
+
+    def __repr__(self):
+        return f'<VassalConfig service_id="{self.service_id}" config_hash="{self.config_hash[:12]}">'
+
+    def __str__(self):
+        return self.__repr__()
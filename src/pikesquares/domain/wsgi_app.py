@@ -53,15 +53,15 @@ class WsgiApp(ServiceBase, table=True):
 
     __tablename__ = "python_wsgi_apps"
 
-    name: str = Field(max_length=32)
+    name: str = Field(max_length=32, index=True)
 
-    project_id: str | None = Field(default=None, foreign_key="projects.id")
+    project_id: str | None = Field(default=None, foreign_key="projects.id", index=True)
     project: "Project" = Relationship(back_populates="wsgi_apps")
 
-    python_app_runtime_id: str | None = Field(default=None, foreign_key="python_app_runtimes.id")
+    python_app_runtime_id: str | None = Field(default=None, foreign_key="python_app_runtimes.id", index=True)
     python_app_runtime: "PythonAppRuntime" = Relationship(back_populates="wsgi_apps")
 
-    python_app_codebase_id: str | None = Field(default=None, foreign_key="python_app_codebases.id")
+    python_app_codebase_id: str | None = Field(default=None, foreign_key="python_app_codebases.id", index=True)
     python_app_codebase: "PythonAppCodebase" = Relationship(back_populates="wsgi_apps")
 
     root_dir: str = Field(max_length=255)
@@ -70,6 +70,17 @@ class WsgiApp(ServiceBase, table=True):
     venv_dir: str = Field(max_length=255)
     workers: int = Field(default=1)
     threads: int = Field(default=1)
+    # uWSGI listen queue size, the uWSGI default when unset
+    listen_backlog: int | None = Field(default=None)
+    # static files served without a python worker, url path -> directory
+    static_url: str | None = Field(default=None, max_length=255)
+    static_dir: str | None = Field(default=None, max_length=255)
+    media_url: str | None = Field(default=None, max_length=255)
+    media_dir: str | None = Field(default=None, max_length=255)
+    # load the app in the master and gc.freeze() it before the workers fork
+    preload: bool = Field(default=False)
+    # gc.set_threshold arguments, `700,10,10`
+    gc_threshold: str | None = Field(default=None, max_length=32)
 
     @pydantic.computed_field
     # routers: list["BaseRouter"] = Relationship(back_populates="device")
@@ -83,6 +94,27 @@ class WsgiApp(ServiceBase, table=True):
     def uwsgi_config_section_class(self) -> WsgiAppSection:
         return WsgiAppSection
 
+    @property
+    def collected_static_dir(self) -> Path:
+        """where collectstatic puts the static files of the app"""
+        return Path(self.data_dir) / "static" / self.service_id
+
+    @property
+    def preload_hook_file(self) -> Path | None:
+        """the generated module loaded as the app, when preloading or tuning the gc"""
+        if not (self.preload or self.gc_threshold):
+            return None
+        return Path(self.data_dir) / "preload" / f"{self.service_id}.py"
+
+    @property
+    def static_map(self) -> dict[str, str]:
+        """url path prefixes and the directories they are served from"""
+        return {
+            url: directory
+            for url, directory in ((self.static_url, self.static_dir), (self.media_url, self.media_dir))
+            if url and directory
+        }
+
     async def up(self, wsgi_app_device, subscription_server_address, tuntap_router, project_zmq_monitor):
         from pikesquares.service_layer.handlers.monitors import create_or_restart_instance
 
@@ -44,6 +44,17 @@ class DjangoDiffSettingsError(Exception):
     pass
 
 
+class DjangoCollectStaticError(Exception):
+    pass
+
+
 class UvCommandExecutionError(Exception):
     pass
 
+
+class VassalLaunchError(Exception):
+    pass
+
+
+class VassalBlacklistedError(VassalLaunchError):
+    pass
@@ -1,6 +1,9 @@
 import json
+import os
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Union
+from tempfile import NamedTemporaryFile
+from typing import TextIO, Union
 
 import structlog
 
@@ -14,42 +17,80 @@ from uwsgiconf.utils import listify
 from uwsgiconf.formatters import (
     FormatterBase,
     ArgsFormatter,
-    IniFormatter,
+    IniFormatter as _IniFormatter,
 )
 
 logger = structlog.get_logger()
 
 
-class JSONFormatter(FormatterBase):
-    """Translates a configuration as JSON file."""
+class StreamingFormatter(FormatterBase):
+    """Formatter producing its output in chunks, in a single pass over the options."""
 
-    alias: str = "json"
+    def iter_chunks(self) -> Iterator[str]:
+        raise NotImplementedError  # pragma: nocover
 
     def format(self) -> str:
-        config = {}
+        return "".join(self.iter_chunks())
+
+    def write(self, target_file: TextIO) -> None:
+        """stream the formatted configuration into a file object"""
+        target_file.writelines(self.iter_chunks())
+
+
+class IniFormatter(StreamingFormatter, _IniFormatter):
+    """Translates a configuration as INI file."""
+
+    def iter_chunks(self) -> Iterator[str]:
+        last_section = ""
+        separator = ""
         for section_name, key, value in self.iter_options():
-            # print(f"{section_name=}, {str(key)=}, {value=}")
+            if section_name != last_section:
+                yield f"{separator}\n[{section_name}]"
+                separator = "\n"
+                last_section = section_name
+            yield f"{separator}{key} = {str(value).strip()}"
+            separator = "\n"
 
-            if not section_name in config:
-                config[section_name] = {}
 
+class JSONFormatter(StreamingFormatter):
+    """Translates a configuration as JSON file.
+
+    A repeated key keeps its last value, except `plugin` whose values are
+    joined with commas.
+    """
+
+    alias: str = "json"
+
+    def as_dict(self) -> dict[str, dict[str, str]]:
+        config: dict[str, dict[str, str]] = {}
+        # section name -> plugins, joined once all options are seen
+        plugins: dict[str, list[str]] = {}
+        for section_name, key, value in self.iter_options():
+            section = config.get(section_name)
+            if section is None:
+                section = config[section_name] = {}
             if isinstance(key, tuple):
                 _, key = key
-
-            if str(key) == "plugin":
-                try:
-                    existing_plugins = config[section_name]["plugin"]
-                except KeyError:
-                    config[section_name][str(key)] = str(value).strip()
-                else:
-                    existing_plugins = existing_plugins.split(",")
-                    existing_plugins.append(str(value).strip())
-                    config[section_name][str(key)] = ",".join(existing_plugins)
-                    #p rint(config[section_name][str(key)])
+            key = str(key)
+            value = str(value).strip()
+            if key == "plugin":
+                if section_name not in plugins:
+                    plugins[section_name] = []
+                    # keeps the position of the first plugin option
+                    section[key] = ""
+                plugins[section_name].append(value)
             else:
-                config[section_name][str(key)] = str(value).strip()
+                section[key] = value
 
-        return json.dumps(config)
+        for section_name, names in plugins.items():
+            config[section_name]["plugin"] = ",".join(names)
+        return config
+
+    def iter_chunks(self) -> Iterator[str]:
+        return json.JSONEncoder().iterencode(self.as_dict())
+
+    def format(self) -> str:
+        return json.dumps(self.as_dict())
 
 
 FORMATTERS: dict[str, type[FormatterBase]] = {formatter.alias: formatter for formatter in (
@@ -59,6 +100,37 @@ FORMATTERS: dict[str, type[FormatterBase]] = {formatter.alias: formatter for for
 )}
 
 
+def write_if_changed(filepath: Union[str, Path], content: str) -> bool:
+    """Atomically replaces a file with `content` unless it already holds it.
+
+    The content goes to a temporary file in the same directory which is
+    then renamed over the target, readers never see a partial file.
+    Returns whether the file was written.
+
+    """
+    filepath = Path(filepath)
+    data = content.encode()
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        mode = 0o644
+    else:
+        mode = stat.st_mode & 0o7777
+        if stat.st_size == len(data) and filepath.read_bytes() == data:
+            return False
+
+    with NamedTemporaryFile(dir=filepath.parent, prefix=f".{filepath.name}.", delete=False) as f:
+        try:
+            f.write(data)
+            f.flush()
+            os.fchmod(f.fileno(), mode)
+            os.replace(f.name, filepath)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    return True
+
+
 class Configuration(_Configuration):
     """Available formatters by alias."""
 
@@ -78,30 +150,39 @@ class Configuration(_Configuration):
 
         return formatted
 
-    def tofile(self, filepath: Union[str, Path] = None) -> str:
+    def write(self, target_file: TextIO, *, formatter: str = "ini") -> None:
+        """Streams the formatted configuration into a file object.
+
+        :param target_file: File object to write into.
+        :param formatter: Formatter alias, ini or json. Default: ini.
+
+        """
+        FORMATTERS[formatter](self.sections).write(target_file)
+
+    def tofile(self, filepath: Union[str, Path] = None, *, formatter: str = "ini") -> str:
         """Saves configuration into a file and returns its path.
 
-        Convenience method.
+        The file is replaced atomically and left untouched when its
+        contents are already up to date.
 
         :param filepath: Filepath to save configuration into.
             If not provided a temporary file will be automatically generated.
 
+        :param formatter: Formatter alias, ini or json. Default: ini.
+
         """
         if filepath is None:
-            with NamedTemporaryFile(prefix=f'{self.alias}_', suffix='.ini', delete=False) as f:
+            with NamedTemporaryFile(prefix=f'{self.alias}_', suffix=f'.{formatter}', delete=False) as f:
                 filepath = f.name
 
         else:
             filepath = Path(filepath).absolute()
 
             if filepath.is_dir():
-                filepath = filepath / f'{self.alias}.ini'
+                filepath = filepath / f'{self.alias}.{formatter}'
 
         filepath = str(filepath)
-
-        with open(filepath, 'w') as target_file:
-            target_file.write(self.format())
-            target_file.flush()
+        write_if_changed(filepath, self.format(formatter=formatter))
 
         return filepath
 
@@ -0,0 +1,108 @@
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+
+import pydantic
+import structlog
+
+from pikesquares.conf import settings
+
+logger = structlog.get_logger()
+
+# fields that never end up in a rendered config
+FINGERPRINT_EXCLUDE = frozenset({"id", "created_at", "updated_at"})
+# global settings read by the preset sections
+PRESET_SETTINGS = ("AUTOSCALE_ENABLED",)
+DEFAULT_MAXSIZE = 4096
+
+
+class RenderCacheStats(pydantic.BaseModel):
+    hits: int
+    misses: int
+    entries: dict[str, int]
+
+
+def fingerprint(section_class: type, *models, extra: object = None) -> str:
+    """sha256 of the section class, the preset settings and the column values of the models feeding it"""
+    digest = hashlib.sha256(f"{section_class.__module__}.{section_class.__qualname__}".encode())
+    preset_settings = {name: getattr(settings, name) for name in PRESET_SETTINGS}
+    digest.update(json.dumps(preset_settings, sort_keys=True, default=str).encode())
+    for model in models:
+        fields = model.model_dump(exclude=FINGERPRINT_EXCLUDE)
+        digest.update(json.dumps(fields, sort_keys=True, default=str).encode())
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Rendered uWSGI configurations of preset sections.
+
+    Entries are keyed by a fingerprint of the model fields feeding the
+    section, every output format has its own LRU cache of `maxsize`
+    entries. Updating or deleting a model drops its entries.
+
+    Sections customised from related rows are rendered with a `build`
+    callable, those rows and any other input go in `related` and `extra`.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        # formatter alias -> fingerprint -> rendered config
+        self.caches: dict[str, OrderedDict[str, str]] = {"ini": OrderedDict(), "json": OrderedDict()}
+        # service_id -> (formatter alias, fingerprint) of its entries
+        self.keys: dict[str, set[tuple[str, str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(
+        self,
+        model,
+        section_class: type | None = None,
+        formatter: str = "ini",
+        related: Iterable = (),
+        extra: object = None,
+        build: Callable[[], object] | None = None,
+    ) -> str:
+        """the config of `model` rendered by `section_class`, its uwsgi_config_section_class by default"""
+        section_class = section_class or model.uwsgi_config_section_class
+        key = fingerprint(section_class, model, *related, extra=extra)
+        cache = self.caches.setdefault(formatter, OrderedDict())
+        try:
+            rendered = cache[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            cache.move_to_end(key)
+            return rendered
+
+        section = build() if build else section_class(model)
+        rendered = section.as_configuration().format(formatter=formatter)
+        cache[key] = rendered
+        self.keys.setdefault(model.service_id, set()).add((formatter, key))
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return rendered
+
+    def invalidate(self, service_id: str | None = None) -> None:
+        """forget the rendered configs of one service, or everything"""
+        if service_id is None:
+            for cache in self.caches.values():
+                cache.clear()
+            self.keys.clear()
+            return
+        for formatter, key in self.keys.pop(service_id, ()):
+            self.caches[formatter].pop(key, None)
+
+    def stats(self) -> RenderCacheStats:
+        return RenderCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries={formatter: len(cache) for formatter, cache in self.caches.items()},
+        )
+
+
+render_cache = RenderCache()
@@ -4,10 +4,14 @@ from typing import Union
 import structlog
 from uwsgiconf.typehints import Strlist
 
+from pikesquares.conf import settings
+
 from . import Section
 
 logger = structlog.get_logger()
 
+STATIC_OFFLOAD_THREADS = 2
+
 
 class BaseWsgiAppSection(Section):
     """Basic wsgi app configuration."""
@@ -164,8 +168,27 @@ class WsgiAppSection(BaseWsgiAppSection):
             embedded_plugins=embedded_plugins,
             owner=f"{self.wsgi_app.run_as_uid}:{self.wsgi_app.run_as_gid}",
             touch_reload=str(self.wsgi_app.touch_reload_file),
+            workers=self.wsgi_app.workers,
+            threads=self.wsgi_app.threads if self.wsgi_app.threads > 1 else True,
             # **app_options.model_dump(),
         )
+        if self.wsgi_app.workers > 1 and settings.AUTOSCALE_ENABLED:
+            # start on a single worker, the autoscaler of the api adds and
+            # removes workers up to `workers` through the master fifo.
+            # nothing else drives the manual algorithm, without the
+            # autoscaler the app runs all of its workers
+            self.cheapening.set_basic_params(
+                cheaper_algo=self.cheapening.algorithms.manual(),
+                workers_min=1,
+                workers_startup=1,
+            )
+        if self.wsgi_app.listen_backlog:
+            self.networking.set_basic_params(queue_size=self.wsgi_app.listen_backlog)
+        if self.wsgi_app.static_map:
+            # static files are sent by offload threads, python workers only see dynamic requests
+            for mountpoint, target in self.wsgi_app.static_map.items():
+                self.statics.register_static_map(mountpoint, target)
+            self.workers.set_thread_params(count_offload=STATIC_OFFLOAD_THREADS)
         self.python.set_basic_params(
             enable_threads=True,
             # search_path=str(Path(self.project.pyvenv_dir) / 'lib/python3.10/site-packages'),
@@ -209,8 +232,9 @@ class WsgiAppSection(BaseWsgiAppSection):
         #        * mypackage.my_wsgi_module:my_app -- read from `my_app` attr of mypackage/my_wsgi_module.py
         # :param callable_name: Set WSGI callable name. Default: application.
 
+        # the preload hook loads the wsgi file itself, in the master before fork
         self.python.set_wsgi_params(
-            module=str(self.wsgi_app.wsgi_file),
+            module=str(self.wsgi_app.preload_hook_file or self.wsgi_app.wsgi_file),
             callable_name=self.wsgi_app.wsgi_module
         )
         self.applications.set_basic_params(exit_if_none=require_app)
@@ -242,6 +266,8 @@ class WsgiAppSection(BaseWsgiAppSection):
         # subscription-notify-socket = /tmp/notify.socket
 
         self.monitoring.set_stats_params(address=str(self.wsgi_app.stats_address))
+        # per worker rss in the stats, used to recycle leaking workers
+        self.logging.set_basic_params(memory_report=1)
         # self.logging.add_logger(self.logging.loggers.stdio())
         self.logging.add_logger(self.logging.loggers.file(filepath=str(self.wsgi_app.log_file)))
 
@@ -4,7 +4,6 @@ from pathlib import Path
 import apluggy as pluggy
 import cuid
 import structlog
-import tenacity
 from uwsgiconf.config import Section
 
 from pikesquares.domain.managed_services import AttachedDaemon
@@ -70,6 +69,8 @@ async def attached_daemon_up(
         plugin_manager.register(DnsmasqAttachedDaemon)
         plugin_manager.register(RedisAttachedDaemon)
 
+        attached_daemon = await uow.attached_daemons.\
+            get_attached_daemon_with_topology(attached_daemon.service_id) or attached_daemon
         project = await attached_daemon.awaitable_attrs.project
         tuntap_routers = await project.awaitable_attrs.tuntap_routers
 
@@ -193,10 +194,9 @@ async def attached_daemon_up(
             section._set("end-if", "")
 
         section.master_process.attach_process(**cmd_args)
-        try:
-            _ = await attached_daemon.read_stats()
+        if await attached_daemon.is_running():
             logger.info(f"Attached Daemon {attached_daemon.name} is already running")
-        except tenacity.RetryError:
+        else:
             #print(section.as_configuration().format())
             project_zmq_monitor = await project.awaitable_attrs.zmq_monitor
             project_zmq_monitor_address = project_zmq_monitor.zmq_address
@@ -216,9 +216,7 @@ async def attached_daemon_down(
 ) -> bool:
     try:
 
-        try:
-            _ = await attached_daemon.read_stats()
-        except tenacity.RetryError:
+        if not await attached_daemon.is_running():
             logger.info(f"Managed service {attached_daemon.name} is not running")
             return False
 
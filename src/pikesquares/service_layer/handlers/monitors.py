@@ -1,12 +1,17 @@
+from pathlib import Path
 from typing import Union
+
 import structlog
-import zmq
-import zmq.asyncio
 
+from pikesquares.adapters.zmq_pool import get_socket_pool
+from pikesquares.domain.base import ServiceBase
 from pikesquares.domain.device import Device
 from pikesquares.domain.monitors import ZMQMonitor
 from pikesquares.domain.project import Project
 from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.services.launches import vassal_launches
+from pikesquares.services.readiness import readiness, wait_for_launch
+from pikesquares.services.stats import stats_cache
 
 logger = structlog.getLogger()
 
@@ -33,14 +38,38 @@ async def create_zmq_monitor(
         raise exc
 
 async def create_or_restart_instance(zmq_monitor_address: str, name: str, uwsgi_config: str) -> None:
-    ctx = zmq.asyncio.Context()
-    sock = ctx.socket(zmq.PUSH)
-    sock.connect(zmq_monitor_address)
-    await sock.send_multipart([b"touch", name.encode(), uwsgi_config.encode()])
+    await get_socket_pool().send_multipart(
+        zmq_monitor_address,
+        [b"touch", name.encode(), uwsgi_config.encode()],
+    )
+    stats_cache.invalidate_service(name.removesuffix(".ini"))
+
+async def launch_instance(
+    service: ServiceBase,
+    zmq_monitor_address: str,
+    emperor_stats_address: Path | str,
+    uwsgi_config: str,
+    timeout: float | None = None,
+):
+    """
+    push the vassal config of `service` to its emperor and wait for it to come up
+
+    listens for the ready notification and the emperor launch confirmation
+    before pushing, so a fast spawn can not be missed. returns the
+    wait_for_launch result, None if the vassal did not come up.
+    """
+    name = f"{service.service_id}.ini"
+    ready = await readiness.expect(service.notify_socket)
+    launched = await vassal_launches.expect(emperor_stats_address, name)
+    try:
+        await create_or_restart_instance(zmq_monitor_address, name, uwsgi_config)
+    except Exception:
+        ready.cancel()
+        launched.cancel()
+        raise
+    return await wait_for_launch(service, ready, timeout=timeout, launched=launched)
 
 async def destroy_instance(zmq_monitor_address: str, name: str) -> None:
-    ctx = zmq.asyncio.Context()
-    sock = ctx.socket(zmq.PUSH)
-    sock.connect(zmq_monitor_address)
-    await sock.send_multipart([b"destroy", name.encode()])
+    await get_socket_pool().send_multipart(zmq_monitor_address, [b"destroy", name.encode()])
+    stats_cache.invalidate_service(name.removesuffix(".ini"))
 
@@ -2,15 +2,16 @@ import apluggy as pluggy
 import cuid
 import netifaces
 import structlog
-import tenacity
 from aiopath import AsyncPath
 
 from pikesquares.domain.device import Device
 from pikesquares.domain.project import Project
 from pikesquares.domain.router import TuntapRouter
+from pikesquares.domain.vassal_config import config_hash
+from pikesquares.presets.cache import render_cache
 from pikesquares.presets.project import ProjectSection
 from pikesquares.service_layer.handlers.attached_daemon import attached_daemon_up, provision_attached_daemon
-from pikesquares.service_layer.handlers.monitors import create_or_restart_instance, create_zmq_monitor, destroy_instance
+from pikesquares.service_layer.handlers.monitors import create_zmq_monitor, destroy_instance, launch_instance
 from pikesquares.service_layer.handlers.routers import (
     provision_http_router,
     provision_tuntap_router,
@@ -111,69 +112,71 @@ async def get_nat_interfaces() -> list[str]:
 async def project_up(
         project: Project,
         tuntap_routers: list[TuntapRouter],
-        uow: UnitOfWork
+        uow: UnitOfWork,
+        force: bool = False,
 )  -> bool | None:
-    stats = None
-    while not stats:
-        try:
-            return await project.read_stats()
-        except tenacity.RetryError:
-            break
+    running = await project.is_running()
+    # device, zmq monitors and routers in one round trip
+    project = await uow.projects.get_project_with_topology(project.service_id) or project
 
     try:
-        section = ProjectSection(project)
-
         project_zmq_monitor = await project.awaitable_attrs.zmq_monitor
-        if project_zmq_monitor:
-            section.empire.set_emperor_params(
-                vassals_home=project_zmq_monitor.uwsgi_zmq_address,
-                name=f"{project.service_id}",
-                stats_address=project.stats_address,
-                spawn_asap=True,
-                # pid_file=str((Path(conf.RUN_DIR) / f"{project.service_id}.pid").resolve()),
-            )
         logger.info(project_zmq_monitor)
-        for tuntap_router in await tuntap_routers:
-            router_cls = section.routing.routers.tuntap
-            router = router_cls(
-                on=str(tuntap_router.socket_address),
-                device=tuntap_router.name,
-                stats_server=str(AsyncPath(
-                    tuntap_router.run_dir) / f"{tuntap_router.service_id}-stats.sock"
-                ),
-            )
-            router.add_firewall_rule(direction="out", action="allow", src=str(tuntap_router.ipv4_network), dst=tuntap_router.ip)
-            router.add_firewall_rule(direction="out", action="deny", src=str(tuntap_router.ipv4_network), dst=str(tuntap_router.ipv4_network))
-            router.add_firewall_rule(direction="out", action="allow", src=str(tuntap_router.ipv4_network), dst="0.0.0.0")
-            router.add_firewall_rule(direction="out", action="deny")
-            router.add_firewall_rule(direction="in", action="allow", src=tuntap_router.ip, dst=str(tuntap_router.ipv4_network))
-            router.add_firewall_rule(direction="in", action="deny", src=str(tuntap_router.ipv4_network), dst=str(tuntap_router.ipv4_network))
-            router.add_firewall_rule(direction="in", action="allow", src="0.0.0.0", dst=str(tuntap_router.ipv4_network))
-            router.add_firewall_rule(direction="in", action="deny")
-            section.routing.use_router(router)
-
-            # give it an ip address
-            section.main_process.run_command_on_event(
-                command=f"ifconfig {tuntap_router.name} {tuntap_router.ip} netmask {tuntap_router.netmask} up",
-                phase=section.main_process.phases.PRIV_DROP_PRE,
-            )
-            # setup nat
-            section.main_process.run_command_on_event(
-                command="iptables -t nat -F", phase=section.main_process.phases.PRIV_DROP_PRE
-            )
-            nat_interfaces = await get_nat_interfaces()
-            for nat_interface in nat_interfaces:
+        project_tuntap_routers = list(await tuntap_routers)
+        nat_interfaces = await get_nat_interfaces() if project_tuntap_routers else []
+
+        def build_section() -> ProjectSection:
+            section = ProjectSection(project)
+            if project_zmq_monitor:
+                section.empire.set_emperor_params(
+                    vassals_home=project_zmq_monitor.uwsgi_zmq_address,
+                    name=f"{project.service_id}",
+                    stats_address=project.stats_address,
+                    spawn_asap=True,
+                    # pid_file=str((Path(conf.RUN_DIR) / f"{project.service_id}.pid").resolve()),
+                )
+            for tuntap_router in project_tuntap_routers:
+                router_cls = section.routing.routers.tuntap
+                router = router_cls(
+                    on=str(tuntap_router.socket_address),
+                    device=tuntap_router.name,
+                    stats_server=str(AsyncPath(
+                        tuntap_router.run_dir) / f"{tuntap_router.service_id}-stats.sock"
+                    ),
+                )
+                router.add_firewall_rule(direction="out", action="allow", src=str(tuntap_router.ipv4_network), dst=tuntap_router.ip)
+                router.add_firewall_rule(direction="out", action="deny", src=str(tuntap_router.ipv4_network), dst=str(tuntap_router.ipv4_network))
+                router.add_firewall_rule(direction="out", action="allow", src=str(tuntap_router.ipv4_network), dst="0.0.0.0")
+                router.add_firewall_rule(direction="out", action="deny")
+                router.add_firewall_rule(direction="in", action="allow", src=tuntap_router.ip, dst=str(tuntap_router.ipv4_network))
+                router.add_firewall_rule(direction="in", action="deny", src=str(tuntap_router.ipv4_network), dst=str(tuntap_router.ipv4_network))
+                router.add_firewall_rule(direction="in", action="allow", src="0.0.0.0", dst=str(tuntap_router.ipv4_network))
+                router.add_firewall_rule(direction="in", action="deny")
+                section.routing.use_router(router)
+
+                # give it an ip address
                 section.main_process.run_command_on_event(
-                    command=f"iptables -t nat -A POSTROUTING -o {nat_interface} -j MASQUERADE",
+                    command=f"ifconfig {tuntap_router.name} {tuntap_router.ip} netmask {tuntap_router.netmask} up",
                     phase=section.main_process.phases.PRIV_DROP_PRE,
                 )
-        # enable linux ip forwarding
-        section.main_process.run_command_on_event(
-            command="echo 1 >/proc/sys/net/ipv4/ip_forward",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        # fs,pid,ipc,uts,net
-        section._set("emperor-use-clone", "net")
+                # setup nat
+                section.main_process.run_command_on_event(
+                    command="iptables -t nat -F", phase=section.main_process.phases.PRIV_DROP_PRE
+                )
+                for nat_interface in nat_interfaces:
+                    section.main_process.run_command_on_event(
+                        command=f"iptables -t nat -A POSTROUTING -o {nat_interface} -j MASQUERADE",
+                        phase=section.main_process.phases.PRIV_DROP_PRE,
+                    )
+            # enable linux ip forwarding
+            section.main_process.run_command_on_event(
+                command="echo 1 >/proc/sys/net/ipv4/ip_forward",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            # fs,pid,ipc,uts,net
+            section._set("emperor-use-clone", "net")
+            section._set("notify-socket", str(project.notify_socket))
+            return section
 
         #try:
         #    _ = await project.read_stats()
@@ -182,24 +185,30 @@ async def project_up(
         #except StatsReadError:
         #    print(section.as_configuration().format())
 
+        uwsgi_config = render_cache.render(
+            project,
+            ProjectSection,
+            related=[m for m in (project_zmq_monitor, *project_tuntap_routers) if m],
+            extra={"nat_interfaces": nat_interfaces},
+            build=build_section,
+        )
+        vassal_config_hash = config_hash(uwsgi_config)
+        if running and not force and not await uow.vassal_configs.changed(project.service_id, vassal_config_hash):
+            logger.info(f"project {project.service_id} is running with an unchanged config")
+            return True
+
         device = await project.awaitable_attrs.device
         device_zmq_monitor = await device.awaitable_attrs.zmq_monitor
         device_zmq_monitor_address = device_zmq_monitor.zmq_address
         logger.info(f"launching project {project.name} {project.service_id} @ {device_zmq_monitor_address}")
-        await create_or_restart_instance(
-            device_zmq_monitor_address,
-            f"{project.service_id}.ini",
-            section.as_configuration().format(do_print=True),
-        )
+        launched = await launch_instance(project, device_zmq_monitor_address, device.stats_address, uwsgi_config)
     except Exception as exc:
         raise exc
 
-    stats = None
-    while not stats:
-        try:
-            return await project.read_stats()
-        except tenacity.RetryError:
-            break
+    if not launched:
+        return None
+    await uow.vassal_configs.record(project.service_id, vassal_config_hash)
+    return True
 
 
 async def project_delete(
@@ -207,6 +216,7 @@ async def project_delete(
     uow: UnitOfWork,
 )  -> bool:
     try:
+        project = await uow.projects.get_project_with_topology(project.service_id) or project
         #project_zmq_monitor = await project.awaitable_attrs.zmq_monitor
         for tuntap_router in await project.awaitable_attrs.tuntap_routers:
             await uow.tuntap_routers.delete(tuntap_router.id)
@@ -234,9 +244,7 @@ async def project_delete(
 async def project_down(project: "Project", uow: "UnitOfWork") -> bool:
     try:
 
-        try:
-            _ = await project.read_stats()
-        except tenacity.RetryError:
+        if not await project.is_running():
             logger.info(f"Project {project.name} is not running")
             return False
 
@@ -7,7 +7,6 @@ import giturlparse
 import questionary
 import apluggy as pluggy
 import structlog
-import tenacity
 import typer
 from aiopath import AsyncPath
 
@@ -332,19 +331,13 @@ async def prompt_for_attached_daemons(
         console.success("Appears there have been no managed services created in this project yet.")
         return
 
-    async def check_status(daemon: AttachedDaemon) -> str:
-        try:
-            if bool(await daemon.read_stats()):
-                return "running"
-        except tenacity.RetryError:
-            pass
-        return "stopped"
+    statuses = await AttachedDaemon.get_services_status(daemons)
 
     try:
         selected_daemons = []
         choices = []
         for daemon in daemons:
-            status = await check_status(daemon)
+            status = statuses[daemon.service_id]
             logger.info(f"{daemon.name} [{daemon.service_id}] {is_running=} {status=}")
             if (status == "running" and is_running) or \
                 (status == "stopped" and not is_running):
@@ -4,12 +4,13 @@ from pathlib import Path
 
 import cuid
 import structlog
-import tenacity
 
 from pikesquares.domain.project import Project
 from pikesquares.domain.router import HttpRouter, TuntapDevice, TuntapRouter
+from pikesquares.domain.vassal_config import config_hash
+from pikesquares.presets.cache import render_cache
 from pikesquares.presets.routers import HttpRouterSection
-from pikesquares.service_layer.handlers.monitors import create_or_restart_instance
+from pikesquares.service_layer.handlers.monitors import launch_instance
 from pikesquares.service_layer.ipaddress_utils import (
     get_tuntap_router_networks,
     tuntap_router_next_available_ip,
@@ -211,14 +212,11 @@ async def http_router_ips(uow: UnitOfWork) -> list[str]:
 async def http_router_up(
         uow: UnitOfWork,
         http_router: HttpRouter,
+        force: bool = False,
     ) -> bool | None:
 
-    stats = None
-    while not stats:
-        try:
-            return await http_router.read_stats()
-        except tenacity.RetryError:
-            break
+    running = await http_router.is_running()
+    http_router = await uow.http_routers.get_http_router_with_topology(http_router.service_id) or http_router
 
     try:
         project = await http_router.awaitable_attrs.project
@@ -231,52 +229,55 @@ async def http_router_up(
         http_router_tuntap_device  = await uow.tuntap_devices.\
             get_by_linked_service_id(http_router.service_id)
 
-        section = HttpRouterSection(http_router)
-        section._set("jailed", "true")
-        router_tuntap = section.routing.routers.tuntap().device_connect(
-            device_name=http_router_tuntap_device.name,
-            socket=tuntap_router.socket_address,
-        )
-        #.device_add_rule(
-        #    direction="in",
-        #    action="route",
-        #    src=tuntap_router.ip,
-        #    dst=http_router_tuntap_device.ip,
-        #    target="10.20.30.40:5060",
-        #)
-        section.routing.use_router(router_tuntap)
-
-        #; bring up loopback
-        #exec-as-root = ifconfig lo up
-        section.main_process.run_command_on_event(
-            command="ifconfig lo up",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        # bring up interface uwsgi0
-        #exec-as-root = ifconfig uwsgi0 192.168.0.2 netmask 255.255.255.0 up
-        section.main_process.run_command_on_event(
-            command=f"ifconfig {http_router_tuntap_device.name} {http_router_tuntap_device.ip} netmask {http_router_tuntap_device.netmask} up",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        # and set the default gateway
-        #exec-as-root = route add default gw 192.168.0.1
-        section.main_process.run_command_on_event(
-            command=f"route add default gw {tuntap_router.ip}",
-            phase=section.main_process.phases.PRIV_DROP_PRE
-        )
-        section.main_process.run_command_on_event(
-            command=f"ping -c 1 {tuntap_router.ip}",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
+        def build_section() -> HttpRouterSection:
+            section = HttpRouterSection(http_router)
+            section._set("jailed", "true")
+            router_tuntap = section.routing.routers.tuntap().device_connect(
+                device_name=http_router_tuntap_device.name,
+                socket=tuntap_router.socket_address,
+            )
+            #.device_add_rule(
+            #    direction="in",
+            #    action="route",
+            #    src=tuntap_router.ip,
+            #    dst=http_router_tuntap_device.ip,
+            #    target="10.20.30.40:5060",
+            #)
+            section.routing.use_router(router_tuntap)
+
+            #; bring up loopback
+            #exec-as-root = ifconfig lo up
+            section.main_process.run_command_on_event(
+                command="ifconfig lo up",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            # bring up interface uwsgi0
+            #exec-as-root = ifconfig uwsgi0 192.168.0.2 netmask 255.255.255.0 up
+            section.main_process.run_command_on_event(
+                command=f"ifconfig {http_router_tuntap_device.name} {http_router_tuntap_device.ip} netmask {http_router_tuntap_device.netmask} up",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            # and set the default gateway
+            #exec-as-root = route add default gw 192.168.0.1
+            section.main_process.run_command_on_event(
+                command=f"route add default gw {tuntap_router.ip}",
+                phase=section.main_process.phases.PRIV_DROP_PRE
+            )
+            section.main_process.run_command_on_event(
+                command=f"ping -c 1 {tuntap_router.ip}",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
 
-        section.main_process.run_command_on_event(
-            command="route -n",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        section.main_process.run_command_on_event(
-            command="ping -c 1 8.8.8.8",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
+            section.main_process.run_command_on_event(
+                command="route -n",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            section.main_process.run_command_on_event(
+                command="ping -c 1 8.8.8.8",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            section._set("notify-socket", str(http_router.notify_socket))
+            return section
 
         project_zmq_monitor = await project.awaitable_attrs.zmq_monitor
         if not project_zmq_monitor:
@@ -292,17 +293,27 @@ async def http_router_up(
         #    AsyncPath(project_zmq_monitor.socket_address).exists() and \
         #    await AsyncPath(project_zmq_monitor.socket_address).is_socket(), f"{project_zmq_monitor.socket_address} not available"
 
-        await create_or_restart_instance(
+        uwsgi_config = render_cache.render(
+            http_router,
+            HttpRouterSection,
+            related=[tuntap_router, http_router_tuntap_device],
+            build=build_section,
+        )
+        vassal_config_hash = config_hash(uwsgi_config)
+        if running and not force and not await uow.vassal_configs.changed(http_router.service_id, vassal_config_hash):
+            logger.info(f"http router {http_router.service_id} is running with an unchanged config")
+            return True
+
+        launched = await launch_instance(
+            http_router,
             project_zmq_monitor.zmq_address,
-            f"{http_router.service_id}.ini",
-            section.as_configuration().format(do_print=False),
+            project.stats_address,
+            uwsgi_config,
         )
     except Exception as exc:
         raise exc
 
-    stats = None
-    while not stats:
-        try:
-            return await http_router.read_stats()
-        except tenacity.RetryError:
-            break
+    if not launched:
+        return None
+    await uow.vassal_configs.record(http_router.service_id, vassal_config_hash)
+    return True
@@ -1,21 +1,34 @@
 import traceback
 
+import pydantic
 import structlog
 import cuid
 from aiopath import AsyncPath
-import tenacity
 import apluggy as pluggy
 
 from pikesquares.domain.wsgi_app import WsgiApp
 from pikesquares.domain.python_runtime import PythonAppRuntime
 from pikesquares.service_layer.uow import UnitOfWork
+from pikesquares.services.sizing import (
+    AppProfile,
+    AppSizing,
+    HostResources,
+    SizingPolicy,
+    initial_sizing,
+    size_apps,
+)
+from pikesquares.services.stats import StatsCollector
 from pikesquares.domain.project import Project
 from pikesquares.domain.runtime import PythonAppCodebase
-from pikesquares.service_layer.handlers.monitors import create_or_restart_instance
+from pikesquares.domain.vassal_config import config_hash
+from pikesquares.service_layer.handlers.monitors import launch_instance
 from pikesquares.service_layer.handlers.routers import create_tuntap_device
 from pikesquares.service_layer.ipaddress_utils import tuntap_router_next_available_ip
+from pikesquares.presets import write_if_changed
+from pikesquares.presets.cache import render_cache
 from pikesquares.presets.wsgi_app import WsgiAppSection
-from pikesquares.exceptions import DjangoSettingsError
+from pikesquares.services.preload import render_preload_hook
+from pikesquares.exceptions import DjangoCollectStaticError, DjangoDiffSettingsError, DjangoSettingsError
 
 logger = structlog.getLogger()
 """
@@ -76,6 +89,77 @@ logger = structlog.getLogger()
 #    return
 """
 
+
+async def size_wsgi_apps(
+        wsgi_apps: list[WsgiApp],
+        stats_collector: StatsCollector,
+        resources: HostResources | None = None,
+        policy: SizingPolicy | None = None,
+) -> dict[str, AppSizing]:
+    """size the wsgi apps of a device together, from what their stats servers report"""
+    fleet_stats = await stats_collector.collect(wsgi_apps)
+    profiles = [
+        AppProfile.from_stats(wsgi_app.service_id, fleet_stats.wsgi_apps.get(wsgi_app.service_id))
+        for wsgi_app in wsgi_apps
+    ]
+    return size_apps(profiles, resources or HostResources.detect(), policy)
+
+
+def apply_sizing(wsgi_app: WsgiApp, sizing: AppSizing) -> bool:
+    """set the proposed workers, threads and listen backlog, True when anything changed"""
+    changed = False
+    for field in ("workers", "threads", "listen_backlog"):
+        value = getattr(sizing, field)
+        if getattr(wsgi_app, field) != value:
+            setattr(wsgi_app, field, value)
+            changed = True
+    return changed
+
+
+def static_url_path(url: str | None) -> str | None:
+    """STATIC_URL/MEDIA_URL as a url path prefix, None when served from another host"""
+    if not url or "://" in url or url.startswith("//"):
+        return None
+    return f"/{url.strip('/')}/"
+
+
+async def collect_static_files(wsgi_app: WsgiApp, app_codebase: PythonAppCodebase) -> bool:
+    """
+    map the static and media files of a django app so they are served
+    without a python worker. static files are collected into a directory
+    managed by pikesquares, media files are served from MEDIA_ROOT.
+    """
+    repo_dir = AsyncPath(app_codebase.repo_dir)
+    if not await app_codebase.is_django(repo_dir):
+        return False
+    try:
+        django_settings = await app_codebase.django_diffsettings(app_tmp_dir=repo_dir)
+    except (DjangoDiffSettingsError, AssertionError, pydantic.ValidationError):
+        logger.info(f"unable to read django settings of {wsgi_app.name}, not offloading static files")
+        return False
+
+    static_url = static_url_path(django_settings.static_url)
+    if static_url:
+        static_dir = AsyncPath(wsgi_app.collected_static_dir)
+        try:
+            await app_codebase.django_collectstatic(django_settings, static_dir)
+        except DjangoCollectStaticError:
+            logger.info(f"collectstatic failed for {wsgi_app.name}")
+            # whatever the app collected itself
+            static_dir = AsyncPath(django_settings.static_root) if django_settings.static_root else None
+        if static_dir and await static_dir.exists():
+            wsgi_app.static_url = static_url
+            wsgi_app.static_dir = str(static_dir)
+
+    media_url = static_url_path(django_settings.media_url)
+    if media_url and django_settings.media_root:
+        wsgi_app.media_url = media_url
+        wsgi_app.media_dir = django_settings.media_root
+
+    logger.info(f"static files of {wsgi_app.name}: {wsgi_app.static_map}")
+    return bool(wsgi_app.static_map)
+
+
 async def provision_wsgi_app(
         name: str,
         root_dir: AsyncPath,
@@ -121,6 +205,13 @@ async def provision_wsgi_app(
             wsgi_module=wsgi_module,
             venv_dir=app_codebase.venv_dir,
         )
+        await collect_static_files(wsgi_app, app_codebase)
+        # without stats to go by the new app starts small, the running apps keep their workers
+        apply_sizing(wsgi_app, initial_sizing(wsgi_app.service_id, HostResources.detect()))
+        logger.info(
+            f"sized {wsgi_app.service_id}: {wsgi_app.workers} workers, "
+            f"{wsgi_app.threads} threads, listen backlog {wsgi_app.listen_backlog}"
+        )
         await uow.wsgi_apps.add(wsgi_app)
 
         tuntap_routers = await uow.tuntap_routers.get_by_project_id(project.id)
@@ -144,14 +235,12 @@ async def wsgi_app_up(
         wsgi_app: WsgiApp,
         uow: UnitOfWork,
         console,
+        force: bool = False,
     ):
 
-    stats = None
-    while not stats:
-        try:
-            return await wsgi_app.read_stats()
-        except tenacity.RetryError:
-            break
+    running = await wsgi_app.is_running()
+    # codebase, project, routers and zmq monitor in one round trip
+    wsgi_app = await uow.wsgi_apps.get_wsgi_app_with_topology(wsgi_app.service_id) or wsgi_app
 
     try:
         #wsgi_app = await uow.wsgi_apps.get_by_service_id(service_id)
@@ -174,86 +263,95 @@ async def wsgi_app_up(
         wsgi_app_device = await uow.tuntap_devices.get_by_linked_service_id(wsgi_app.service_id)
         http_router = http_routers[0]
 
-        section = WsgiAppSection(wsgi_app)
-        section._set("jailed", "true")
-        # forkpty
-        section._set("unshared", "true")
-        section.main_process.run_command_on_event(
-            command=f"hostname {wsgi_app.service_id}",
-            phase=section.main_process.phases.PRIV_DROP_PRE
-        )
+        if wsgi_app.preload_hook_file:
+            await AsyncPath(wsgi_app.preload_hook_file.parent).mkdir(parents=True, exist_ok=True)
+            # the uWSGI config only names the hook, a changed hook needs its own reload
+            if write_if_changed(wsgi_app.preload_hook_file, render_preload_hook(wsgi_app)):
+                force = True
+
+        def build_section() -> WsgiAppSection:
+            section = WsgiAppSection(wsgi_app)
+            section._set("jailed", "true")
+            # forkpty
+            section._set("unshared", "true")
+            section.main_process.run_command_on_event(
+                command=f"hostname {wsgi_app.service_id}",
+                phase=section.main_process.phases.PRIV_DROP_PRE
+            )
 
-        router_tuntap = section.routing.routers.tuntap().device_connect(
-            device_name=wsgi_app_device.name,
-            socket=tuntap_router.socket_address,
-        )
-        #.device_add_rule(
-        #    direction="in",
-        #    action="route",
-        #    src=tuntap_router.ip,
-        #    dst=http_router_tuntap_device.ip,
-        #    target="10.20.30.40:5060",
-        #)
-        section.routing.use_router(router_tuntap)
-        if 0:
-            router_forkpty = section.routing.routers.forkpty(
-                on=AsyncPath(wsgi_app.run_dir) / f"{wsgi_app.service_id}-forkptyrouter.socket",
-                undeferred=True
-            ).set_basic_params(
-                run_command="/bin/zsh"
-            ).set_connections_params(
-                timeout_socket=13
-            ).set_window_params(cols=10, rows=15)
-
-            section.routing.use_router(router_forkpty)
-
-        #; bring up loopback
-        #exec-as-root = ifconfig lo up
-        section.main_process.run_command_on_event(
-            command="ifconfig lo up",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        # bring up interface uwsgi0
-        #exec-as-root = ifconfig uwsgi0 192.168.0.2 netmask 255.255.255.0 up
-        section.main_process.run_command_on_event(
-            command=f"ifconfig {wsgi_app_device.name} {wsgi_app_device.ip} netmask {wsgi_app_device.netmask} up",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        # and set the default gateway
-        #exec-as-root = route add default gw 192.168.0.1
-        section.main_process.run_command_on_event(
-            command=f"route add default gw {tuntap_router.ip}",
-            phase=section.main_process.phases.PRIV_DROP_PRE
-        )
-        section.main_process.run_command_on_event(
-            command=f"ping -c 1 {tuntap_router.ip}",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        section.main_process.run_command_on_event(
-            command="route -n",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
-        section.main_process.run_command_on_event(
-            command="ping -c 1 8.8.8.8",
-            phase=section.main_process.phases.PRIV_DROP_PRE,
-        )
+            router_tuntap = section.routing.routers.tuntap().device_connect(
+                device_name=wsgi_app_device.name,
+                socket=tuntap_router.socket_address,
+            )
+            #.device_add_rule(
+            #    direction="in",
+            #    action="route",
+            #    src=tuntap_router.ip,
+            #    dst=http_router_tuntap_device.ip,
+            #    target="10.20.30.40:5060",
+            #)
+            section.routing.use_router(router_tuntap)
+            if 0:
+                router_forkpty = section.routing.routers.forkpty(
+                    on=AsyncPath(wsgi_app.run_dir) / f"{wsgi_app.service_id}-forkptyrouter.socket",
+                    undeferred=True
+                ).set_basic_params(
+                    run_command="/bin/zsh"
+                ).set_connections_params(
+                    timeout_socket=13
+                ).set_window_params(cols=10, rows=15)
+
+                section.routing.use_router(router_forkpty)
+
+            #; bring up loopback
+            #exec-as-root = ifconfig lo up
+            section.main_process.run_command_on_event(
+                command="ifconfig lo up",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            # bring up interface uwsgi0
+            #exec-as-root = ifconfig uwsgi0 192.168.0.2 netmask 255.255.255.0 up
+            section.main_process.run_command_on_event(
+                command=f"ifconfig {wsgi_app_device.name} {wsgi_app_device.ip} netmask {wsgi_app_device.netmask} up",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            # and set the default gateway
+            #exec-as-root = route add default gw 192.168.0.1
+            section.main_process.run_command_on_event(
+                command=f"route add default gw {tuntap_router.ip}",
+                phase=section.main_process.phases.PRIV_DROP_PRE
+            )
+            section.main_process.run_command_on_event(
+                command=f"ping -c 1 {tuntap_router.ip}",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            section.main_process.run_command_on_event(
+                command="route -n",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
+            section.main_process.run_command_on_event(
+                command="ping -c 1 8.8.8.8",
+                phase=section.main_process.phases.PRIV_DROP_PRE,
+            )
 
-        #if not all([
-        #    http_router.subscription_server_address.exists(),
-        #    http_router.subscription_server_address.is_socket()]):
-        #    raise Exception("http router subscription server is not available")
+            #if not all([
+            #    http_router.subscription_server_address.exists(),
+            #    http_router.subscription_server_address.is_socket()]):
+            #    raise Exception("http router subscription server is not available")
 
-        section.subscriptions.subscribe(
-            server=http_router.subscription_server_address,
-            address=str(wsgi_app.socket_address),  # address and port of wsgi app
-            key=f"{wsgi_app.name}.pikesquares.dev",
-        )
-        section.subscriptions.set_server_params(
-            client_notify_address=wsgi_app.subscription_notify_socket,
-        )
+            section.subscriptions.subscribe(
+                server=http_router.subscription_server_address,
+                address=str(wsgi_app.socket_address),  # address and port of wsgi app
+                key=f"{wsgi_app.name}.pikesquares.dev",
+            )
+            section.subscriptions.set_server_params(
+                client_notify_address=wsgi_app.subscription_notify_socket,
+            )
 
-        #section._set("env","REQUESTS_CA_BUNDLE=/var/lib/pikesquares/pikesquares-ca.pem")
-        section._set("pythonpath", app_codebase.repo_dir)
+            #section._set("env","REQUESTS_CA_BUNDLE=/var/lib/pikesquares/pikesquares-ca.pem")
+            section._set("pythonpath", app_codebase.repo_dir)
+            section._set("notify-socket", str(wsgi_app.notify_socket))
+            return section
 
         #try:
         #    _ = await wsgi_app.read_stats()
@@ -266,21 +364,26 @@ async def wsgi_app_up(
         project_zmq_monitor_address  = project_zmq_monitor.zmq_address
         #print(f"launching wsgi app in {project_zmq_monitor.zmq_address}")
 
-        await create_or_restart_instance(
-            project_zmq_monitor_address,
-            f"{wsgi_app.service_id}.ini",
-            section.as_configuration().format(do_print=False),
+        uwsgi_config = render_cache.render(
+            wsgi_app,
+            WsgiAppSection,
+            related=[app_codebase, tuntap_router, wsgi_app_device, http_router],
+            build=build_section,
         )
+        vassal_config_hash = config_hash(uwsgi_config)
+        if running and not force and not await uow.vassal_configs.changed(wsgi_app.service_id, vassal_config_hash):
+            logger.info(f"wsgi app {wsgi_app.service_id} is running with an unchanged config")
+            return True
+
+        launched = await launch_instance(wsgi_app, project_zmq_monitor_address, project.stats_address, uwsgi_config)
         #await project.zmq_monitor.create_or_restart_instance(f"{wsgi_app.service_id}.ini", wsgi_app, project.zmq_monitor)
 
     except Exception as exc:
         logger.error("failed provisioning Python App")
         raise exc
 
-    stats = None
-    while not stats:
-        try:
-            return await wsgi_app.read_stats()
-        except tenacity.RetryError:
-            break
+    if not launched:
+        return None
+    await uow.vassal_configs.record(wsgi_app.service_id, vassal_config_hash)
+    return True
 
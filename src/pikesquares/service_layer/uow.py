@@ -26,6 +26,8 @@ from pikesquares.adapters.repositories import (
     PythonAppRuntimeRepository,
     PythonAppCodebaseRepositoryBase,
     PythonAppCodebaseRepository,
+    VassalConfigRepositoryBase,
+    VassalConfigRepository,
 )
 
 # logger = logging.getLogger("uvicorn.error")
@@ -49,6 +51,7 @@ class UnitOfWorkBase(ABC):
     attached_daemons: AttachedDaemonRepositoryBase
     python_app_runtimes: PythonAppRuntimeRepositoryBase
     python_app_codebases: PythonAppCodebaseRepositoryBase
+    vassal_configs: VassalConfigRepositoryBase
 
     async def __aenter__(self):
         return self
@@ -89,6 +92,7 @@ class UnitOfWork(UnitOfWorkBase):
         self.attached_daemons = AttachedDaemonRepository(self._session)
         self.python_app_runtimes = PythonAppRuntimeRepository(self._session)
         self.python_app_codebases = PythonAppCodebaseRepository(self._session)
+        self.vassal_configs = VassalConfigRepository(self._session)
         return await super().__aenter__()
 
     async def __aexit__(self, *args):
@@ -0,0 +1,171 @@
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares.services.data import AppStats
+from pikesquares.services.master_fifo import write_master_fifo
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+SCALE_UP = "+"
+SCALE_DOWN = "-"
+
+
+class ScalePolicy(pydantic.BaseModel):
+    """
+    When to add or remove a worker of an app running in cheaper mode.
+
+    A signal has to hold for `up_after` (or `down_after`) consecutive
+    observations before anything changes, and changes of the same app
+    are at least `cooldown` seconds apart.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    min_workers: int = 1
+    # requests waiting in the listen queue
+    up_listen_queue: int = 1
+    # busy/active workers
+    up_busy_ratio: float = 0.8
+    down_busy_ratio: float = 0.3
+    # average response time in microseconds, None to ignore it
+    up_avg_rt: int | None = None
+    up_after: int = 2
+    down_after: int = 6
+    cooldown: float = 30.0
+
+
+class ScaleDecision(pydantic.BaseModel):
+    service_id: str
+    command: str
+    workers: int
+    reason: str
+
+
+def active_workers(stats: AppStats) -> int:
+    """workers that are not cheaped, cheaped ones still show up in the stats"""
+    return sum(1 for worker in stats.workers if worker.status != "cheap")
+
+
+def busy_workers(stats: AppStats) -> int:
+    return sum(1 for worker in stats.workers if worker.status == "busy")
+
+
+class AppScaleState:
+    __slots__ = ("up_streak", "down_streak", "last_change")
+
+    def __init__(self):
+        self.up_streak = 0
+        self.down_streak = 0
+        self.last_change = 0.0
+
+
+class Autoscaler:
+    """
+    Grows and shrinks the workers of wsgi apps through the master fifo.
+
+    Apps are configured with the manual cheaper algorithm, their worker
+    slots being the ceiling. All apps of the device together never run
+    more than `device_max_workers` workers, the app with the longest
+    listen queue gets a free worker first.
+    """
+
+    def __init__(
+        self,
+        policy: ScalePolicy | None = None,
+        policies: dict[str, ScalePolicy] | None = None,
+        device_max_workers: int | None = None,
+        write: Callable[[Path, str], bool] = write_master_fifo,
+    ):
+        self.policy = policy or ScalePolicy()
+        self.policies = policies or {}
+        self.device_max_workers = device_max_workers or 2 * (os.cpu_count() or 1)
+        self.write = write
+        self.states: dict[str, AppScaleState] = {}
+
+    def policy_for(self, service_id: str) -> ScalePolicy:
+        return self.policies.get(service_id, self.policy)
+
+    def signal(self, stats: AppStats, policy: ScalePolicy) -> tuple[int, str]:
+        """+1 to grow, -1 to shrink, 0 to hold, and why"""
+        active = active_workers(stats)
+        if not active:
+            return 0, ""
+        busy_ratio = busy_workers(stats) / active
+        if stats.listen_queue >= policy.up_listen_queue:
+            return 1, f"listen queue {stats.listen_queue}"
+        if busy_ratio >= policy.up_busy_ratio:
+            return 1, f"{busy_ratio:.0%} workers busy"
+        if policy.up_avg_rt:
+            avg_rt = sum(w.avg_rt for w in stats.workers if w.status != "cheap") / active
+            if avg_rt >= policy.up_avg_rt:
+                return 1, f"avg response time {avg_rt / 1000:.0f}ms"
+        if busy_ratio <= policy.down_busy_ratio:
+            return -1, f"{busy_ratio:.0%} workers busy"
+        return 0, ""
+
+    def observe_fleet(self, snapshot: "FleetStats") -> list[ScaleDecision]:
+        """observe every wsgi app of a snapshot, returns the scaling commands that were sent"""
+        timestamp = snapshot.collected_at or time.time()
+        for service_id in [s for s in self.states if s not in snapshot.wsgi_apps]:
+            del self.states[service_id]
+
+        total = sum(active_workers(stats) for stats in snapshot.wsgi_apps.values())
+        grow, shrink = [], []
+        for service_id, stats in snapshot.wsgi_apps.items():
+            policy = self.policy_for(service_id)
+            state = self.states.get(service_id)
+            if state is None:
+                state = self.states[service_id] = AppScaleState()
+            direction, reason = self.signal(stats, policy)
+            state.up_streak = state.up_streak + 1 if direction > 0 else 0
+            state.down_streak = state.down_streak + 1 if direction < 0 else 0
+            if timestamp - state.last_change < policy.cooldown:
+                continue
+
+            active = active_workers(stats)
+            if state.up_streak >= policy.up_after and active < len(stats.workers):
+                grow.append((stats.listen_queue, service_id, active + 1, reason))
+            elif state.down_streak >= policy.down_after and active > policy.min_workers:
+                shrink.append((service_id, active - 1, reason))
+
+        decisions = []
+        # shrink first, so the freed workers can go to the apps that need them
+        for service_id, workers, reason in shrink:
+            if self.send(snapshot, service_id, SCALE_DOWN, workers, reason, timestamp, decisions):
+                total -= 1
+        for _, service_id, workers, reason in sorted(grow, reverse=True):
+            if total >= self.device_max_workers:
+                logger.info(f"not growing {service_id}: device is at its cap of {self.device_max_workers} workers")
+                break
+            if self.send(snapshot, service_id, SCALE_UP, workers, reason, timestamp, decisions):
+                total += 1
+        return decisions
+
+    def send(
+        self,
+        snapshot: "FleetStats",
+        service_id: str,
+        command: str,
+        workers: int,
+        reason: str,
+        timestamp: float,
+        decisions: list[ScaleDecision],
+    ) -> bool:
+        fifo_file = snapshot.master_fifos.get(service_id)
+        if not fifo_file or not self.write(fifo_file, command):
+            return False
+        logger.info(f"scaling {service_id} to {workers} workers: {reason}")
+        state = self.states[service_id]
+        state.up_streak = state.down_streak = 0
+        state.last_change = timestamp
+        decisions.append(ScaleDecision(service_id=service_id, command=command, workers=workers, reason=reason))
+        return True
@@ -0,0 +1,156 @@
+import asyncio
+from pathlib import Path
+
+import pydantic
+import structlog
+
+from pikesquares import services
+from pikesquares.exceptions import VassalBlacklistedError
+from pikesquares.services.data import DeviceAppStats, DeviceStats
+from pikesquares.services.stats import read_stats_socket
+
+logger = structlog.get_logger()
+
+DEFAULT_POLL_INTERVAL = 0.25
+
+
+def vassal_generation(vassal: DeviceAppStats) -> tuple[int, int, int, int]:
+    """changes whenever the emperor (re)spawns or reloads the vassal"""
+    return vassal.pid, vassal.born, vassal.last_mod, vassal.last_ready
+
+
+def blacklist_attempt(entry) -> tuple:
+    if isinstance(entry, dict):
+        return entry.get("attempt"), entry.get("last_attempt")
+    return ()
+
+
+def blacklist_id(entry) -> str | None:
+    return entry.get("id") if isinstance(entry, dict) else entry
+
+
+class PendingLaunch:
+    __slots__ = ("name", "future", "generation", "blacklisted")
+
+    def __init__(self, name: str, future: asyncio.Future, generation: tuple | None, blacklisted: tuple | None):
+        self.name = name
+        self.future = future
+        # what the emperor reported before the touch, so an old instance is not taken for the new one
+        self.generation = generation
+        self.blacklisted = blacklisted
+
+
+class VassalLaunches:
+    """
+    Confirms vassal launches from the stats of the emperor running them.
+
+    A launch is confirmed once its vassal shows up in `DeviceStats.vassals`
+    ready and accepting, with a pid, spawn or reload time different from
+    what the emperor reported before the config was pushed. A vassal
+    going into the emperor blacklist fails its launch.
+
+    All pending launches of an emperor share one poller, so bringing up
+    many vassals at once costs one stats read per `poll_interval`.
+    """
+
+    def __init__(self, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.pending: dict[str, list[PendingLaunch]] = {}
+        self.pollers: dict[str, asyncio.Task] = {}
+
+    async def read(self, emperor_stats_address: str) -> DeviceStats | None:
+        try:
+            return await read_stats_socket(emperor_stats_address, DeviceStats, cache=None)
+        except (OSError, pydantic.ValidationError) as exc:
+            logger.debug(f"emperor stats @ {emperor_stats_address} not available: {exc}")
+            return None
+
+    async def expect(self, emperor_stats_address: Path | str, name: str) -> asyncio.Future:
+        """
+        register a launch of vassal `name`, call it before pushing the config
+
+        the future resolves to the DeviceAppStats of the running vassal.
+        """
+        address = str(emperor_stats_address)
+        generation = blacklisted = None
+        stats = await self.read(address)
+        if stats:
+            vassal = next((v for v in stats.vassals if v.id == name), None)
+            generation = vassal_generation(vassal) if vassal else None
+            entry = next((e for e in stats.blacklist if blacklist_id(e) == name), None)
+            blacklisted = blacklist_attempt(entry) if entry is not None else None
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(address, []).append(PendingLaunch(name, future, generation, blacklisted))
+        poller = self.pollers.get(address)
+        if poller is None or poller.done():
+            self.pollers[address] = asyncio.ensure_future(self.poll(address))
+        return future
+
+    def check(self, stats: DeviceStats, launches: list[PendingLaunch]) -> list[PendingLaunch]:
+        """settle what `stats` tells about each launch, returns the ones still pending"""
+        vassals = {vassal.id: vassal for vassal in stats.vassals}
+        blacklist = {blacklist_id(entry): entry for entry in stats.blacklist}
+        still_pending = []
+        for launch in launches:
+            if launch.future.done():
+                continue
+            entry = blacklist.get(launch.name)
+            if entry is not None and blacklist_attempt(entry) != launch.blacklisted:
+                launch.future.set_exception(
+                    VassalBlacklistedError(f"vassal {launch.name} was blacklisted by the emperor: {entry}")
+                )
+                continue
+            vassal = vassals.get(launch.name)
+            if (
+                vassal
+                and vassal.ready
+                and vassal.accepting
+                and vassal_generation(vassal) != launch.generation
+            ):
+                launch.future.set_result(vassal)
+                continue
+            still_pending.append(launch)
+        return still_pending
+
+    async def poll(self, address: str) -> None:
+        try:
+            while True:
+                launches = [launch for launch in self.pending.get(address, []) if not launch.future.done()]
+                if not launches:
+                    break
+                stats = await self.read(address)
+                if stats:
+                    launches = self.check(stats, launches)
+                # launches may have been added while reading
+                added = [launch for launch in self.pending.get(address, []) if launch not in launches]
+                self.pending[address] = launches + [launch for launch in added if not launch.future.done()]
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.pending.pop(address, None)
+            if self.pollers.get(address) is asyncio.current_task():
+                del self.pollers[address]
+
+    def close(self) -> None:
+        for poller in self.pollers.values():
+            poller.cancel()
+        for launches in self.pending.values():
+            for launch in launches:
+                launch.future.cancel()
+        self.pollers.clear()
+        self.pending.clear()
+
+
+vassal_launches = VassalLaunches()
+
+
+async def register_vassal_launches(context: dict) -> None:
+    async def vassal_launches_factory() -> VassalLaunches:
+        return vassal_launches
+
+    services.register_factory(
+        context,
+        VassalLaunches,
+        vassal_launches_factory,
+        on_registry_close=vassal_launches.close,
+    )
@@ -0,0 +1,63 @@
+import asyncio
+import errno
+import socket
+from collections.abc import Hashable, Mapping
+from pathlib import Path
+
+import structlog
+
+logger = structlog.get_logger()
+
+DEFAULT_TIMEOUT_MS = 50
+
+# errors meaning nothing is listening, no point in waiting for the timeout
+NOT_LISTENING = (errno.ENOENT, errno.ECONNREFUSED, errno.ENOTSOCK, errno.ECONNRESET)
+
+
+def _address_family(address: Path | str) -> tuple[socket.AddressFamily, str | tuple[str, int]]:
+    address = str(address)
+    if not address.startswith("/") and ":" in address:
+        host, port = address.rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+async def probe(address: Path | str, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> bool:
+    """
+    connect-only liveness check of a unix socket path or a host:port address
+
+    nothing is read from the socket. a missing socket file or a refused
+    connection fail immediately, a hung listener fails after `timeout_ms`.
+    """
+    family, sockaddr = _address_family(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        async with asyncio.timeout(timeout_ms / 1000):
+            await asyncio.get_running_loop().sock_connect(sock, sockaddr)
+        return True
+    except TimeoutError:
+        logger.debug(f"liveness probe @ {address} timed out after {timeout_ms}ms")
+        return False
+    except OSError as exc:
+        if exc.errno not in NOT_LISTENING:
+            logger.debug(f"liveness probe @ {address} failed: {exc}")
+        return False
+    finally:
+        sock.close()
+
+
+async def probe_many(
+    addresses: Mapping[Hashable, Path | str],
+    timeout_ms: int = DEFAULT_TIMEOUT_MS,
+) -> dict[Hashable, bool]:
+    """probe many addresses in parallel, keyed like `addresses`"""
+    keys = list(addresses)
+    results = await asyncio.gather(
+        *(probe(addresses[key], timeout_ms) for key in keys)
+    )
+    return dict(zip(keys, results, strict=True))
+
+
+def service_status(is_alive: bool) -> str:
+    return "running" if is_alive else "stopped"
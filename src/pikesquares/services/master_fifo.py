@@ -0,0 +1,47 @@
+import errno
+import os
+from pathlib import Path
+
+import structlog
+
+logger = structlog.get_logger()
+
+# see ServiceBase.write_master_fifo for what each command does
+MASTER_FIFO_COMMANDS = frozenset("0123456789+-BCcEflLpPQqRrSsWw")
+
+
+def write_master_fifo(fifo_file: Path | str | None, command: str) -> bool:
+    """
+    write a command to a uWSGI master fifo
+
+    the fifo is opened non-blocking, so a master that is not running
+    fails right away instead of hanging the caller. returns False
+    when the command could not be delivered.
+    """
+    if command not in MASTER_FIFO_COMMANDS:
+        logger.warning(f"unknown master fifo command '{command}'")
+        return False
+
+    if not fifo_file or not Path(fifo_file).exists():
+        logger.warning(f"invalid fifo file @ {fifo_file}")
+        return False
+
+    try:
+        fd = os.open(fifo_file, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError as exc:
+        if exc.errno == errno.ENXIO:
+            logger.warning(f"no uWSGI master reading fifo @ {fifo_file}")
+        else:
+            logger.warning(f"unable to open fifo @ {fifo_file}: {exc}")
+        return False
+
+    try:
+        os.write(fd, command.encode())
+    except OSError as exc:
+        logger.warning(f"unable to write to fifo @ {fifo_file}: {exc}")
+        return False
+    finally:
+        os.close(fd)
+
+    logger.info(f"[pikesquares-services] : sent command [{command}] to master fifo @ {fifo_file}")
+    return True
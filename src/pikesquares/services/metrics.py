@@ -0,0 +1,283 @@
+import math
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+import structlog
+
+from pikesquares import services
+from pikesquares.services.data import AppStats, RouterStats
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+# (service_id, worker_id, metric)
+# app level metrics use worker_id 0, router nodes are keyed
+# by "<subscription key>|<node name>"
+SeriesKey = tuple[str, int | str, str]
+
+APP_METRICS = ("listen_queue", "listen_queue_errors")
+WORKER_METRICS = ("requests", "exceptions", "rss", "avg_rt", "harakiri_count")
+ROUTER_SUBSCRIPTION_METRICS = ("hits",)
+ROUTER_NODE_METRICS = ("requests", "load", "failcnt")
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def percentile(sorted_values: array | list, pct: float) -> int | None:
+    """nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class RingBuffer:
+    """
+    Fixed size series of (timestamp ms, value) samples.
+
+    Two preallocated array('q') buffers, so a series always takes
+    16 bytes per slot regardless of how many samples were recorded.
+    """
+
+    __slots__ = ("capacity", "timestamps", "values", "_next", "_count")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.values = array("q", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.timestamps) + len(self.values)) * self.values.itemsize
+
+    def append(self, timestamp: int, value: int) -> None:
+        self.timestamps[self._next] = timestamp
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def ordered(self) -> tuple[array, array]:
+        """samples oldest first"""
+        if self._count < self.capacity:
+            return self.timestamps[: self._count], self.values[: self._count]
+        return (
+            self.timestamps[self._next :] + self.timestamps[: self._next],
+            self.values[self._next :] + self.values[: self._next],
+        )
+
+    def window(self, since: int) -> tuple[array, array]:
+        """samples with a timestamp >= since, oldest first"""
+        timestamps, values = self.ordered()
+        start = bisect_left(timestamps, since)
+        return timestamps[start:], values[start:]
+
+    def last(self) -> tuple[int, int] | None:
+        if not self._count:
+            return None
+        idx = (self._next - 1) % self.capacity
+        return self.timestamps[idx], self.values[idx]
+
+
+def counter_increase(values: array) -> int:
+    """increase of a monotonic counter, tolerating resets on worker respawn"""
+    total = 0
+    previous = None
+    for value in values:
+        if previous is not None:
+            total += value - previous if value >= previous else value
+        previous = value
+    return total
+
+
+def app_samples(stats: AppStats) -> Iterator[tuple[int, str, int]]:
+    """(worker_id, metric, value) of every tracked app and worker metric"""
+    for metric in APP_METRICS:
+        yield 0, metric, getattr(stats, metric)
+    for worker in stats.workers:
+        for metric in WORKER_METRICS:
+            yield worker.id, metric, getattr(worker, metric)
+
+
+def router_samples(stats: RouterStats) -> Iterator[tuple[str, str, int]]:
+    """(worker_id, metric, value) of every tracked subscription and node metric"""
+    for subscription in stats.subscriptions:
+        for metric in ROUTER_SUBSCRIPTION_METRICS:
+            yield subscription.key, metric, getattr(subscription, metric)
+        for node in subscription.nodes:
+            node_id = f"{subscription.key}|{node.name}"
+            for metric in ROUTER_NODE_METRICS:
+                yield node_id, metric, getattr(node, metric)
+
+
+def fleet_samples(snapshot: "FleetStats") -> Iterator[tuple[int, str, int | str, str, int]]:
+    """(timestamp, service_id, worker_id, metric, value) of a whole stats snapshot"""
+    timestamp = int(snapshot.collected_at * 1000) or now_ms()
+    for service_id, app_stats in (snapshot.wsgi_apps | snapshot.attached_daemons).items():
+        for worker_id, metric, value in app_samples(app_stats):
+            yield timestamp, service_id, worker_id, metric, value
+    for service_id, router_stats in snapshot.http_routers.items():
+        for worker_id, metric, value in router_samples(router_stats):
+            yield timestamp, service_id, worker_id, metric, value
+
+
+class MetricsStore:
+    """
+    In-memory time-series of worker, app and router metrics.
+
+    Every (service_id, worker_id, metric) series is a RingBuffer of
+    `capacity` samples, and at most `max_series` series are kept, so
+    memory use is bounded by `capacity * max_series * 16` bytes.
+    """
+
+    def __init__(self, capacity: int = 360, max_series: int = 10_000):
+        self.capacity = capacity
+        self.max_series = max_series
+        self.series: dict[SeriesKey, RingBuffer] = {}
+        # (service_id, metric) -> series of every worker
+        self._by_metric: dict[tuple[str, str], list[RingBuffer]] = {}
+        self.dropped_series = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buf.nbytes for buf in self.series.values())
+
+    def record(
+        self,
+        service_id: str,
+        metric: str,
+        value: int,
+        worker_id: int | str = 0,
+        timestamp: int | None = None,
+    ) -> None:
+        key = (service_id, worker_id, metric)
+        try:
+            buf = self.series[key]
+        except KeyError:
+            if len(self.series) >= self.max_series:
+                if not self.dropped_series:
+                    logger.warning(f"metrics store is full ({self.max_series} series). dropping new series.")
+                self.dropped_series += 1
+                return
+            buf = self.series[key] = RingBuffer(self.capacity)
+            self._by_metric.setdefault((service_id, metric), []).append(buf)
+        buf.append(now_ms() if timestamp is None else timestamp, value)
+
+    def record_app_stats(self, service_id: str, stats: AppStats, timestamp: int | None = None) -> None:
+        timestamp = now_ms() if timestamp is None else timestamp
+        for worker_id, metric, value in app_samples(stats):
+            self.record(service_id, metric, value, worker_id, timestamp)
+
+    def record_router_stats(self, service_id: str, stats: RouterStats, timestamp: int | None = None) -> None:
+        timestamp = now_ms() if timestamp is None else timestamp
+        for worker_id, metric, value in router_samples(stats):
+            self.record(service_id, metric, value, worker_id, timestamp)
+
+    def record_fleet_stats(self, snapshot: "FleetStats") -> None:
+        for timestamp, service_id, worker_id, metric, value in fleet_samples(snapshot):
+            self.record(service_id, metric, value, worker_id, timestamp)
+
+    def forget(self, service_id: str) -> None:
+        for key in [key for key in self.series if key[0] == service_id]:
+            del self.series[key]
+            self._by_metric.pop((service_id, key[2]), None)
+
+    def select(self, service_id: str, metric: str, worker_id: int | str | None = None) -> list[RingBuffer]:
+        """every series of a metric for a service, or the series of one worker"""
+        if worker_id is not None:
+            buf = self.series.get((service_id, worker_id, metric))
+            return [buf] if buf else []
+        return self._by_metric.get((service_id, metric), [])
+
+    def delta(
+        self,
+        service_id: str,
+        metric: str,
+        window: float = 60,
+        worker_id: int | str | None = None,
+    ) -> int:
+        """counter increase over the last `window` seconds, summed over workers"""
+        since = now_ms() - int(window * 1000)
+        return sum(
+            counter_increase(buf.window(since)[1])
+            for buf in self.select(service_id, metric, worker_id)
+        )
+
+    def rate(
+        self,
+        service_id: str,
+        metric: str = "requests",
+        window: float = 60,
+        worker_id: int | str | None = None,
+    ) -> float:
+        """per second increase over the last `window` seconds"""
+        since = now_ms() - int(window * 1000)
+        increase = 0
+        span_ms = 0
+        for buf in self.select(service_id, metric, worker_id):
+            timestamps, values = buf.window(since)
+            if len(timestamps) < 2:
+                continue
+            increase += counter_increase(values)
+            span_ms = max(span_ms, timestamps[-1] - timestamps[0])
+        if not span_ms:
+            return 0.0
+        return increase / (span_ms / 1000)
+
+    def percentiles(
+        self,
+        service_id: str,
+        metric: str = "avg_rt",
+        window: float = 60,
+        pcts: Iterable[float] = (50, 95, 99),
+        worker_id: int | str | None = None,
+    ) -> dict[float, int | None]:
+        since = now_ms() - int(window * 1000)
+        samples = array("q")
+        for buf in self.select(service_id, metric, worker_id):
+            samples.extend(buf.window(since)[1])
+        ordered = sorted(samples)
+        return {pct: percentile(ordered, pct) for pct in pcts}
+
+    def max(
+        self,
+        service_id: str,
+        metric: str = "listen_queue",
+        window: float = 60,
+        worker_id: int | str | None = None,
+    ) -> int | None:
+        since = now_ms() - int(window * 1000)
+        peaks = [
+            max(values) for buf in self.select(service_id, metric, worker_id)
+            if (values := buf.window(since)[1])
+        ]
+        return max(peaks) if peaks else None
+
+
+async def register_metrics_store(context: dict) -> None:
+
+    async def metrics_store_factory(svcs_container) -> MetricsStore:
+        from pikesquares.conf import AppConfig
+
+        conf = await svcs_container.aget(AppConfig)
+        return MetricsStore(
+            capacity=conf.METRICS_CAPACITY,
+            max_series=conf.METRICS_MAX_SERIES,
+        )
+
+    services.register_factory(
+        context,
+        MetricsStore,
+        metrics_store_factory,
+    )
@@ -0,0 +1,444 @@
+import asyncio
+import math
+import time
+from array import array
+from collections.abc import AsyncGenerator, Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import aiosqlite
+import pydantic
+import structlog
+
+from pikesquares import services
+from pikesquares.services.metrics import fleet_samples, now_ms
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+RAW = 0
+# rollup resolutions in seconds, each one is rolled up from the previous one
+RESOLUTIONS = (60, 300, 3600)
+# seconds of history kept per resolution, RAW are the samples as collected
+DEFAULT_RETENTION = {
+    RAW: 6 * 3600,
+    60: 2 * 86400,
+    300: 14 * 86400,
+    3600: 180 * 86400,
+}
+# queries read the finest resolution that answers them in at most this many buckets
+MAX_QUERY_BUCKETS = 1440
+DELETE_CHUNK_SIZE = 5000
+
+# log-scale histogram, a bucket spans 10% so percentiles are within ~5%
+HISTOGRAM_BASE = 1.1
+_LOG_BASE = math.log(HISTOGRAM_BASE)
+_COUNT_BITS = 40
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts INTEGER NOT NULL,
+    service_id TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    service_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    sum INTEGER NOT NULL,
+    min INTEGER NOT NULL,
+    max INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    histogram BLOB NOT NULL,
+    PRIMARY KEY (resolution, service_id, metric, worker_id, bucket)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_rollups_bucket ON rollups (resolution, bucket);
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    resolution INTEGER PRIMARY KEY,
+    watermark INTEGER NOT NULL
+);
+"""
+
+
+def histogram_index(value: int) -> int:
+    return 0 if value < 1 else 1 + int(math.log(value) / _LOG_BASE)
+
+
+def histogram_value(index: int) -> float:
+    """midpoint of a histogram bucket"""
+    if not index:
+        return 0.0
+    return (HISTOGRAM_BASE ** (index - 1) + HISTOGRAM_BASE**index) / 2
+
+
+def encode_histogram(histogram: dict[int, int]) -> bytes:
+    return array("Q", ((index << _COUNT_BITS) | count for index, count in sorted(histogram.items()))).tobytes()
+
+
+def decode_histogram(blob: bytes) -> dict[int, int]:
+    packed = array("Q")
+    packed.frombytes(blob)
+    mask = (1 << _COUNT_BITS) - 1
+    return {item >> _COUNT_BITS: item & mask for item in packed}
+
+
+class Rollup:
+    """count/sum/min/max/last and a value histogram of one series bucket"""
+
+    __slots__ = ("count", "sum", "min", "max", "last", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = 0
+        self.histogram: dict[int, int] = {}
+
+    def add(self, value: int) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+        index = histogram_index(value)
+        self.histogram[index] = self.histogram.get(index, 0) + 1
+
+    def merge(self, count: int, sum_: int, min_: int, max_: int, last: int, histogram: bytes) -> None:
+        self.count += count
+        self.sum += sum_
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+        self.last = last
+        for index, n in decode_histogram(histogram).items():
+            self.histogram[index] = self.histogram.get(index, 0) + n
+
+    def percentile(self, pct: float) -> float | None:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.histogram):
+            seen += self.histogram[index]
+            if seen >= rank:
+                return min(max(histogram_value(index), self.min), self.max)
+        return float(self.max)
+
+    def row(self) -> tuple:
+        return (self.count, self.sum, self.min, self.max, self.last, encode_histogram(self.histogram))
+
+
+class HistoryAggregate(pydantic.BaseModel):
+    service_id: str
+    metric: str
+    resolution: int
+    count: int
+    avg: float
+    min: int
+    max: int
+    percentiles: dict[float, float | None]
+
+
+class MetricsHistory:
+    """
+    Persistent, downsampled metrics history in its own SQLite file.
+
+    Samples are buffered in memory and written in batches, `rollup` folds
+    them into 1m/5m/1h aggregates and `enforce_retention` deletes expired
+    rows in small chunks so writers are never blocked for long.
+
+    The CLI and the API may write the same file, samples flushed into a
+    bucket that was already rolled up move the watermarks back so the
+    next rollup aggregates the bucket again.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        retention: dict[int, int] | None = None,
+        batch_size: int = 5000,
+        max_buffered: int = 500_000,
+    ):
+        self.path = Path(path)
+        self.retention = DEFAULT_RETENTION | (retention or {})
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self.buffer: list[tuple[int, str, str, str, int]] = []
+        self.dropped_samples = 0
+        self.db: aiosqlite.Connection | None = None
+
+    async def open(self) -> "MetricsHistory":
+        if self.db is None:
+            self.db = await aiosqlite.connect(self.path)
+            # auto_vacuum only takes effect before the first table is created
+            await self.db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await self.db.execute("PRAGMA journal_mode = WAL")
+            await self.db.execute("PRAGMA synchronous = NORMAL")
+            await self.db.executescript(SCHEMA)
+            await self.db.commit()
+        return self
+
+    async def close(self) -> None:
+        if self.db is None:
+            return
+        try:
+            await self.flush()
+        finally:
+            await self.db.close()
+            self.db = None
+
+    def record(self, timestamp: int, service_id: str, worker_id: int | str, metric: str, value: int) -> None:
+        if len(self.buffer) >= self.max_buffered:
+            if not self.dropped_samples:
+                logger.warning(f"metrics history buffer is full ({self.max_buffered} samples). dropping samples.")
+            self.dropped_samples += 1
+            return
+        self.buffer.append((timestamp, service_id, str(worker_id), metric, value))
+
+    def record_fleet_stats(self, snapshot: "FleetStats") -> None:
+        for sample in fleet_samples(snapshot):
+            self.record(*sample)
+
+    async def flush(self, now: int | None = None) -> int:
+        """write buffered samples, `batch_size` rows per executemany"""
+        assert self.db, "metrics history is not open"
+        buffered, self.buffer = self.buffer, []
+        for start in range(0, len(buffered), self.batch_size):
+            await self.db.executemany(
+                "INSERT INTO samples (ts, service_id, worker_id, metric, value) VALUES (?, ?, ?, ?, ?)",
+                buffered[start:start + self.batch_size],
+            )
+        if buffered:
+            await self._reopen_buckets(min(sample[0] for sample in buffered), now)
+        await self.db.commit()
+        return len(buffered)
+
+    async def _reopen_buckets(self, earliest: int, now: int | None = None) -> None:
+        """move the watermarks back to the bucket of `earliest`, if it was rolled up already"""
+        now = now_ms() if now is None else now
+        source = RAW
+        for resolution in RESOLUTIONS:
+            width = resolution * 1000
+            start = earliest // width * width
+            # a bucket is aggregated again only while all of its source rows are kept
+            expired = now - self.retention[source] * 1000
+            if start < expired:
+                start = -(-expired // width) * width
+            await self.db.execute(
+                "UPDATE rollup_watermarks SET watermark = ? WHERE resolution = ? AND watermark > ?",
+                (start, resolution, start),
+            )
+            # coarser buckets change only from the reopened ones on
+            earliest = start
+            source = resolution
+
+    async def _watermark(self, resolution: int) -> int:
+        async with self.db.execute(
+            "SELECT watermark FROM rollup_watermarks WHERE resolution = ?", (resolution,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def _rollup_rows(self, resolution: int, source: int, start: int, end: int):
+        if source == RAW:
+            return await self.db.execute_fetchall(
+                "SELECT service_id, metric, worker_id, ts, value FROM samples "
+                "WHERE ts >= ? AND ts < ? ORDER BY ts",
+                (start, end),
+            )
+        return await self.db.execute_fetchall(
+            "SELECT service_id, metric, worker_id, bucket, count, sum, min, max, last, histogram FROM rollups "
+            "WHERE resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (source, start, end),
+        )
+
+    async def rollup(self, now: int | None = None) -> dict[int, int]:
+        """
+        aggregate every completed bucket since the last rollup
+
+        returns the number of rollup rows written per resolution.
+        """
+        assert self.db, "metrics history is not open"
+        now = now or now_ms()
+        written = {}
+        source = RAW
+        for resolution in RESOLUTIONS:
+            width = resolution * 1000
+            start = await self._watermark(resolution)
+            end = now // width * width
+            if end <= start:
+                written[resolution] = 0
+                source = resolution
+                continue
+
+            rollups: dict[tuple[str, str, str, int], Rollup] = {}
+            for service_id, metric, worker_id, ts, *values in await self._rollup_rows(resolution, source, start, end):
+                key = (service_id, metric, worker_id, ts // width * width)
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = Rollup()
+                if source == RAW:
+                    rollup.add(values[0])
+                else:
+                    rollup.merge(*values)
+
+            await self.db.executemany(
+                "INSERT OR REPLACE INTO rollups "
+                "(resolution, service_id, metric, worker_id, bucket, count, sum, min, max, last, histogram) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(resolution, *key, *rollup.row()) for key, rollup in rollups.items()],
+            )
+            await self.db.execute(
+                "INSERT OR REPLACE INTO rollup_watermarks (resolution, watermark) VALUES (?, ?)",
+                (resolution, end),
+            )
+            await self.db.commit()
+            written[resolution] = len(rollups)
+            source = resolution
+        return written
+
+    async def enforce_retention(self, now: int | None = None, chunk_size: int = DELETE_CHUNK_SIZE) -> int:
+        """delete expired rows `chunk_size` at a time, returns the number of rows deleted"""
+        assert self.db, "metrics history is not open"
+        now = now or now_ms()
+        deleted = 0
+        statements = [
+            (
+                "DELETE FROM samples WHERE rowid IN (SELECT rowid FROM samples WHERE ts < ? LIMIT ?)",
+                (now - self.retention[RAW] * 1000,),
+            )
+        ]
+        for resolution in RESOLUTIONS:
+            statements.append(
+                (
+                    "DELETE FROM rollups WHERE (resolution, service_id, metric, worker_id, bucket) IN ("
+                    "SELECT resolution, service_id, metric, worker_id, bucket FROM rollups "
+                    "WHERE resolution = ? AND bucket < ? LIMIT ?)",
+                    (resolution, now - self.retention[resolution] * 1000),
+                )
+            )
+        for statement, params in statements:
+            while True:
+                cursor = await self.db.execute(statement, (*params, chunk_size))
+                await self.db.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < chunk_size:
+                    break
+                await asyncio.sleep(0)
+        if deleted:
+            await self.db.execute("PRAGMA incremental_vacuum")
+        return deleted
+
+    def resolution_for(self, window: float) -> int:
+        for resolution in RESOLUTIONS:
+            if window / resolution <= MAX_QUERY_BUCKETS and self.retention[resolution] >= window:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    async def aggregate(
+        self,
+        service_id: str,
+        metric: str,
+        window: float = 86400,
+        pcts: Iterable[float] = (50, 95, 99),
+        worker_id: int | str | None = None,
+        resolution: int | None = None,
+        now: int | None = None,
+    ) -> HistoryAggregate | None:
+        """
+        aggregate of a metric over the last `window` seconds, read from the rollups
+
+        e.g. p95 avg_rt of a wsgi app over the last 24h:
+            await history.aggregate(service_id, "avg_rt", 86400, pcts=(95,))
+        """
+        assert self.db, "metrics history is not open"
+        resolution = resolution or self.resolution_for(window)
+        since = (now or now_ms()) - int(window * 1000)
+        query = (
+            "SELECT count, sum, min, max, last, histogram FROM rollups "
+            "WHERE resolution = ? AND service_id = ? AND metric = ? AND bucket >= ?"
+        )
+        params: tuple = (resolution, service_id, metric, since)
+        if worker_id is not None:
+            query += " AND worker_id = ?"
+            params += (str(worker_id),)
+
+        total = Rollup()
+        for row in await self.db.execute_fetchall(query + " ORDER BY bucket", params):
+            total.merge(*row)
+        if not total.count:
+            return None
+        return HistoryAggregate(
+            service_id=service_id,
+            metric=metric,
+            resolution=resolution,
+            count=total.count,
+            avg=total.sum / total.count,
+            min=total.min,
+            max=total.max,
+            percentiles={pct: total.percentile(pct) for pct in pcts},
+        )
+
+    async def series(
+        self,
+        service_id: str,
+        metric: str,
+        window: float = 3600,
+        resolution: int | None = None,
+        now: int | None = None,
+    ) -> list[tuple[int, float]]:
+        """(bucket start, average) points of a metric across workers"""
+        assert self.db, "metrics history is not open"
+        resolution = resolution or self.resolution_for(window)
+        since = (now or now_ms()) - int(window * 1000)
+        rows = await self.db.execute_fetchall(
+            "SELECT bucket, SUM(sum) * 1.0 / SUM(count) FROM rollups "
+            "WHERE resolution = ? AND service_id = ? AND metric = ? AND bucket >= ? "
+            "GROUP BY bucket ORDER BY bucket",
+            (resolution, service_id, metric, since),
+        )
+        return [(bucket, avg) for bucket, avg in rows]
+
+    async def maintain(self) -> None:
+        await self.flush()
+        await self.rollup()
+        await self.enforce_retention()
+
+    async def run(self, interval: float = 60.0) -> None:
+        """flush, roll up and expire history every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            started = time.monotonic()
+            try:
+                await self.maintain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception(exc)
+            logger.debug(f"metrics history maintenance took {time.monotonic() - started:.3f}s")
+
+
+async def register_metrics_history(context: dict) -> None:
+
+    async def metrics_history_factory(svcs_container) -> AsyncGenerator[MetricsHistory, None]:
+        from pikesquares.conf import AppConfig
+
+        conf = await svcs_container.aget(AppConfig)
+        history = MetricsHistory(conf.metrics_db_path, retention=conf.METRICS_HISTORY_RETENTION)
+        await history.open()
+        yield history
+        await history.close()
+
+    services.register_factory(
+        context,
+        MetricsHistory,
+        metrics_history_factory,
+    )
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+import structlog
+
+from pikesquares.services.data import AppStats, DeviceStats, RouterStats
+from pikesquares.services.stats import FleetStats, StatsCollector
+
+logger = structlog.get_logger()
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "pikesquares"
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricFamily:
+    __slots__ = ("name", "type", "help", "unit", "samples")
+
+    def __init__(self, name: str, type: str, help: str, unit: str = ""):
+        self.name = f"{PREFIX}_{name}"
+        self.type = type
+        self.help = help
+        self.unit = unit
+        self.samples: list[str] = []
+
+    def add(self, value: int | float, **labels: str | int) -> None:
+        suffix = "_total" if self.type == "counter" else ""
+        if labels:
+            label_str = ",".join(
+                f'{k}="{escape_label_value(str(v))}"' for k, v in labels.items()
+            )
+            self.samples.append(f"{self.name}{suffix}{{{label_str}}} {value}")
+        else:
+            self.samples.append(f"{self.name}{suffix} {value}")
+
+    def render(self) -> list[str]:
+        if not self.samples:
+            return []
+        lines = [
+            f"# TYPE {self.name} {self.type}",
+            f"# HELP {self.name} {self.help}",
+        ]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        return lines + self.samples
+
+
+class FleetMetrics:
+    """OpenMetrics families for a FleetStats snapshot"""
+
+    def __init__(self):
+        family = MetricFamily
+        self.up = family("up", "gauge", "Whether the stats socket of a service could be read")
+        self.emperor_throttle_level = family("emperor_throttle_level", "gauge", "Emperor throttle level")
+        self.emperor_vassals = family("emperor_vassals", "gauge", "Number of vassals managed by the emperor")
+        self.emperor_blacklist = family("emperor_blacklist", "gauge", "Number of blacklisted vassals")
+        self.vassal_ready = family("vassal_ready", "gauge", "Whether the vassal is ready")
+        self.vassal_accepting = family("vassal_accepting", "gauge", "Whether the vassal accepts requests")
+        self.vassal_respawns = family("vassal_respawns", "counter", "Vassal respawns")
+        self.app_listen_queue = family("app_listen_queue", "gauge", "Listen queue size")
+        self.app_listen_queue_errors = family("app_listen_queue_errors", "counter", "Listen queue overflows")
+        self.worker_requests = family("worker_requests", "counter", "Requests handled by the worker")
+        self.worker_exceptions = family("worker_exceptions", "counter", "Exceptions raised in the worker")
+        self.worker_harakiri = family("worker_harakiri", "counter", "Worker harakiri count")
+        self.worker_rss = family("worker_rss_bytes", "gauge", "Worker resident set size", "bytes")
+        self.worker_avg_rt = family(
+            "worker_avg_rt_microseconds", "gauge", "Worker average response time", "microseconds"
+        )
+        self.router_subscription_hits = family(
+            "router_subscription_hits", "counter", "Requests routed to a subscription key"
+        )
+        self.router_node_load = family("router_node_load", "gauge", "Subscription node load")
+        self.router_node_failcnt = family("router_node_failcnt", "gauge", "Subscription node failures")
+
+    def add_emperor(self, service_id: str, stats: DeviceStats) -> None:
+        self.emperor_throttle_level.add(stats.throttle_level, emperor=service_id)
+        self.emperor_vassals.add(len(stats.vassals), emperor=service_id)
+        self.emperor_blacklist.add(len(stats.blacklist), emperor=service_id)
+        for vassal in stats.vassals:
+            self.vassal_ready.add(vassal.ready, emperor=service_id, vassal=vassal.id)
+            self.vassal_accepting.add(vassal.accepting, emperor=service_id, vassal=vassal.id)
+            self.vassal_respawns.add(vassal.respawns, emperor=service_id, vassal=vassal.id)
+
+    def add_app(self, service_id: str, stats: AppStats) -> None:
+        self.app_listen_queue.add(stats.listen_queue, service_id=service_id)
+        self.app_listen_queue_errors.add(stats.listen_queue_errors, service_id=service_id)
+        for worker in stats.workers:
+            labels = {"service_id": service_id, "worker": worker.id}
+            self.worker_requests.add(worker.requests, **labels)
+            self.worker_exceptions.add(worker.exceptions, **labels)
+            self.worker_harakiri.add(worker.harakiri_count, **labels)
+            self.worker_rss.add(worker.rss, **labels)
+            self.worker_avg_rt.add(worker.avg_rt, **labels)
+
+    def add_router(self, service_id: str, stats: RouterStats) -> None:
+        for subscription in stats.subscriptions:
+            self.router_subscription_hits.add(
+                subscription.hits, service_id=service_id, key=subscription.key
+            )
+            for node in subscription.nodes:
+                labels = {"service_id": service_id, "key": subscription.key, "node": node.name}
+                self.router_node_load.add(node.load, **labels)
+                self.router_node_failcnt.add(node.failcnt, **labels)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in vars(self).values():
+            lines.extend(family.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def render_openmetrics(snapshot: FleetStats) -> str:
+    metrics = FleetMetrics()
+    if snapshot.device and snapshot.device_service_id:
+        metrics.up.add(1, service_id=snapshot.device_service_id)
+        metrics.add_emperor(snapshot.device_service_id, snapshot.device)
+    for service_id, device_stats in snapshot.projects.items():
+        metrics.up.add(1, service_id=service_id)
+        metrics.add_emperor(service_id, device_stats)
+    for service_id, app_stats in (snapshot.wsgi_apps | snapshot.attached_daemons).items():
+        metrics.up.add(1, service_id=service_id)
+        metrics.add_app(service_id, app_stats)
+    for service_id, router_stats in snapshot.http_routers.items():
+        metrics.up.add(1, service_id=service_id)
+        metrics.add_router(service_id, router_stats)
+    for service_id in snapshot.tuntap_routers:
+        metrics.up.add(1, service_id=service_id)
+    for service_id in [*snapshot.unavailable, *snapshot.invalid]:
+        metrics.up.add(0, service_id=service_id)
+    return metrics.render()
+
+
+class MetricsExporter:
+    """
+    Serves the OpenMetrics exposition of the last stats collection.
+
+    Collection and rendering happen in `run`, every `interval` seconds,
+    so a scrape never touches the stats sockets. Each snapshot is also
+    handed to the `on_refresh` callbacks.
+    """
+
+    def __init__(
+        self,
+        collector: StatsCollector,
+        collect: Callable[[StatsCollector], Awaitable[FleetStats | None]],
+        interval: float = 10.0,
+        on_refresh: list[Callable[[FleetStats], object]] | None = None,
+    ):
+        self.collector = collector
+        self.collect = collect
+        self.interval = interval
+        self.on_refresh = on_refresh or []
+        self.snapshot: FleetStats | None = None
+        self.rendered = "# EOF\n"
+        self.refreshed_at = 0.0
+
+    async def refresh(self) -> None:
+        snapshot = await self.collect(self.collector)
+        if snapshot is None:
+            return
+        self.snapshot = snapshot
+        self.rendered = render_openmetrics(snapshot)
+        self.refreshed_at = time.time()
+        for callback in self.on_refresh:
+            callback(snapshot)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception(exc)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,143 @@
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares.services.data import AppStats
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+QUEUE_HIGH = "listen_queue_high"
+QUEUE_ERRORS = "listen_queue_errors"
+RECOVERED = "listen_queue_recovered"
+
+
+class OverloadEvent(pydantic.BaseModel):
+    service_id: str
+    kind: str
+    listen_queue: int
+    max_queue: int
+    fill: float
+    new_errors: int = 0
+    timestamp: float
+
+
+class AppLoad(pydantic.BaseModel):
+    service_id: str
+    saturated: bool = False
+    listen_queue: int = 0
+    max_queue: int = 0
+    fill: float = 0.0
+    listen_queue_errors: int = 0
+    # since when the app has been saturated
+    saturated_since: float | None = None
+
+
+def queue_fill(stats: AppStats) -> tuple[int, int, float]:
+    """(queued, max_queue, fill) of the fullest socket, or of the app wide listen queue"""
+    queued = stats.listen_queue
+    max_queue = max((socket.max_queue for socket in stats.sockets), default=0)
+    fill = queued / max_queue if max_queue else 0.0
+    for socket in stats.sockets:
+        if socket.max_queue and socket.queue / socket.max_queue > fill:
+            queued, max_queue, fill = socket.queue, socket.max_queue, socket.queue / socket.max_queue
+    return queued, max_queue, fill
+
+
+class OverloadDetector:
+    """
+    Watches listen queues of every vassal reporting AppStats.
+
+    An app becomes saturated when its listen queue passes `threshold` of
+    `max_queue`, or when listen_queue_errors grows, meaning connections
+    were dropped. It recovers once the queue is back under
+    `clear_threshold` with no new errors.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        clear_threshold: float = 0.5,
+        on_event: list[Callable[[OverloadEvent], object]] | None = None,
+    ):
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.on_event = on_event or []
+        self.apps: dict[str, AppLoad] = {}
+
+    def saturated(self, service_id: str) -> bool:
+        load = self.apps.get(service_id)
+        return bool(load and load.saturated)
+
+    @property
+    def saturated_apps(self) -> list[str]:
+        return [service_id for service_id, load in self.apps.items() if load.saturated]
+
+    def observe(self, service_id: str, stats: AppStats, timestamp: float | None = None) -> list[OverloadEvent]:
+        timestamp = time.time() if timestamp is None else timestamp
+        queued, max_queue, fill = queue_fill(stats)
+        previous = self.apps.get(service_id)
+        # the first observation has nothing to compare the error counter to
+        new_errors = 0
+        if previous and stats.listen_queue_errors >= previous.listen_queue_errors:
+            new_errors = stats.listen_queue_errors - previous.listen_queue_errors
+        was_saturated = bool(previous and previous.saturated)
+
+        events = []
+
+        def event(kind: str) -> None:
+            events.append(
+                OverloadEvent(
+                    service_id=service_id,
+                    kind=kind,
+                    listen_queue=queued,
+                    max_queue=max_queue,
+                    fill=fill,
+                    new_errors=new_errors,
+                    timestamp=timestamp,
+                )
+            )
+
+        if new_errors:
+            event(QUEUE_ERRORS)
+        if fill >= self.threshold and not was_saturated:
+            event(QUEUE_HIGH)
+
+        saturated = bool(new_errors) or fill >= self.threshold or (was_saturated and fill >= self.clear_threshold)
+        if was_saturated and not saturated:
+            event(RECOVERED)
+
+        saturated_since = None
+        if saturated:
+            saturated_since = previous.saturated_since if was_saturated else timestamp
+        self.apps[service_id] = AppLoad(
+            service_id=service_id,
+            saturated=saturated,
+            listen_queue=queued,
+            max_queue=max_queue,
+            fill=fill,
+            listen_queue_errors=stats.listen_queue_errors,
+            saturated_since=saturated_since,
+        )
+
+        for overload_event in events:
+            log = logger.info if overload_event.kind == RECOVERED else logger.warning
+            log(overload_event.kind, **overload_event.model_dump(exclude={"kind"}))
+            for callback in self.on_event:
+                callback(overload_event)
+        return events
+
+    def observe_fleet(self, snapshot: "FleetStats") -> list[OverloadEvent]:
+        timestamp = snapshot.collected_at or time.time()
+        apps = snapshot.wsgi_apps | snapshot.attached_daemons
+        for service_id in [s for s in self.apps if s not in apps]:
+            del self.apps[service_id]
+        events = []
+        for service_id, stats in apps.items():
+            events.extend(self.observe(service_id, stats, timestamp))
+        return events
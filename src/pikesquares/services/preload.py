@@ -0,0 +1,141 @@
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares.services.data import AppStats
+
+if TYPE_CHECKING:
+    from pikesquares.domain.wsgi_app import WsgiApp
+
+logger = structlog.get_logger()
+
+PROC = Path("/proc")
+
+PRELOAD_HOOK = '''\
+"""
+generated by pikesquares for {name} [{service_id}], do not edit.
+
+loads the app in the uWSGI master so the workers fork with it already
+imported and share its memory pages.
+"""
+import gc
+import importlib.util
+import sys
+
+{gc_threshold}
+spec = importlib.util.spec_from_file_location("pikesquares_preloaded_app", {wsgi_file!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+{callable_name} = getattr(module, {callable_name!r})
+
+django_apps = sys.modules.get("django.apps")
+if django_apps is not None and django_apps.apps.ready:
+    # url patterns, and the views behind them, are otherwise imported by every worker
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+{freeze}'''
+
+GC_FREEZE = '''
+# move everything loaded so far to the permanent generation. the collector
+# no longer writes to those objects, and their pages stay shared after fork
+gc.collect()
+gc.freeze()
+'''
+
+
+def parse_gc_threshold(gc_threshold: str) -> tuple[int, ...]:
+    """`700,10,10` as passed to gc.set_threshold"""
+    try:
+        thresholds = tuple(int(value) for value in gc_threshold.split(","))
+    except ValueError:
+        raise ValueError(f"invalid gc threshold {gc_threshold!r}") from None
+    if not 1 <= len(thresholds) <= 3 or any(value < 0 for value in thresholds):
+        raise ValueError(f"invalid gc threshold {gc_threshold!r}")
+    return thresholds
+
+
+def render_preload_hook(wsgi_app: "WsgiApp") -> str:
+    """the module uWSGI loads as the app of `wsgi_app` instead of its wsgi file"""
+    gc_threshold = ""
+    if wsgi_app.gc_threshold:
+        thresholds = ", ".join(str(value) for value in parse_gc_threshold(wsgi_app.gc_threshold))
+        gc_threshold = f"gc.set_threshold({thresholds})\n"
+    return PRELOAD_HOOK.format(
+        name=wsgi_app.name,
+        service_id=wsgi_app.service_id,
+        gc_threshold=gc_threshold,
+        wsgi_file=str(wsgi_app.wsgi_file),
+        callable_name=wsgi_app.wsgi_module,
+        freeze=GC_FREEZE if wsgi_app.preload else "",
+    )
+
+
+class ProcessMemory(pydantic.BaseModel):
+    """memory of a process from /proc/<pid>/smaps_rollup, in bytes"""
+
+    pid: int
+    rss: int = 0
+    pss: int = 0
+    shared: int = 0
+    private: int = 0
+    swap: int = 0
+
+
+def parse_smaps_rollup(pid: int, smaps_rollup: str) -> ProcessMemory:
+    fields = {}
+    for line in smaps_rollup.splitlines():
+        key, _, value = line.partition(":")
+        parts = value.split()
+        if parts and parts[0].isdigit():
+            fields[key] = int(parts[0]) * 1024
+    return ProcessMemory(
+        pid=pid,
+        rss=fields.get("Rss", 0),
+        pss=fields.get("Pss", 0),
+        shared=fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        private=fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        swap=fields.get("Swap", 0),
+    )
+
+
+def read_smaps_rollup(pid: int, proc: Path = PROC) -> ProcessMemory | None:
+    try:
+        return parse_smaps_rollup(pid, (proc / str(pid) / "smaps_rollup").read_text())
+    except (FileNotFoundError, ProcessLookupError):
+        # gone between the stats read and now
+        return None
+    except OSError as exc:
+        logger.debug(f"unable to read smaps_rollup of {pid}: {exc}")
+        return None
+
+
+class AppMemory(pydantic.BaseModel):
+    """how much of their memory the master and workers of an app share"""
+
+    master: ProcessMemory | None = None
+    workers: list[ProcessMemory] = []
+
+    @property
+    def shared(self) -> int:
+        return sum(worker.shared for worker in self.workers)
+
+    @property
+    def private(self) -> int:
+        return sum(worker.private for worker in self.workers)
+
+    @property
+    def pss(self) -> int:
+        """proportional memory of the master and workers, what the app really costs"""
+        return sum(process.pss for process in [self.master, *self.workers] if process)
+
+
+def read_app_memory(stats: AppStats, proc: Path = PROC) -> AppMemory:
+    workers = [read_smaps_rollup(worker.pid, proc) for worker in stats.workers if worker.pid]
+    return AppMemory(
+        master=read_smaps_rollup(stats.pid, proc) if stats.pid else None,
+        workers=[worker for worker in workers if worker],
+    )
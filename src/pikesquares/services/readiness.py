@@ -0,0 +1,211 @@
+import asyncio
+import os
+import socket
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import structlog
+import tenacity
+
+from pikesquares import services
+from pikesquares.exceptions import VassalLaunchError
+from pikesquares.services.retry import LAUNCH_WAIT_POLICY, deadline_budget, retry_call
+
+if TYPE_CHECKING:
+    from pikesquares.domain.base import ServiceBase
+
+logger = structlog.get_logger()
+
+READY = "ready"
+SUBSCRIBED = "subscribed"
+# lines uWSGI sends to the notify socket once the vassal is ready, the sd_notify
+# style READY=1 and the plain notify message
+READY_MESSAGES = frozenset({b"READY=1", b"uWSGI is ready"})
+# subscription notify socket, `[subscription ack] <key> => new node: <address>`
+SUBSCRIPTION_ACK = b"[subscription ack]"
+
+
+def notification_kinds(data: bytes) -> set[str]:
+    """the notifications in a datagram, matched line by line"""
+    kinds = set()
+    for line in data.splitlines():
+        line = line.strip()
+        if line in READY_MESSAGES:
+            kinds.add(READY)
+        elif line.startswith(SUBSCRIPTION_ACK):
+            kinds.add(SUBSCRIBED)
+    return kinds
+
+
+class NotifyProtocol(asyncio.DatagramProtocol):
+    """Resolves pending futures from datagrams sent to a uWSGI notify socket"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.waiters: dict[str, list[asyncio.Future]] = {}
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        logger.debug(f"notification @ {self.path}: {data[:200]!r}")
+        for kind in notification_kinds(data):
+            for future in self.waiters.pop(kind, []):
+                if not future.done():
+                    future.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.debug(f"notify socket @ {self.path} error: {exc}")
+
+    def expect(self, kind: str, timeout: float | None = None) -> asyncio.Future:
+        """
+        a future resolved by the next `kind` notification, cancelled after
+        `timeout` seconds without one. a cancelled future is forgotten.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.waiters.setdefault(kind, []).append(future)
+        if timeout is not None:
+            expiry = loop.call_later(timeout, future.cancel)
+            future.add_done_callback(lambda _: expiry.cancel())
+        future.add_done_callback(lambda _: self.discard(kind, future))
+        return future
+
+    def discard(self, kind: str, future: asyncio.Future) -> None:
+        futures = self.waiters.get(kind, [])
+        if future in futures:
+            futures.remove(future)
+        if not futures:
+            self.waiters.pop(kind, None)
+
+    def close(self) -> None:
+        for futures in self.waiters.values():
+            for future in futures:
+                future.cancel()
+        self.waiters.clear()
+        if self.transport:
+            self.transport.close()
+
+
+class Readiness:
+    """
+    Binds uWSGI notify and subscription notify datagram sockets and turns
+    notifications into asyncio futures.
+
+    Call `expect` before pushing the vassal config, so a fast spawn
+    cannot notify before anyone listens.
+    """
+
+    def __init__(self, socket_mode: int = 0o660):
+        self.socket_mode = socket_mode
+        self.listeners: dict[Path, NotifyProtocol] = {}
+
+    async def listen(self, path: Path | str) -> NotifyProtocol:
+        path = Path(path)
+        if path in self.listeners:
+            return self.listeners[path]
+
+        path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(path))
+        os.chmod(path, self.socket_mode)
+        _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: NotifyProtocol(path),
+            sock=sock,
+        )
+        self.listeners[path] = protocol
+        return protocol
+
+    async def expect(
+        self,
+        path: Path | str,
+        kind: str = READY,
+        timeout: float | None = LAUNCH_WAIT_POLICY.deadline,
+    ) -> asyncio.Future:
+        """the next `kind` notification on `path`, given up after `timeout` seconds"""
+        listener = await self.listen(path)
+        return listener.expect(kind, timeout)
+
+    async def wait(self, notification: asyncio.Future, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(asyncio.shield(notification), timeout)
+            return True
+        except TimeoutError:
+            notification.cancel()
+            return False
+
+    def close(self, path: Path | str | None = None) -> None:
+        paths = [Path(path)] if path else list(self.listeners)
+        for listener_path in paths:
+            listener = self.listeners.pop(listener_path, None)
+            if listener:
+                listener.close()
+                listener_path.unlink(missing_ok=True)
+
+
+readiness = Readiness()
+
+
+async def wait_for_launch(
+    service: "ServiceBase",
+    notification: asyncio.Future | None,
+    timeout: float | None = None,
+    launched: asyncio.Future | None = None,
+):
+    """
+    wait for a freshly launched vassal
+
+    whichever comes first wins: the ready notification or the emperor
+    confirming the launch (see VassalLaunches), falling back to a
+    successful stats read under LAUNCH_WAIT_POLICY when there is no
+    confirmation to wait for. returns a truthy value once the vassal is
+    up, None if it did not come up in time or was blacklisted.
+    """
+    timeout = timeout or LAUNCH_WAIT_POLICY.deadline
+
+    async def poll_stats():
+        try:
+            return await retry_call(LAUNCH_WAIT_POLICY, service.read_stats, until=bool)
+        except tenacity.RetryError:
+            return None
+
+    with deadline_budget(timeout):
+        waiters = {launched if launched is not None else asyncio.ensure_future(poll_stats())}
+        if notification is not None:
+            waiters.add(asyncio.ensure_future(asyncio.shield(notification)))
+        try:
+            async with asyncio.timeout(timeout):
+                while waiters:
+                    done, waiters = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.cancelled():
+                            continue
+                        if isinstance(task.exception(), VassalLaunchError):
+                            logger.error(str(task.exception()))
+                            return None
+                        if task.exception() is None and task.result():
+                            return task.result()
+        except TimeoutError:
+            pass
+        finally:
+            for task in waiters:
+                task.cancel()
+            if notification is not None:
+                # nobody waits for it anymore, drop it from its listener
+                notification.cancel()
+
+    logger.warning(f"{service.handler_name} {service.service_id} did not come up within {timeout}s")
+    return None
+
+
+async def register_readiness(context: dict) -> None:
+    async def readiness_factory() -> Readiness:
+        return readiness
+
+    services.register_factory(
+        context,
+        Readiness,
+        readiness_factory,
+        on_registry_close=readiness.close,
+    )
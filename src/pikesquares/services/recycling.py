@@ -0,0 +1,194 @@
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares.services.data import AppStats
+from pikesquares.services.master_fifo import write_master_fifo
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+MiB = 1024 * 1024
+
+
+class RecyclePolicy(pydantic.BaseModel):
+    """
+    When to recycle the workers of an app.
+
+    A worker over `rss_budget` bytes, or whose rss grows faster than
+    `rss_growth` bytes per hour over its last `window` samples, gets
+    the workers of its app reloaded through the master fifo.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    rss_budget: int | None = 512 * MiB
+    rss_growth: int | None = 64 * MiB
+    window: int = 30
+    # samples needed before the growth rate is trusted
+    min_samples: int = 6
+    # seconds between two reloads of the same app
+    cooldown: float = 600.0
+    # seconds after which a reload that did not replace every worker is given up on
+    reload_timeout: float = 120.0
+    # chain reload replaces one worker at a time, so the app keeps serving
+    chain: bool = True
+
+    @property
+    def command(self) -> str:
+        return "c" if self.chain else "w"
+
+
+class RssTrend:
+    """rss samples of one worker process, reset when the worker respawns"""
+
+    __slots__ = ("pid", "samples")
+
+    def __init__(self, window: int):
+        self.pid = 0
+        self.samples: deque[tuple[float, int]] = deque(maxlen=window)
+
+    def add(self, pid: int, timestamp: float, rss: int) -> None:
+        if pid != self.pid:
+            self.pid = pid
+            self.samples.clear()
+        self.samples.append((timestamp, rss))
+
+    def slope(self) -> float | None:
+        """least squares rss growth in bytes per second"""
+        n = len(self.samples)
+        if n < 2:
+            return None
+        mean_t = sum(t for t, _ in self.samples) / n
+        mean_rss = sum(rss for _, rss in self.samples) / n
+        variance = sum((t - mean_t) ** 2 for t, _ in self.samples)
+        if not variance:
+            return None
+        return sum((t - mean_t) * (rss - mean_rss) for t, rss in self.samples) / variance
+
+
+class RecycleDecision(pydantic.BaseModel):
+    service_id: str
+    worker_id: int
+    command: str
+    reason: str
+
+
+class RecyclingController:
+    """
+    Tracks per-worker rss trends across stats polls and reloads the
+    workers of leaking apps.
+
+    At most `max_concurrent` reloads are in flight at once, a reload is
+    over when none of the worker pids seen before it are left.
+    """
+
+    def __init__(
+        self,
+        policy: RecyclePolicy | None = None,
+        policies: dict[str, RecyclePolicy] | None = None,
+        max_concurrent: int = 1,
+        write: Callable[[Path, str], bool] = write_master_fifo,
+    ):
+        self.policy = policy or RecyclePolicy()
+        self.policies = policies or {}
+        self.max_concurrent = max_concurrent
+        self.write = write
+        self.trends: dict[tuple[str, int], RssTrend] = {}
+        self.last_reload: dict[str, float] = {}
+        # service_id -> (started at, pids of the workers being replaced)
+        self.pending: dict[str, tuple[float, set[int]]] = {}
+
+    def policy_for(self, service_id: str) -> RecyclePolicy:
+        return self.policies.get(service_id, self.policy)
+
+    @staticmethod
+    def running_pids(stats: AppStats) -> set[int]:
+        """pids of the running workers, cheaped workers report pid 0 before and after a reload"""
+        return {worker.pid for worker in stats.workers if worker.pid and worker.status != "cheap"}
+
+    def _check_pending(self, service_id: str, stats: AppStats, timestamp: float) -> None:
+        started_at, old_pids = self.pending[service_id]
+        if not old_pids & self.running_pids(stats):
+            logger.info(f"workers of {service_id} recycled in {timestamp - started_at:.1f}s")
+            del self.pending[service_id]
+        elif timestamp - started_at > self.policy_for(service_id).reload_timeout:
+            logger.warning(f"workers of {service_id} were not all recycled after {timestamp - started_at:.0f}s")
+            del self.pending[service_id]
+
+    def observe(self, service_id: str, stats: AppStats, timestamp: float | None = None) -> RecycleDecision | None:
+        """record the rss of every worker and decide whether the app needs recycling"""
+        timestamp = time.time() if timestamp is None else timestamp
+        policy = self.policy_for(service_id)
+        if service_id in self.pending:
+            self._check_pending(service_id, stats, timestamp)
+
+        decision = None
+        for worker in stats.workers:
+            # rss is reported only with memory-report enabled
+            if not worker.rss:
+                continue
+            trend = self.trends.get((service_id, worker.id))
+            if trend is None:
+                trend = self.trends[(service_id, worker.id)] = RssTrend(policy.window)
+            trend.add(worker.pid, timestamp, worker.rss)
+            if decision:
+                continue
+
+            if policy.rss_budget and worker.rss > policy.rss_budget:
+                reason = f"rss {worker.rss // MiB}MiB over budget of {policy.rss_budget // MiB}MiB"
+            elif (
+                policy.rss_growth
+                and len(trend.samples) >= policy.min_samples
+                and (slope := trend.slope()) is not None
+                and slope * 3600 > policy.rss_growth
+            ):
+                reason = f"rss growing {slope * 3600 / MiB:.1f}MiB/h"
+            else:
+                continue
+            decision = RecycleDecision(
+                service_id=service_id,
+                worker_id=worker.id,
+                command=policy.command,
+                reason=reason,
+            )
+        return decision
+
+    def can_reload(self, service_id: str, timestamp: float) -> bool:
+        if service_id in self.pending or len(self.pending) >= self.max_concurrent:
+            return False
+        last_reload = self.last_reload.get(service_id)
+        return last_reload is None or timestamp - last_reload >= self.policy_for(service_id).cooldown
+
+    def reload(self, decision: RecycleDecision, stats: AppStats, fifo_file: Path, timestamp: float) -> bool:
+        if not self.can_reload(decision.service_id, timestamp):
+            return False
+        logger.info(f"recycling workers of {decision.service_id}: worker {decision.worker_id} {decision.reason}")
+        if not self.write(fifo_file, decision.command):
+            return False
+        self.last_reload[decision.service_id] = timestamp
+        self.pending[decision.service_id] = (timestamp, self.running_pids(stats))
+        return True
+
+    def observe_fleet(self, snapshot: "FleetStats") -> list[RecycleDecision]:
+        """observe every wsgi app of a snapshot, returns the reloads that were sent"""
+        timestamp = snapshot.collected_at or time.time()
+        for key in [key for key in self.trends if key[0] not in snapshot.wsgi_apps]:
+            del self.trends[key]
+        for service_id in [s for s in self.pending if s not in snapshot.wsgi_apps]:
+            del self.pending[service_id]
+
+        reloads = []
+        for service_id, stats in snapshot.wsgi_apps.items():
+            decision = self.observe(service_id, stats, timestamp)
+            fifo_file = snapshot.master_fifos.get(service_id)
+            if decision and fifo_file and self.reload(decision, stats, fifo_file, timestamp):
+                reloads.append(decision)
+        return reloads
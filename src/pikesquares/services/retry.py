@@ -0,0 +1,167 @@
+import contextlib
+import contextvars
+import functools
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any, TypeVar
+
+import pydantic
+import structlog
+import tenacity
+
+from pikesquares.exceptions import ServiceUnavailableError, StatsReadError
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# monotonic time by which the current operation, and every retry nested in it, must finish
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("retry_deadline", default=None)
+
+
+def remaining_budget() -> float | None:
+    """seconds left in the current deadline budget, None when there is none"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+@contextlib.contextmanager
+def deadline_budget(seconds: float | None) -> Iterator[float | None]:
+    """
+    bound everything inside the block to `seconds`
+
+    nested budgets never extend an enclosing one.
+    """
+    outer = _deadline.get()
+    deadline = outer
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        if outer is not None:
+            deadline = min(outer, deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield remaining_budget()
+    finally:
+        _deadline.reset(token)
+
+
+class RetryPolicy(pydantic.BaseModel):
+    """
+    Exponential backoff with jitter, bounded by attempts and a deadline budget.
+
+    Exceptions in `fail_fast` are raised straight away, they mean the
+    service is not there and waiting will not change that.
+    """
+
+    model_config = pydantic.ConfigDict(arbitrary_types_allowed=True, frozen=True)
+
+    name: str
+    initial: float = 0.05
+    maximum: float = 1.0
+    multiplier: float = 2.0
+    jitter: float = 0.1
+    max_attempts: int | None = None
+    deadline: float | None = 5.0
+    retry_on: tuple[type[BaseException], ...] = (OSError,)
+    fail_fast: tuple[type[BaseException], ...] = ()
+
+    def should_retry(self, exc: BaseException) -> bool:
+        return isinstance(exc, self.retry_on) and not isinstance(exc, self.fail_fast)
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.maximum, self.initial * self.multiplier ** (attempt - 1))
+        return delay + random.uniform(0, self.jitter * delay)
+
+    def wait(self, retry_state: tenacity.RetryCallState) -> float:
+        delay = self.backoff(retry_state.attempt_number)
+        budget = remaining_budget()
+        return delay if budget is None else min(delay, budget)
+
+    def stop(self, retry_state: tenacity.RetryCallState) -> bool:
+        if self.max_attempts and retry_state.attempt_number >= self.max_attempts:
+            return True
+        budget = remaining_budget()
+        return budget is not None and budget <= 0
+
+    def retrying(self, until: Callable[[Any], bool] | None = None) -> tenacity.AsyncRetrying:
+        retry = tenacity.retry_if_exception(self.should_retry)
+        if until:
+            retry = retry | tenacity.retry_if_result(lambda result: not until(result))
+        return tenacity.AsyncRetrying(
+            retry=retry,
+            wait=self.wait,
+            stop=self.stop,
+            before_sleep=self.log_retry,
+            reraise=False,
+        )
+
+    def log_retry(self, retry_state: tenacity.RetryCallState) -> None:
+        logger.debug(
+            f"retrying {self.name} (attempt {retry_state.attempt_number}, "
+            f"{remaining_budget() or 0:.2f}s left)"
+        )
+
+
+async def retry_call(
+    policy: RetryPolicy,
+    fn: Callable[..., Awaitable[T]],
+    *args,
+    until: Callable[[T], bool] | None = None,
+    **kwargs,
+) -> T:
+    """
+    call `fn` under `policy` within the policy deadline budget
+
+    raises tenacity.RetryError once attempts or the budget run out and
+    re-raises `fail_fast` exceptions unchanged.
+    """
+    with deadline_budget(policy.deadline):
+        async for attempt in policy.retrying(until=until):
+            with attempt:
+                result = await fn(*args, **kwargs)
+            if not attempt.retry_state.outcome.failed:
+                attempt.retry_state.set_result(result)
+    return result
+
+
+def retry(policy: RetryPolicy):
+    """decorator form of `retry_call`"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await retry_call(policy, fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# a missing socket file or a refused connection means the vassal is not running
+STATS_READ_POLICY = RetryPolicy(
+    name="stats read",
+    initial=0.05,
+    maximum=0.5,
+    max_attempts=3,
+    deadline=2.0,
+    retry_on=(StatsReadError, OSError),
+    fail_fast=(FileNotFoundError, ConnectionRefusedError),
+)
+
+# waiting for a freshly touched vassal, its sockets show up while it spawns
+LAUNCH_WAIT_POLICY = RetryPolicy(
+    name="vassal launch",
+    initial=0.1,
+    maximum=1.0,
+    deadline=30.0,
+    retry_on=(StatsReadError, ServiceUnavailableError, OSError, tenacity.RetryError),
+)
+
+PROCESS_COMPOSE_PING_POLICY = RetryPolicy(
+    name="process-compose ping",
+    initial=0.1,
+    maximum=1.0,
+    deadline=15.0,
+    retry_on=(ServiceUnavailableError,),
+)
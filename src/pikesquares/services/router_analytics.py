@@ -0,0 +1,180 @@
+import time
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares import services
+from pikesquares.services.data import RouterNode, RouterStats, RouterSubscription
+
+if TYPE_CHECKING:
+    from pikesquares.services.stats import FleetStats
+
+logger = structlog.get_logger()
+
+HOT_KEYS_LIMIT = 10
+# max/mean load across the nodes of a key above which it is reported as skewed
+IMBALANCE_THRESHOLD = 2.0
+
+
+def _increase(current: int, previous: int | None) -> int:
+    """counter increase between two samples, a drop means the router restarted"""
+    if previous is None:
+        return 0
+    return current - previous if current >= previous else current
+
+
+def imbalance(values: list[float]) -> float | None:
+    """max/mean of `values`, None for fewer than two nodes or no load at all"""
+    if len(values) < 2:
+        return None
+    mean = sum(values) / len(values)
+    if not mean:
+        return None
+    return max(values) / mean
+
+
+class NodeReport(pydantic.BaseModel):
+    name: str
+    requests_rate: float = 0.0
+    load: int = 0
+    failures: int = 0
+    death_mark: bool = False
+
+    @pydantic.computed_field
+    def failing(self) -> bool:
+        return self.death_mark or self.failures > 0
+
+
+class KeyReport(pydantic.BaseModel):
+    key: str
+    hits_rate: float = 0.0
+    requests_rate: float = 0.0
+    imbalance: float | None = None
+    nodes: list[NodeReport] = []
+
+    @property
+    def failing_nodes(self) -> list[NodeReport]:
+        return [node for node in self.nodes if node.failing]
+
+
+class RouterReport(pydantic.BaseModel):
+    service_id: str
+    interval: float = 0.0
+    keys: list[KeyReport] = []
+
+    def hot_keys(self, limit: int = HOT_KEYS_LIMIT) -> list[KeyReport]:
+        return sorted(self.keys, key=lambda k: k.hits_rate, reverse=True)[:limit]
+
+    def skewed_keys(self, threshold: float = IMBALANCE_THRESHOLD) -> list[KeyReport]:
+        return [k for k in self.keys if k.imbalance is not None and k.imbalance >= threshold]
+
+    def failing_nodes(self) -> list[tuple[str, NodeReport]]:
+        return [(k.key, node) for k in self.keys for node in k.failing_nodes]
+
+
+def analyze_subscription(
+    current: RouterSubscription,
+    previous: RouterSubscription | None,
+    interval: float,
+) -> KeyReport:
+    previous_nodes: dict[str, RouterNode] = {n.name: n for n in previous.nodes} if previous else {}
+    per_second = 1 / interval if interval > 0 else 0.0
+
+    nodes = []
+    for node in current.nodes:
+        before = previous_nodes.get(node.name)
+        nodes.append(
+            NodeReport(
+                name=node.name,
+                requests_rate=_increase(node.requests, before.requests if before else None) * per_second,
+                load=node.load,
+                failures=_increase(node.failcnt, before.failcnt if before else None),
+                death_mark=bool(node.death_mark),
+            )
+        )
+
+    # in-flight load is a point sample, skew shows there first. with idle
+    # nodes fall back to how the requests of the interval were spread.
+    skew = imbalance([node.load for node in nodes])
+    if skew is None:
+        skew = imbalance([node.requests_rate for node in nodes])
+
+    return KeyReport(
+        key=current.key,
+        hits_rate=_increase(current.hits, previous.hits if previous else None) * per_second,
+        requests_rate=sum(node.requests_rate for node in nodes),
+        imbalance=skew,
+        nodes=nodes,
+    )
+
+
+def analyze(
+    service_id: str,
+    current: RouterStats,
+    previous: RouterStats | None = None,
+    interval: float = 0.0,
+) -> RouterReport:
+    """
+    compare two stats snapshots of one http router
+
+    without a previous snapshot rates and failures are zero, only load
+    and death marks are reported.
+    """
+    previous_subscriptions = {s.key: s for s in previous.subscriptions} if previous else {}
+    return RouterReport(
+        service_id=service_id,
+        interval=interval,
+        keys=[
+            analyze_subscription(subscription, previous_subscriptions.get(subscription.key), interval)
+            for subscription in current.subscriptions
+        ],
+    )
+
+
+class RouterAnalytics:
+    """
+    Keeps the last stats snapshot of every http router and reports
+    what changed since then.
+    """
+
+    def __init__(self):
+        self.snapshots: dict[str, tuple[float, RouterStats]] = {}
+        self.reports: dict[str, RouterReport] = {}
+
+    def update(self, service_id: str, stats: RouterStats, timestamp: float | None = None) -> RouterReport:
+        timestamp = timestamp or time.time()
+        previous_timestamp, previous = self.snapshots.get(service_id, (timestamp, None))
+        report = analyze(service_id, stats, previous, timestamp - previous_timestamp)
+        self.snapshots[service_id] = (timestamp, stats)
+        self.reports[service_id] = report
+        for key in report.skewed_keys():
+            logger.info(f"router {service_id} key {key.key} is unbalanced: max/mean load {key.imbalance:.1f}")
+        for key, node in report.failing_nodes():
+            logger.warning(f"router {service_id} key {key} node {node.name} is failing")
+        return report
+
+    def update_fleet(self, snapshot: "FleetStats") -> dict[str, RouterReport]:
+        timestamp = snapshot.collected_at or time.time()
+        for service_id in set(self.snapshots) - set(snapshot.http_routers):
+            self.forget(service_id)
+        return {
+            service_id: self.update(service_id, stats, timestamp)
+            for service_id, stats in snapshot.http_routers.items()
+        }
+
+    def forget(self, service_id: str) -> None:
+        self.snapshots.pop(service_id, None)
+        self.reports.pop(service_id, None)
+
+
+async def register_router_analytics(context: dict) -> None:
+
+    async def router_analytics_factory() -> RouterAnalytics:
+        return RouterAnalytics()
+
+    services.register_factory(
+        context,
+        RouterAnalytics,
+        router_analytics_factory,
+    )
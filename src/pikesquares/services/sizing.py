@@ -0,0 +1,205 @@
+import heapq
+import math
+import os
+from pathlib import Path
+
+import pydantic
+import structlog
+
+from pikesquares.services.data import AppStats
+
+logger = structlog.get_logger()
+
+MiB = 1024 * 1024
+MEMINFO = Path("/proc/meminfo")
+SOMAXCONN = Path("/proc/sys/net/core/somaxconn")
+
+
+def read_memory_available(meminfo: Path = MEMINFO) -> int:
+    """MemAvailable in bytes, falling back to free physical pages"""
+    try:
+        for line in meminfo.read_text().splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def read_somaxconn(path: Path = SOMAXCONN) -> int:
+    """the kernel cap on listen backlogs"""
+    try:
+        return int(path.read_text())
+    except (OSError, ValueError):
+        return 4096
+
+
+class HostResources(pydantic.BaseModel):
+    cpu_count: int
+    # bytes
+    memory_available: int
+    somaxconn: int = 4096
+
+    @classmethod
+    def detect(cls) -> "HostResources":
+        return cls(
+            cpu_count=os.cpu_count() or 1,
+            memory_available=read_memory_available(),
+            somaxconn=read_somaxconn(),
+        )
+
+
+class AppProfile(pydantic.BaseModel):
+    """what the stats of an app tell about its resource needs"""
+
+    service_id: str
+    workers: int = 0
+    # bytes, mean of the workers reporting it
+    rss_per_worker: int | None = None
+    # microseconds
+    avg_rt: int | None = None
+    # microseconds spent serving requests by all workers, the demand weight
+    busy_time: int = 0
+
+    @classmethod
+    def from_stats(cls, service_id: str, stats: AppStats | None) -> "AppProfile":
+        if stats is None:
+            return cls(service_id=service_id)
+        workers = [worker for worker in stats.workers if worker.status != "cheap"]
+        rss = [worker.rss for worker in workers if worker.rss]
+        serving = [worker for worker in workers if worker.requests]
+        avg_rt = None
+        if serving:
+            # weighted by the requests each worker served
+            avg_rt = sum(w.avg_rt * w.requests for w in serving) // sum(w.requests for w in serving)
+        return cls(
+            service_id=service_id,
+            workers=len(workers),
+            rss_per_worker=sum(rss) // len(rss) if rss else None,
+            avg_rt=avg_rt,
+            busy_time=sum(worker.running_time for worker in workers),
+        )
+
+
+class SizingPolicy(pydantic.BaseModel):
+    """
+    How much of the host the wsgi apps of a device may take.
+
+    Workers are capped at `workers_per_cpu` per core and by
+    `memory_fraction` of the memory available to them. Threads grow with
+    the average response time, slow requests mostly wait on I/O.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    workers_per_cpu: float = 2.0
+    max_workers_per_app: int = 16
+    memory_fraction: float = 0.75
+    # assumed rss of a worker that did not report one yet
+    default_rss: int = 128 * MiB
+    max_threads: int = 8
+    # avg response time in microseconds from which threads are doubled
+    thread_rt_steps: tuple[int, ...] = (10_000, 50_000, 250_000)
+    # seconds of requests the listen backlog should hold
+    backlog_seconds: float = 1.0
+    min_listen_backlog: int = 100
+
+
+class AppSizing(pydantic.BaseModel):
+    service_id: str
+    workers: int
+    threads: int
+    listen_backlog: int
+
+
+def threads_for(avg_rt: int | None, policy: SizingPolicy) -> int:
+    if not avg_rt:
+        return 1
+    threads = 2 ** sum(1 for step in policy.thread_rt_steps if avg_rt >= step)
+    return min(threads, policy.max_threads)
+
+
+def listen_backlog_for(
+    workers: int,
+    threads: int,
+    avg_rt: int | None,
+    policy: SizingPolicy,
+    somaxconn: int,
+) -> int:
+    """requests the app drains in `backlog_seconds`, within the kernel cap"""
+    if not avg_rt:
+        return min(policy.min_listen_backlog, somaxconn)
+    drained = workers * threads * policy.backlog_seconds * 1_000_000 / avg_rt
+    return min(max(policy.min_listen_backlog, math.ceil(drained)), somaxconn)
+
+
+def initial_sizing(
+    service_id: str,
+    resources: HostResources,
+    policy: SizingPolicy | None = None,
+) -> AppSizing:
+    """
+    size of an app that has no stats yet
+
+    one worker and one thread, the workers of the apps already on the
+    device are not freed for it. `apps tune` rebalances once it served requests.
+    """
+    policy = policy or SizingPolicy()
+    return AppSizing(
+        service_id=service_id,
+        workers=1,
+        threads=threads_for(None, policy),
+        listen_backlog=listen_backlog_for(1, 1, None, policy, resources.somaxconn),
+    )
+
+
+def size_apps(
+    profiles: list[AppProfile],
+    resources: HostResources,
+    policy: SizingPolicy | None = None,
+) -> dict[str, AppSizing]:
+    """
+    split the worker budget of the device between its apps
+
+    every app gets one worker, the rest go one at a time to the app with
+    the most busy time per worker (D'Hondt), as long as its workers fit
+    in the memory budget. apps without any busy time yet share evenly.
+    """
+    policy = policy or SizingPolicy()
+    if not profiles:
+        return {}
+
+    budget = max(len(profiles), int(resources.cpu_count * policy.workers_per_cpu))
+    # memory held by the running workers is not in MemAvailable, but is theirs to keep
+    in_use = sum(p.workers * (p.rss_per_worker or policy.default_rss) for p in profiles)
+    memory = (resources.memory_available + in_use) * policy.memory_fraction
+
+    workers = {p.service_id: 1 for p in profiles}
+    rss = {p.service_id: p.rss_per_worker or policy.default_rss for p in profiles}
+    memory -= sum(rss.values())
+    remaining = budget - len(profiles)
+
+    # busy time is in microseconds, +1 keeps idle apps in the rotation
+    heap = [(-(p.busy_time + 1), p.service_id) for p in profiles]
+    weights = {p.service_id: p.busy_time + 1 for p in profiles}
+    heapq.heapify(heap)
+    while remaining > 0 and heap:
+        _, service_id = heapq.heappop(heap)
+        if workers[service_id] >= policy.max_workers_per_app or rss[service_id] > memory:
+            continue
+        workers[service_id] += 1
+        memory -= rss[service_id]
+        remaining -= 1
+        heapq.heappush(heap, (-weights[service_id] / workers[service_id], service_id))
+
+    sizing = {}
+    for profile in profiles:
+        threads = threads_for(profile.avg_rt, policy)
+        app_workers = workers[profile.service_id]
+        sizing[profile.service_id] = AppSizing(
+            service_id=profile.service_id,
+            workers=app_workers,
+            threads=threads,
+            listen_backlog=listen_backlog_for(app_workers, threads, profile.avg_rt, policy, resources.somaxconn),
+        )
+    return sizing
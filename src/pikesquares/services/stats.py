@@ -0,0 +1,358 @@
+import asyncio
+import functools
+import json
+import time
+import traceback
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pydantic
+import structlog
+
+from pikesquares import services
+from pikesquares.services.data import AppStats, DeviceStats, RouterStats
+
+if TYPE_CHECKING:
+    from pikesquares.domain.base import ServiceBase
+    from pikesquares.domain.device import Device
+    from pikesquares.service_layer.uow import UnitOfWork
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+logger = structlog.get_logger()
+
+STATS_READ_CHUNK_SIZE = 64 * 1024
+
+
+# handler_name -> (FleetStats field, stats model)
+# tuntap routers expose their own stats format, kept as a plain dict
+STATS_MODELS: dict[str, tuple[str, type[pydantic.BaseModel] | None]] = {
+    "Device": ("device", DeviceStats),
+    "Project": ("projects", DeviceStats),
+    "HttpRouter": ("http_routers", RouterStats),
+    "TuntapRouter": ("tuntap_routers", None),
+    "WsgiApp": ("wsgi_apps", AppStats),
+    "AttachedDaemon": ("attached_daemons", AppStats),
+}
+
+
+@functools.cache
+def stats_adapter(model: type[pydantic.BaseModel]) -> pydantic.TypeAdapter:
+    """one TypeAdapter per stats model, its validator is built only once"""
+    return pydantic.TypeAdapter(model)
+
+
+def decode_stats(payload: bytes | bytearray, model: type[pydantic.BaseModel] | None = None):
+    """
+    decode a raw stats payload in a single pass
+
+    with a model, the payload is validated straight from JSON bytes,
+    otherwise it is parsed into a dict.
+    """
+    if model:
+        return stats_adapter(model).validate_json(payload)
+    return json_loads(payload)
+
+
+async def read_stats_payload(stats_address: Path | str) -> bytearray:
+    """
+    read the raw payload from a uWSGI Stats Server unix socket
+    """
+    writer = None
+    payload = bytearray()
+    try:
+        reader, writer = await asyncio.open_unix_connection(path=str(stats_address))
+        while True:
+            data = await reader.read(STATS_READ_CHUNK_SIZE)
+            if not data:
+                break
+            payload += data
+        return payload
+    finally:
+        if writer:
+            writer.close()
+            await writer.wait_closed()
+
+
+class StatsCacheEntry:
+    __slots__ = ("expires", "payload", "decoded")
+
+    def __init__(self, expires: float, payload: bytearray):
+        self.expires = expires
+        self.payload = payload
+        # stats model (None for a plain dict) -> decoded payload
+        self.decoded: dict = {}
+
+
+class StatsCache:
+    """
+    Process-wide cache of stats socket payloads keyed by stats address.
+
+    Reads within `ttl` seconds are served from memory, concurrent reads of
+    the same socket share a single connection and failed reads are not
+    cached. Call `invalidate` after a vassal is touched or destroyed.
+    """
+
+    def __init__(self, ttl: float = 2.0, read_timeout: float = 5.0):
+        self.ttl = ttl
+        self.read_timeout = read_timeout
+        self.entries: dict[str, StatsCacheEntry] = {}
+        self.inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, stats_address: Path | str) -> StatsCacheEntry | None:
+        entry = self.entries.get(str(stats_address))
+        if entry and entry.expires > time.monotonic():
+            return entry
+        return None
+
+    async def get_payload(self, stats_address: Path | str) -> bytearray:
+        return (await self.get_entry(stats_address)).payload
+
+    async def get(
+        self,
+        stats_address: Path | str,
+        model: type[pydantic.BaseModel] | None = None,
+    ):
+        entry = await self.get_entry(stats_address)
+        try:
+            return entry.decoded[model]
+        except KeyError:
+            value = entry.decoded[model] = decode_stats(entry.payload, model)
+            return value
+
+    async def get_entry(self, stats_address: Path | str) -> StatsCacheEntry:
+        key = str(stats_address)
+        entry = self.lookup(key)
+        if entry:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(self._read(key))
+            task.add_done_callback(self._retrieve_exception)
+        # shielded so a caller timing out does not cancel the read for everyone else
+        return await asyncio.shield(task)
+
+    async def _read(self, key: str) -> StatsCacheEntry:
+        task = asyncio.current_task()
+        try:
+            async with asyncio.timeout(self.read_timeout):
+                payload = await read_stats_payload(key)
+            entry = StatsCacheEntry(time.monotonic() + self.ttl, payload)
+            # an invalidation while reading drops this result from the cache
+            if self.ttl > 0 and self.inflight.get(key) is task:
+                self.entries[key] = entry
+            return entry
+        finally:
+            if self.inflight.get(key) is task:
+                del self.inflight[key]
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Task) -> None:
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self, stats_address: Path | str | None = None) -> None:
+        """forget one stats address, or everything"""
+        if stats_address is None:
+            self.entries.clear()
+            self.inflight.clear()
+            return
+        self.entries.pop(str(stats_address), None)
+        self.inflight.pop(str(stats_address), None)
+
+    def invalidate_service(self, service_id: str) -> None:
+        name = f"{service_id}-stats.sock"
+        for key in [k for k in {*self.entries, *self.inflight} if Path(k).name == name]:
+            self.invalidate(key)
+
+
+stats_cache = StatsCache()
+
+
+async def read_stats_socket(
+    stats_address: Path | str,
+    model: type[pydantic.BaseModel] | None = None,
+    cache: StatsCache | None = stats_cache,
+):
+    """
+    read once from a uWSGI Stats Server unix socket
+
+    no retries here, connection errors are raised to the caller.
+    """
+    try:
+        if cache:
+            return await cache.get(stats_address, model)
+        return decode_stats(await read_stats_payload(stats_address), model)
+    except json.JSONDecodeError:
+        logger.error(traceback.format_exc())
+
+
+class FleetStats(pydantic.BaseModel):
+    """Stats snapshot of every uWSGI instance on a device"""
+
+    device: DeviceStats | None = None
+    device_service_id: str | None = None
+    projects: dict[str, DeviceStats] = {}
+    http_routers: dict[str, RouterStats] = {}
+    tuntap_routers: dict[str, dict] = {}
+    wsgi_apps: dict[str, AppStats] = {}
+    attached_daemons: dict[str, AppStats] = {}
+
+    # service_ids whose stats socket could not be read before the deadline
+    unavailable: list[str] = []
+    # service_id -> validation error
+    invalid: dict[str, str] = {}
+    # service_id -> master fifo of every service that answered
+    master_fifos: dict[str, Path] = {}
+
+    collected_at: float = 0.0
+    elapsed: float = 0.0
+
+    def is_running(self, service_id: str) -> bool:
+        if self.device and service_id == self.device_service_id:
+            return True
+        return any(
+            service_id in stats
+            for stats in (
+                self.projects,
+                self.http_routers,
+                self.tuntap_routers,
+                self.wsgi_apps,
+                self.attached_daemons,
+            )
+        )
+
+    def add(self, service: "ServiceBase", payload: bytes | bytearray | None) -> None:
+        if not payload:
+            self.unavailable.append(service.service_id)
+            return
+
+        try:
+            field, model = STATS_MODELS[service.handler_name]
+        except KeyError:
+            logger.warning(f"no stats model for {service.handler_name}")
+            return
+
+        try:
+            value = decode_stats(payload, model)
+        except (pydantic.ValidationError, json.JSONDecodeError) as exc:
+            logger.debug(f"invalid stats from {service.service_id}: {exc}")
+            self.invalid[service.service_id] = str(exc)
+            return
+
+        self.master_fifos[service.service_id] = service.master_fifo_file
+        if field == "device":
+            self.device = value
+            self.device_service_id = service.service_id
+        else:
+            getattr(self, field)[service.service_id] = value
+
+
+class StatsCollector:
+    """
+    Reads every known uWSGI stats socket concurrently.
+
+    A collection takes roughly as long as the slowest socket,
+    bounded by `timeout` per socket.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        timeout: float = 1.0,
+        cache: StatsCache | None = stats_cache,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = cache
+
+    async def read(
+        self,
+        service: "ServiceBase",
+        semaphore: asyncio.BoundedSemaphore,
+    ) -> tuple["ServiceBase", bytearray | None]:
+        async with semaphore:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if self.cache:
+                        return service, await self.cache.get_payload(service.stats_address)
+                    return service, await read_stats_payload(service.stats_address)
+            except TimeoutError:
+                logger.debug(f"timed out reading stats from {service.stats_address}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                pass
+            except OSError as exc:
+                logger.debug(f"unable to read stats from {service.stats_address}: {exc}")
+            return service, None
+
+    async def collect(self, fleet: Iterable["ServiceBase"]) -> FleetStats:
+        started = time.monotonic()
+        semaphore = asyncio.BoundedSemaphore(self.max_concurrency)
+        results = await asyncio.gather(
+            *(self.read(service, semaphore) for service in fleet)
+        )
+        snapshot = FleetStats(collected_at=time.time())
+        for service, payload in results:
+            snapshot.add(service, payload)
+        snapshot.elapsed = time.monotonic() - started
+        logger.debug(
+            f"collected stats from {len(results)} sockets in {snapshot.elapsed:.3f}s. "
+            f"{len(snapshot.unavailable)} unavailable"
+        )
+        return snapshot
+
+    async def collect_device(self, device: "Device", uow: "UnitOfWork") -> FleetStats:
+        """collect stats for the device and every service provisioned on it"""
+        fleet: list[ServiceBase] = [device]
+        fleet.extend(await uow.projects.get_by_device_id(device.id) or [])
+        fleet.extend(await uow.http_routers.list())
+        fleet.extend(await uow.tuntap_routers.list())
+        fleet.extend(await uow.wsgi_apps.list())
+        fleet.extend(await uow.attached_daemons.list())
+        return await self.collect(fleet)
+
+
+async def register_stats_cache(context: dict) -> None:
+
+    async def stats_cache_factory(svcs_container) -> StatsCache:
+        from pikesquares.conf import AppConfig
+
+        conf = await svcs_container.aget(AppConfig)
+        stats_cache.ttl = conf.STATS_CACHE_TTL
+        return stats_cache
+
+    services.register_factory(
+        context,
+        StatsCache,
+        stats_cache_factory,
+    )
+
+
+async def register_stats_collector(context: dict) -> None:
+
+    async def stats_collector_factory(svcs_container) -> StatsCollector:
+        from pikesquares.conf import AppConfig
+
+        conf = await svcs_container.aget(AppConfig)
+        return StatsCollector(
+            max_concurrency=conf.STATS_MAX_CONCURRENCY,
+            timeout=conf.STATS_TIMEOUT,
+            cache=await svcs_container.aget(StatsCache),
+        )
+
+    services.register_factory(
+        context,
+        StatsCollector,
+        stats_collector_factory,
+    )
@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.adapters.database import assert_query_count
+from pikesquares.domain.device import Device
+from pikesquares.domain.monitors import ZMQMonitor
+from pikesquares.domain.project import Project
+from pikesquares.domain.router import HttpRouter, TuntapRouter
+from pikesquares.domain.runtime import PythonAppCodebase
+from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.service_layer.uow import UnitOfWork
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async with AsyncSession(engine) as session:
+        device = Device(service_id="device", machine_id="0123456789abcdef0123456789abcdef", uwsgi_plugins="")
+        session.add(device)
+        await session.flush()
+        session.add(ZMQMonitor(device_id=device.id))
+        codebase = PythonAppCodebase(root_dir="/srv", repo_dir="/srv/repo", repo_git_url="", venv_dir="/srv/.venv", uv_bin="uv")
+        session.add(codebase)
+        for i in range(2):
+            project = Project(service_id=f"project-{i}", name=f"p{i}", uwsgi_plugins="", device_id=device.id)
+            session.add(project)
+            await session.flush()
+            session.add(ZMQMonitor(project_id=project.id))
+            session.add(HttpRouter(service_id=f"http-router-{i}", uwsgi_plugins="", project_id=project.id))
+            session.add(TuntapRouter(service_id=f"tuntap-router-{i}", uwsgi_plugins="", project_id=project.id))
+            await session.flush()
+            session.add(
+                WsgiApp(
+                    service_id=f"wsgi-app-{i}", name=f"app{i}", uwsgi_plugins="", project_id=project.id,
+                    python_app_codebase_id=codebase.id, root_dir="/srv", wsgi_file="/srv/wsgi.py",
+                    wsgi_module="application", venv_dir="/srv/.venv",
+                )
+            )
+        await session.commit()
+    yield engine
+    await engine.dispose()
+
+
+async def walk_wsgi_app(wsgi_app: WsgiApp) -> tuple:
+    """the relationships wsgi_app_up follows"""
+    await wsgi_app.awaitable_attrs.python_app_codebase
+    project = await wsgi_app.awaitable_attrs.project
+    return (
+        await project.awaitable_attrs.http_routers,
+        await project.awaitable_attrs.tuntap_routers,
+        await project.awaitable_attrs.zmq_monitor,
+    )
+
+
+async def test_wsgi_app_topology_in_one_select(engine):
+    async with AsyncSession(engine) as session, UnitOfWork(session=session) as uow:
+        with assert_query_count(engine, 6):
+            await walk_wsgi_app(await uow.wsgi_apps.get_by_service_id("wsgi-app-0"))
+
+    async with AsyncSession(engine) as session, UnitOfWork(session=session) as uow:
+        with assert_query_count(engine, 1):
+            wsgi_app = await uow.wsgi_apps.get_wsgi_app_with_topology("wsgi-app-0")
+            http_routers, tuntap_routers, zmq_monitor = await walk_wsgi_app(wsgi_app)
+        assert [router.service_id for router in http_routers] == ["http-router-0"]
+        assert [router.service_id for router in tuntap_routers] == ["tuntap-router-0"]
+        assert zmq_monitor.project_id == wsgi_app.project_id
+
+
+async def test_topology_fills_a_service_already_in_the_session(engine):
+    async with AsyncSession(engine) as session, UnitOfWork(session=session) as uow:
+        project = await uow.projects.get_by_service_id("project-1")
+        with assert_query_count(engine, 1):
+            assert await uow.projects.get_project_with_topology("project-1") is project
+            device = await project.awaitable_attrs.device
+            await device.awaitable_attrs.zmq_monitor
+            await project.awaitable_attrs.attached_daemons
+
+        http_router = await uow.http_routers.get_http_router_with_topology("http-router-1")
+        with assert_query_count(engine, 0):
+            assert await http_router.awaitable_attrs.project is project
+
+
+async def test_loader_options_on_generic_methods(engine):
+    async with AsyncSession(engine) as session, UnitOfWork(session=session) as uow:
+        device = await uow.devices.get_by_service_id("device")
+        # one SELECT for the projects, one for all their routers
+        with assert_query_count(engine, 2):
+            projects = await uow.projects.list(selectinload(Project.http_routers), device_id=device.id)
+            for project in projects:
+                await project.awaitable_attrs.http_routers
+        assert len(projects) == 2
+
+        project = await uow.projects.get_by_service_id("project-0")
+        # selectinload is a second SELECT
+        with assert_query_count(engine, 2):
+            await uow.projects.get_by_id(project.id, selectinload(Project.wsgi_apps))
+        with assert_query_count(engine, 0):
+            assert [app.service_id for app in await project.awaitable_attrs.wsgi_apps] == ["wsgi-app-0"]
+
+    with pytest.raises(AssertionError, match="expected 0 statements, 1 were run"):
+        async with AsyncSession(engine) as session:
+            with assert_query_count(engine, 0):
+                await session.get(Project, "missing")
@@ -0,0 +1,76 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.adapters.repositories import explain_repository_queries
+
+MIGRATION = Path(__file__).parents[3] / "alembic" / "versions" / "2026-10-17_add_lookup_indexes.py"
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("add_lookup_indexes", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+
+def index_names(conn) -> set[str]:
+    inspector = inspect(conn)
+    return {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+
+def run_migration(conn, step: str) -> None:
+    migration = load_migration()
+    with Operations.context(MigrationContext.configure(conn)):
+        getattr(migration, step)()
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def test_migration_matches_models(engine):
+    async with engine.begin() as conn:
+        created = await conn.run_sync(index_names)
+        assert "ix_uwsgi_options_machine_id_sort_order_index" in created
+
+        # databases created before the indexes, then migrated
+        await conn.run_sync(run_migration, "downgrade")
+        assert await conn.run_sync(index_names) == {"ix_vassal_configs_service_id"}
+        await conn.run_sync(run_migration, "upgrade")
+        assert await conn.run_sync(index_names) == created
+
+        # databases created with the indexes
+        await conn.run_sync(run_migration, "upgrade")
+
+
+async def test_lookups_search_an_index(engine):
+    async with AsyncSession(engine) as session:
+        query_plans = await explain_repository_queries(session)
+
+    plans = {query_plan.query: query_plan.plan for query_plan in query_plans}
+    # the emperor query is read in index order, without a sort
+    assert plans["DeviceUWSGIOptionsRepository.sync"] == [
+        "SEARCH uwsgi_options USING INDEX ix_uwsgi_options_machine_id_sort_order_index (machine_id=?)"
+    ]
+    assert plans["AttachedDaemonRepository.for_project_by_name"] == [
+        "SEARCH attached_daemons USING INDEX ix_attached_daemons_project_id_name (project_id=? AND name=?)"
+    ]
+
+    for query_plan in query_plans:
+        if query_plan.query.endswith(".list") or not query_plan.statement:
+            continue
+        assert all(step.lstrip().startswith("SEARCH") for step in query_plan.plan), query_plan
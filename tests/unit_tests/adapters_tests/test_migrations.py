@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.domain.wsgi_app import WsgiApp
+
+SCRIPT_DIRECTORY = ScriptDirectory(str(Path(__file__).parents[3] / "alembic"))
+
+
+def run_revision(conn, revision: str, step: str) -> None:
+    module = SCRIPT_DIRECTORY.get_revision(revision).module
+    with Operations.context(MigrationContext.configure(conn)):
+        getattr(module, step)()
+
+
+def column_names(conn, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def test_revisions_form_a_single_chain():
+    assert len(SCRIPT_DIRECTORY.get_heads()) == 1
+    assert [script.down_revision for script in SCRIPT_DIRECTORY.walk_revisions()][-1] is None
+
+
+@pytest.mark.parametrize(
+    "revision, columns",
+    [
+        ("e0be483cf7e3", {"listen_backlog"}),
+        ("2af4617f62bc", {"static_url", "static_dir", "media_url", "media_dir"}),
+        ("b6e6e89fad4c", {"preload", "gc_threshold"}),
+    ],
+)
+async def test_wsgi_app_columns_added_to_existing_tables(engine, revision, columns):
+    async with engine.begin() as conn:
+        # a database created before the columns were added to the model
+        await conn.run_sync(run_revision, revision, "downgrade")
+        assert not columns & await conn.run_sync(column_names, "python_wsgi_apps")
+
+        await conn.run_sync(run_revision, revision, "upgrade")
+        assert columns <= await conn.run_sync(column_names, "python_wsgi_apps")
+        # databases created with the columns are left alone
+        await conn.run_sync(run_revision, revision, "upgrade")
+
+    async with AsyncSession(engine) as session:
+        assert (await session.exec(select(WsgiApp))).all() == []
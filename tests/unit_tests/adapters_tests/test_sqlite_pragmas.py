@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import text
+
+from pikesquares.adapters.database import DatabaseSessionManager, pragma_statements
+from pikesquares.conf import SQLITE_PRAGMAS_PROFILE
+
+
+async def read_pragmas(sessionmanager: DatabaseSessionManager) -> tuple:
+    async with sessionmanager.connect() as conn:
+        return tuple([
+            (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "temp_store")
+        ])
+
+
+async def test_pragmas_applied_on_connect(tmp_path):
+    tuned = DatabaseSessionManager(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}", pragmas=SQLITE_PRAGMAS_PROFILE)
+    # synchronous NORMAL is 1, temp_store MEMORY is 2
+    assert await read_pragmas(tuned) == ("wal", 1, 10000, 2)
+    await tuned.close()
+
+    default = DatabaseSessionManager(f"sqlite+aiosqlite:///{tmp_path / 'default.db'}")
+    # the 5 second busy timeout is the sqlite3 module default
+    assert await read_pragmas(default) == ("delete", 2, 5000, 0)
+    await default.close()
+
+
+def test_pragma_statements_are_checked():
+    assert pragma_statements({"journal_mode": "WAL", "cache_size": -16000}) == [
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA cache_size = -16000",
+    ]
+    for pragmas in ({"journal_mode": "WAL; DROP TABLE devices"}, {"busy timeout": 1}):
+        with pytest.raises(ValueError):
+            pragma_statements(pragmas)
@@ -0,0 +1,62 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.adapters.repositories import DeviceUWSGIOptionsRepository
+from pikesquares.domain.device import DeviceUWSGIOption
+
+MACHINE_ID = "0123456789abcdef0123456789abcdef"
+
+
+def options(*pairs: tuple[str, str]) -> list[DeviceUWSGIOption]:
+    return [
+        DeviceUWSGIOption(option_key=key, option_value=value, machine_id=MACHINE_ID, sort_order_index=index)
+        for index, (key, value) in enumerate(pairs)
+    ]
+
+
+async def stored(session: AsyncSession) -> list[tuple[str, str, int]]:
+    rows = await session.exec(
+        select(DeviceUWSGIOption).where(DeviceUWSGIOption.machine_id == MACHINE_ID)
+        .order_by(DeviceUWSGIOption.sort_order_index)
+    )
+    return [(row.option_key, row.option_value, row.sort_order_index) for row in rows]
+
+
+async def test_sync_writes_only_the_difference():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, executemany: statements.append(
+            (statement.split()[0], executemany)
+        ),
+    )
+
+    async with AsyncSession(engine) as session:
+        repo = DeviceUWSGIOptionsRepository(session)
+        plugins = [("plugin", f"plugin_{i}") for i in range(50)]
+        assert await repo.sync(MACHINE_ID, options(("strict", "true"), *plugins)) == (51, 0, 0)
+        await session.commit()
+        # a select and a single executemany insert
+        assert statements == [("SELECT", False), ("INSERT", True)]
+
+        statements.clear()
+        assert await repo.sync(MACHINE_ID, options(("strict", "true"), *plugins)) == (0, 0, 0)
+        assert statements == [("SELECT", False)]
+
+        statements.clear()
+        changed = options(("strict", "false"), *plugins[:10], ("plugin", "other"), *plugins[11:40])
+        assert await repo.sync(MACHINE_ID, changed) == (0, 2, 10)
+        await session.commit()
+        assert [kind for kind, _ in statements] == ["SELECT", "DELETE", "UPDATE"]
+        assert await stored(session) == [
+            (option.option_key, option.option_value, option.sort_order_index) for option in changed
+        ]
+    await engine.dispose()
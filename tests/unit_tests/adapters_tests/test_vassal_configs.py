@@ -0,0 +1,29 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from pikesquares.adapters.repositories import VassalConfigRepository
+from pikesquares.domain.vassal_config import VassalConfig, config_hash
+
+
+async def test_vassal_config_hash_gate():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda conn: SQLModel.metadata.create_all(conn, tables=[VassalConfig.__table__]))
+
+    config = "[uwsgi]\nstrict = true\n"
+    assert config_hash(config) == config_hash("[uwsgi]\nstrict = true\n")
+    assert config_hash(config) != config_hash(config + "workers = 2\n")
+
+    async with AsyncSession(engine) as session:
+        repo = VassalConfigRepository(session)
+        assert await repo.changed("app1", config_hash(config))
+
+        await repo.record("app1", config_hash(config))
+        assert not await repo.changed("app1", config_hash(config))
+        assert await repo.changed("app2", config_hash(config))
+
+        await repo.record("app1", config_hash(config + "workers = 2\n"))
+        assert await repo.changed("app1", config_hash(config))
+        assert len(await repo.list(service_id="app1")) == 1
+    await engine.dispose()
@@ -0,0 +1,36 @@
+import zmq
+import zmq.asyncio
+
+from pikesquares.adapters.zmq_pool import ZMQSocketPool
+
+
+async def test_pool_reuses_connected_sockets(tmp_path):
+    address = f"ipc://{tmp_path / 'monitor.sock'}"
+    pool = ZMQSocketPool()
+    receiver = pool.context.socket(zmq.PULL)
+    receiver.bind(address)
+    try:
+        for i in range(3):
+            await pool.send_multipart(address, [b"touch", f"app{i}.ini".encode(), b"[uwsgi]"])
+        assert pool.socket(address) is pool.socket(address)
+        assert len(pool.sockets) == 1
+        assert [(await receiver.recv_multipart())[1] for _ in range(3)] == [b"app0.ini", b"app1.ini", b"app2.ini"]
+    finally:
+        receiver.close(linger=0)
+        pool.close()
+    assert pool.context.closed
+    assert not pool.sockets
+
+
+async def test_pool_evicts_least_recently_used(tmp_path):
+    pool = ZMQSocketPool(max_sockets=2, linger_ms=0)
+    try:
+        first, second, third = (f"ipc://{tmp_path / f'monitor{i}.sock'}" for i in range(3))
+        first_socket = pool.socket(first)
+        pool.socket(second)
+        pool.socket(first)
+        pool.socket(third)
+        assert list(pool.sockets) == [first, third]
+        assert pool.socket(first) is first_socket
+    finally:
+        pool.close()
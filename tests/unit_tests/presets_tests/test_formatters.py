@@ -0,0 +1,59 @@
+import io
+import json
+import os
+
+from uwsgiconf.formatters import IniFormatter as UwsgiconfIniFormatter
+
+from pikesquares.presets import Section
+
+
+def section(plugins: int = 3) -> Section:
+    section = Section(name="uwsgi")
+    for i in range(plugins):
+        section._set("plugin", f"plugin_{i}", multi=True)
+    section._set("master", "true")
+    section._set("env", "A=1", multi=True)
+    section._set("env", "B=2", multi=True)
+    return section
+
+
+def test_ini_matches_uwsgiconf():
+    configuration = section().as_configuration()
+    formatted = configuration.format()
+    assert formatted == UwsgiconfIniFormatter(configuration.sections).format()
+
+    target = io.StringIO()
+    configuration.write(target)
+    assert target.getvalue() == formatted
+
+
+def test_json_joins_plugins_once():
+    configuration = section().as_configuration()
+    config = json.loads(configuration.format(formatter="json"))
+    assert config["uwsgi"]["plugin"] == "plugin_0,plugin_1,plugin_2"
+    # the last value of other repeated keys wins
+    assert config["uwsgi"]["env"] == "B=2"
+    assert list(config["uwsgi"])[0] == "plugin"
+
+    target = io.StringIO()
+    configuration.write(target, formatter="json")
+    assert json.loads(target.getvalue()) == config
+
+
+def test_tofile_is_atomic_and_skips_unchanged(tmp_path):
+    filepath = tmp_path / "vassal.ini"
+    configuration = section().as_configuration()
+    assert configuration.tofile(filepath) == str(filepath)
+    assert filepath.read_text() == configuration.format()
+    os.chmod(filepath, 0o640)
+    inode = filepath.stat().st_ino
+
+    configuration.tofile(filepath)
+    assert filepath.stat().st_ino == inode
+
+    changed = section(plugins=4).as_configuration()
+    changed.tofile(filepath)
+    assert filepath.read_text() == changed.format()
+    assert filepath.stat().st_ino != inode
+    assert filepath.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["vassal.ini"]
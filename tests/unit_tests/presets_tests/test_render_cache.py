@@ -0,0 +1,84 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.conf import settings
+from pikesquares.domain.monitors import ZMQMonitor
+from pikesquares.domain.project import Project
+from pikesquares.presets.cache import RenderCache, fingerprint, render_cache
+from pikesquares.presets.project import ProjectSection
+
+
+def project(**kwargs) -> Project:
+    return Project(service_id="project_abc", name="abc", uwsgi_plugins="emperor_zeromq;tuntap", **kwargs)
+
+
+def test_fingerprint_ignores_ids_and_timestamps():
+    first, second = project(), project()
+    assert fingerprint(ProjectSection, first) == fingerprint(ProjectSection, second)
+    assert fingerprint(ProjectSection, first) != fingerprint(ProjectSection, project(run_dir="/run/other"))
+
+
+def test_fingerprint_covers_related_rows_and_preset_settings(monkeypatch):
+    model = project()
+    monitor = ZMQMonitor(transport="ipc", socket_address="/run/abc-zmq.sock")
+    key = fingerprint(ProjectSection, model, monitor)
+    assert key != fingerprint(ProjectSection, model)
+    assert key != fingerprint(ProjectSection, model, ZMQMonitor(transport="ipc", socket_address="/run/other.sock"))
+
+    monkeypatch.setattr(settings, "AUTOSCALE_ENABLED", not settings.AUTOSCALE_ENABLED)
+    assert key != fingerprint(ProjectSection, model, monitor)
+
+
+def test_build_customises_the_cached_section():
+    cache = RenderCache()
+    model = project()
+
+    def build_section() -> ProjectSection:
+        section = ProjectSection(model)
+        section._set("emperor-use-clone", "net")
+        return section
+
+    rendered = cache.render(model, ProjectSection, extra={"nat_interfaces": ["eth0"]}, build=build_section)
+    assert "emperor-use-clone = net" in rendered
+    assert cache.render(model, ProjectSection, extra={"nat_interfaces": ["eth0"]}, build=build_section) is rendered
+    assert cache.render(model, ProjectSection, extra={"nat_interfaces": []}, build=build_section) is not rendered
+
+
+def test_separate_ini_and_json_caches():
+    cache = RenderCache()
+    model = project()
+    ini = cache.render(model)
+    assert ini.lstrip().startswith("[uwsgi]")
+    assert cache.render(model) is ini
+    assert cache.render(model, formatter="json").startswith('{"uwsgi"')
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert stats.entries == {"ini": 1, "json": 1}
+
+    # a changed field is a different fingerprint
+    model.run_dir = "/run/other"
+    assert "/run/other/project_abc-master-fifo" in cache.render(model)
+    cache.invalidate("project_abc")
+    assert cache.stats().entries == {"ini": 0, "json": 0}
+
+
+async def test_model_update_invalidates():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    render_cache.invalidate()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        model = project()
+        session.add(model)
+        await session.commit()
+        model.render_uwsgi_config()
+        assert render_cache.keys.get("project_abc")
+
+        model.name = "renamed"
+        session.add(model)
+        await session.commit()
+        assert not render_cache.keys.get("project_abc")
+    await engine.dispose()
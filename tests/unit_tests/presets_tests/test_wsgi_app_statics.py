@@ -0,0 +1,54 @@
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.domain.caddy import static_file_routes
+from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.service_layer.handlers.wsgi_app import static_url_path
+
+
+def wsgi_app(**kwargs) -> WsgiApp:
+    return WsgiApp(
+        service_id="wsgi-app-abc",
+        name="abc",
+        uwsgi_plugins="tuntap",
+        root_dir="/srv/abc",
+        wsgi_file="/srv/abc/repo/abc/wsgi.py",
+        wsgi_module="application",
+        venv_dir="/srv/abc/.venv",
+        **kwargs,
+    )
+
+
+def test_static_url_path():
+    assert static_url_path("static/") == "/static/"
+    assert static_url_path("/assets/static") == "/assets/static/"
+    assert static_url_path("https://cdn.example.com/static/") is None
+    assert static_url_path("//cdn.example.com/static/") is None
+    assert static_url_path(None) is None
+
+
+def test_static_map_rendered_with_offload_threads():
+    app = wsgi_app(
+        static_url="/static/",
+        static_dir="/var/lib/pikesquares/static/wsgi-app-abc",
+        media_url="/media/",
+    )
+    # media without a directory is left to the app
+    assert app.static_map == {"/static/": "/var/lib/pikesquares/static/wsgi-app-abc"}
+
+    config = app.render_uwsgi_config()
+    assert "static-map = /static/=/var/lib/pikesquares/static/wsgi-app-abc" in config
+    assert "offload-threads = 2" in config
+
+    assert "static-map" not in wsgi_app().render_uwsgi_config()
+
+
+def test_caddy_static_file_routes():
+    app = wsgi_app(static_url="/static/", static_dir="/srv/static", media_url="/media/", media_dir="/srv/media")
+    routes = static_file_routes(app)
+    assert [route["@id"] for route in routes] == ["wsgi-app-abc-static-static", "wsgi-app-abc-static-media"]
+    assert routes[0]["match"] == [{"host": ["abc.pikesquares.dev"], "path": ["/static/*"]}]
+    assert routes[0]["handle"] == [
+        {"handler": "rewrite", "strip_path_prefix": "/static"},
+        {"handler": "file_server", "root": "/srv/static"},
+    ]
+    assert all(route["terminal"] for route in routes)
+    assert static_file_routes(wsgi_app()) == []
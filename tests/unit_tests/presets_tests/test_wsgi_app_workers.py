@@ -0,0 +1,35 @@
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.conf import settings
+from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.presets.wsgi_app import WsgiAppSection
+
+
+def render(**kwargs) -> str:
+    wsgi_app = WsgiApp(
+        service_id="wsgi-app-abc",
+        name="abc",
+        uwsgi_plugins="tuntap",
+        root_dir="/srv/abc",
+        wsgi_file="/srv/abc/repo/abc/wsgi.py",
+        wsgi_module="application",
+        venv_dir="/srv/abc/.venv",
+        **kwargs,
+    )
+    return WsgiAppSection(wsgi_app).as_configuration().format()
+
+
+def test_all_workers_started_without_autoscaler(monkeypatch):
+    monkeypatch.setattr(settings, "AUTOSCALE_ENABLED", False)
+    config = render(workers=4)
+    assert "workers = 4" in config
+    assert "cheaper" not in config
+
+
+def test_autoscaler_starts_on_one_worker(monkeypatch):
+    monkeypatch.setattr(settings, "AUTOSCALE_ENABLED", True)
+    config = render(workers=4)
+    assert "workers = 4" in config
+    assert "cheaper-algo = manual" in config
+    assert "cheaper-initial = 1" in config
+
+    assert "cheaper" not in render(workers=1)
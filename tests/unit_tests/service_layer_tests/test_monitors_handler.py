@@ -1,7 +1,14 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+
 import pytest
+import pytest_asyncio
 from aiopath import AsyncPath
 from pikesquares.domain.monitors import ZMQMonitor
-from pikesquares.service_layer.handlers.monitors import create_zmq_monitor
+from pikesquares.service_layer.handlers import monitors as monitors_handler
+from pikesquares.service_layer.handlers.monitors import create_zmq_monitor, launch_instance
+from pikesquares.services.readiness import Readiness
 
 class FakeRepository:
     def __init__(self, existing_zmq_monitor: ZMQMonitor | None = None):
@@ -157,3 +164,61 @@ async def test_create_zmq_monitor_fails(project, run_dir, mocker):
     assert uow.committed is False
     assert uow._session.commit_called is False
 
+
+class FakeLaunches:
+    """emperor launch confirmations that never come"""
+
+    def __init__(self):
+        self.launched: list[asyncio.Future] = []
+
+    async def expect(self, emperor_stats_address, name):
+        self.launched.append(asyncio.get_running_loop().create_future())
+        return self.launched[-1]
+
+
+@pytest_asyncio.fixture
+async def launch_env(tmp_path, monkeypatch):
+    readiness = Readiness()
+    launches = FakeLaunches()
+    pushed = []
+
+    async def create_or_restart_instance(zmq_monitor_address, name, uwsgi_config):
+        pushed.append((zmq_monitor_address, name, uwsgi_config))
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"READY=1\n", str(tmp_path / "svc-notify.sock"))
+
+    monkeypatch.setattr(monitors_handler, "readiness", readiness)
+    monkeypatch.setattr(monitors_handler, "vassal_launches", launches)
+    monkeypatch.setattr(monitors_handler, "create_or_restart_instance", create_or_restart_instance)
+    service = SimpleNamespace(
+        service_id="svc",
+        handler_name="Project",
+        notify_socket=tmp_path / "svc-notify.sock",
+        read_stats=lambda: asyncio.sleep(10),
+    )
+    yield service, readiness, launches, pushed
+    readiness.close()
+
+
+@pytest.mark.asyncio
+async def test_launch_instance_waits_for_ready_notification(launch_env):
+    service, readiness, launches, pushed = launch_env
+
+    assert await launch_instance(service, "ipc:///monitor.sock", "/emperor-stats.sock", "[uwsgi]", timeout=2) == b"READY=1\n"
+    assert pushed == [("ipc:///monitor.sock", "svc.ini", "[uwsgi]")]
+    assert readiness.listeners[service.notify_socket].waiters == {}
+
+
+@pytest.mark.asyncio
+async def test_launch_instance_push_fails(launch_env, monkeypatch):
+    service, readiness, launches, pushed = launch_env
+
+    async def create_or_restart_instance(zmq_monitor_address, name, uwsgi_config):
+        raise ConnectionError("emperor down")
+
+    monkeypatch.setattr(monitors_handler, "create_or_restart_instance", create_or_restart_instance)
+    with pytest.raises(ConnectionError):
+        await launch_instance(service, "ipc:///monitor.sock", "/emperor-stats.sock", "[uwsgi]")
+    await asyncio.sleep(0)
+    assert launches.launched[0].cancelled()
+    assert readiness.listeners[service.notify_socket].waiters == {}
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+from pikesquares.services.autoscaler import SCALE_DOWN, SCALE_UP, Autoscaler, ScalePolicy
+from pikesquares.services.data import AppStats
+from pikesquares.services.stats import FleetStats
+
+from .test_openmetrics import APP_STATS
+
+
+def app_stats(statuses: str, listen_queue: int = 0) -> AppStats:
+    """one worker per letter: b busy, i idle, c cheap"""
+    status = {"b": "busy", "i": "idle", "c": "cheap"}
+    template = APP_STATS["workers"][0]
+    return AppStats.model_validate(
+        APP_STATS | {
+            "listen_queue": listen_queue,
+            "workers": [template | {"id": i, "status": status[s]} for i, s in enumerate(statuses, 1)],
+        }
+    )
+
+
+class Fleet:
+    def __init__(self, autoscaler):
+        self.autoscaler = autoscaler
+        self.now = 1000.0
+
+    def observe(self, **apps):
+        self.now += 10
+        return [
+            (d.service_id, d.command, d.workers)
+            for d in self.autoscaler.observe_fleet(
+                FleetStats(
+                    wsgi_apps=apps,
+                    master_fifos={s: Path(f"/run/{s}-master-fifo") for s in apps},
+                    collected_at=self.now,
+                )
+            )
+        ]
+
+
+def autoscaler(sent: list, **kwargs) -> Autoscaler:
+    return Autoscaler(
+        ScalePolicy(up_after=2, down_after=3, cooldown=15),
+        write=lambda fifo, command: sent.append(command) or True,
+        **kwargs,
+    )
+
+
+def test_grows_with_hysteresis_and_cooldown():
+    sent = []
+    fleet = Fleet(autoscaler(sent, device_max_workers=8))
+    assert fleet.observe(app1=app_stats("bccc", listen_queue=4)) == []
+    assert fleet.observe(app1=app_stats("bccc", listen_queue=4)) == [("app1", SCALE_UP, 2)]
+    # cooldown
+    assert fleet.observe(app1=app_stats("bbcc", listen_queue=4)) == []
+    assert fleet.observe(app1=app_stats("bbcc", listen_queue=4)) == [("app1", SCALE_UP, 3)]
+    # every worker slot in use
+    fleet.now += 100
+    assert fleet.observe(app1=app_stats("bbbb", listen_queue=4)) == []
+    assert fleet.observe(app1=app_stats("bbbb", listen_queue=4)) == []
+    assert sent == [SCALE_UP, SCALE_UP]
+
+
+def test_quiet_apps_shrink_to_min_workers():
+    fleet = Fleet(autoscaler([]))
+    results = [fleet.observe(app1=app_stats("iic")) for _ in range(3)]
+    assert results == [[], [], [("app1", SCALE_DOWN, 1)]]
+    fleet.now += 100
+    assert [fleet.observe(app1=app_stats("icc")) for _ in range(4)] == [[], [], [], []]
+
+
+def test_device_cap_prefers_longest_listen_queue():
+    fleet = Fleet(autoscaler([], device_max_workers=3))
+    apps = {"app1": app_stats("bc", listen_queue=2), "app2": app_stats("bc", listen_queue=9)}
+    fleet.observe(**apps)
+    assert fleet.observe(**apps) == [("app2", SCALE_UP, 2)]
+
+    # a quiet app frees a worker, the busiest app gets it in the same round
+    fleet = Fleet(autoscaler([], device_max_workers=5))
+    apps = {
+        "app1": app_stats("bbcc", listen_queue=3),
+        "app2": app_stats("iic"),
+        "app3": app_stats("bc", listen_queue=1),
+    }
+    for _ in range(2):
+        fleet.observe(**apps)
+    assert fleet.observe(**apps) == [("app2", SCALE_DOWN, 1), ("app1", SCALE_UP, 3)]
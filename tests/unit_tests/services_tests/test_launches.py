@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from pikesquares.exceptions import VassalBlacklistedError
+from pikesquares.services.launches import VassalLaunches
+
+from .test_stats_collector import start_stats_server
+
+
+def emperor_stats() -> dict:
+    return {
+        "version": "2.0.28",
+        "pid": 100,
+        "uid": 0,
+        "gid": 0,
+        "cwd": "/",
+        "emperor": ["zmq://ipc:///run/emperor.ipc"],
+        "emperor_tyrant": 0,
+        "throttle_level": 0,
+        "vassals": [],
+        "blacklist": [],
+    }
+
+
+def vassal(name: str, pid: int = 200, last_mod: int = 1000, ready: int = 1) -> dict:
+    return {
+        "id": name,
+        "pid": pid,
+        "born": 1000,
+        "last_mod": last_mod,
+        "last_heartbeat": 0,
+        "loyal": 1000,
+        "ready": ready,
+        "accepting": ready,
+        "last_loyal": 0,
+        "last_ready": 1000,
+        "last_accepting": 1000,
+        "first_run": 1000,
+        "last_run": 1000,
+        "cursed": 0,
+        "zerg": 0,
+        "on_demand": "",
+        "uid": 0,
+        "gid": 0,
+        "monitor": "zmq://ipc:///run/emperor.ipc",
+        "respawns": 0,
+    }
+
+
+async def test_concurrent_launches_share_one_poller(tmp_path):
+    stats_address = tmp_path / "emperor-stats.sock"
+    payload = emperor_stats()
+    launches = VassalLaunches(poll_interval=0.01)
+    server = await start_stats_server(stats_address, payload)
+    async with server:
+        names = ["app1.ini", "app2.ini", "app3.ini"]
+        futures = [await launches.expect(stats_address, name) for name in names]
+        assert len(launches.pollers) == 1
+
+        payload["vassals"] = [vassal("app1.ini"), vassal("app2.ini", ready=0)]
+        payload["blacklist"] = [{"id": "app3.ini", "throttle_level": 1, "attempt": 1, "first_attempt": 0, "last_attempt": 0}]
+        app1 = await asyncio.wait_for(futures[0], 2)
+        assert app1.pid == 200
+        with pytest.raises(VassalBlacklistedError):
+            await asyncio.wait_for(futures[2], 2)
+        assert not futures[1].done()
+
+        payload["vassals"] = [vassal("app1.ini"), vassal("app2.ini")]
+        assert (await asyncio.wait_for(futures[1], 2)).accepting
+        await asyncio.sleep(0.05)
+        assert launches.pollers == {} and launches.pending == {}
+
+
+async def test_reload_waits_for_a_new_generation(tmp_path):
+    stats_address = tmp_path / "emperor-stats.sock"
+    payload = emperor_stats()
+    payload["vassals"] = [vassal("app1.ini")]
+    launches = VassalLaunches(poll_interval=0.01)
+    server = await start_stats_server(stats_address, payload)
+    async with server:
+        # the instance running before the touch does not confirm the launch
+        launched = await launches.expect(stats_address, "app1.ini")
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(launched, 0.1)
+
+        launched = await launches.expect(stats_address, "app1.ini")
+        payload["vassals"] = [vassal("app1.ini", last_mod=1010)]
+        assert (await asyncio.wait_for(launched, 2)).last_mod == 1010
+    launches.close()
+
+
+async def test_emperor_not_up_yet(tmp_path):
+    stats_address = tmp_path / "emperor-stats.sock"
+    launches = VassalLaunches(poll_interval=0.01)
+    launched = await launches.expect(stats_address, "app1.ini")
+    await asyncio.sleep(0.05)
+    payload = emperor_stats()
+    payload["vassals"] = [vassal("app1.ini")]
+    server = await start_stats_server(stats_address, payload)
+    async with server:
+        assert (await asyncio.wait_for(launched, 2)).id == "app1.ini"
@@ -0,0 +1,39 @@
+import asyncio
+import socket
+import time
+
+from pikesquares.services.liveness import probe, probe_many
+
+
+async def test_probe_listening_unix_socket(tmp_path):
+    address = tmp_path / "app-stats.sock"
+    server = await asyncio.start_unix_server(lambda r, w: w.close(), path=str(address))
+    async with server:
+        assert await probe(address)
+
+
+async def test_probe_fails_fast_on_missing_or_refused(tmp_path):
+    stale = tmp_path / "stale-stats.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(stale))
+    sock.close()
+
+    started = time.monotonic()
+    assert not await probe(tmp_path / "missing-stats.sock", timeout_ms=5000)
+    assert not await probe(stale, timeout_ms=5000)
+    assert time.monotonic() - started < 0.5
+
+
+async def test_probe_tcp_address():
+    server = await asyncio.start_server(lambda r, w: w.close(), host="127.0.0.1", port=0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        assert await probe(f"127.0.0.1:{port}")
+
+
+async def test_probe_many(tmp_path):
+    up = tmp_path / "up-stats.sock"
+    server = await asyncio.start_unix_server(lambda r, w: w.close(), path=str(up))
+    async with server:
+        statuses = await probe_many({"up": up, "down": tmp_path / "down-stats.sock"})
+    assert statuses == {"up": True, "down": False}
@@ -0,0 +1,137 @@
+import time
+
+from pikesquares.conf import APISettings
+from pikesquares.services.data import AppStats
+from pikesquares.services.metrics_history import (
+    MetricsHistory,
+    Rollup,
+    decode_histogram,
+    encode_histogram,
+)
+from pikesquares.services.stats import FleetStats
+
+from .test_stats_collector import APP_STATS
+
+MINUTE = 60_000
+HOUR = 60 * MINUTE
+
+
+def test_histogram_roundtrip_and_percentiles():
+    rollup = Rollup()
+    for value in range(1, 1001):
+        rollup.add(value)
+    assert decode_histogram(encode_histogram(rollup.histogram)) == rollup.histogram
+    assert abs(rollup.percentile(95) - 950) / 950 < 0.05
+    assert rollup.percentile(100) == 1000
+    assert Rollup().percentile(50) is None
+
+
+async def test_rollups_and_aggregate(tmp_path):
+    history = await MetricsHistory(tmp_path / "metrics.db").open()
+    try:
+        start = 10 * HOUR
+        for i in range(120):
+            history.record(start + i * 1000 * 30, "app1", 1, "avg_rt", i * 10)
+        assert await history.flush() == 120
+
+        now = start + HOUR + 10 * MINUTE
+        written = await history.rollup(now=now)
+        assert written == {60: 60, 300: 12, 3600: 1}
+        # nothing new since the last rollup
+        assert await history.rollup(now=now) == {60: 0, 300: 0, 3600: 0}
+
+        for resolution in (60, 300, 3600):
+            aggregate = await history.aggregate("app1", "avg_rt", 86400, resolution=resolution, now=now)
+            assert aggregate.count == 120
+            assert aggregate.min == 0 and aggregate.max == 1190
+            assert aggregate.avg == sum(i * 10 for i in range(120)) / 120
+            assert abs(aggregate.percentiles[95] - 1130) / 1130 < 0.05
+
+        series = await history.series("app1", "avg_rt", 86400, resolution=300, now=now)
+        assert len(series) == 12
+        assert series[0] == (start, sum(i * 10 for i in range(10)) / 10)
+        assert await history.aggregate("app2", "avg_rt", now=now) is None
+    finally:
+        await history.close()
+
+
+async def test_late_samples_are_rolled_up_again(tmp_path):
+    history = await MetricsHistory(tmp_path / "metrics.db").open()
+    writer = await MetricsHistory(tmp_path / "metrics.db").open()
+    try:
+        start = 10 * HOUR
+        now = start + 2 * HOUR
+        for i in range(10):
+            history.record(start + i * 1000, "app1", 1, "requests", 10)
+        await history.flush(now=now)
+        await history.rollup(now=now)
+
+        # another writer flushes samples of buckets rolled up already
+        writer.record(start + 20_000, "app1", 1, "requests", 30)
+        writer.record(start + 5 * MINUTE, "app1", 1, "requests", 50)
+        await writer.flush(now=now)
+        assert await history.rollup(now=now) == {60: 2, 300: 2, 3600: 1}
+
+        for resolution in (60, 300, 3600):
+            aggregate = await history.aggregate("app1", "requests", 86400, resolution=resolution, now=now)
+            assert aggregate.count == 12
+            assert aggregate.max == 50
+            assert aggregate.avg == 180 / 12
+    finally:
+        await writer.close()
+        await history.close()
+
+
+async def test_expired_buckets_are_not_reopened(tmp_path):
+    history = await MetricsHistory(tmp_path / "metrics.db", retention={0: 3600}).open()
+    try:
+        start = 10 * HOUR
+        now = start + 3 * HOUR
+        history.record(start, "app1", 1, "requests", 10)
+        await history.flush(now=now)
+        await history.rollup(now=now)
+
+        # its raw samples are past retention, rolling the bucket up again would lose them
+        history.record(start + 1000, "app1", 1, "requests", 20)
+        await history.flush(now=now)
+        assert await history.rollup(now=now) == {60: 0, 300: 0, 3600: 0}
+    finally:
+        await history.close()
+
+
+async def test_retention_deletes_in_chunks(tmp_path):
+    history = await MetricsHistory(tmp_path / "metrics.db", retention={0: 3600}).open()
+    try:
+        now = 100 * HOUR
+        for i in range(50):
+            history.record(now - 2 * HOUR + i, "app1", 0, "listen_queue", i)
+        history.record(now - MINUTE, "app1", 0, "listen_queue", 1)
+        await history.flush()
+
+        assert await history.enforce_retention(now=now, chunk_size=7) == 50
+        rows = await history.db.execute_fetchall("SELECT COUNT(*) FROM samples")
+        assert rows[0][0] == 1
+    finally:
+        await history.close()
+
+
+async def test_record_fleet_stats(tmp_path):
+    history = await MetricsHistory(tmp_path / "metrics.db", batch_size=2).open()
+    try:
+        history.record_fleet_stats(
+            FleetStats(wsgi_apps={"app1": AppStats.model_validate(APP_STATS)}, collected_at=time.time())
+        )
+        # listen_queue, listen_queue_errors and five metrics per worker
+        assert await history.flush() == 2 + 5 * len(APP_STATS["workers"])
+        rows = await history.db.execute_fetchall("SELECT COUNT(*) FROM samples")
+        assert rows[0][0] == 2 + 5 * len(APP_STATS["workers"])
+    finally:
+        await history.close()
+
+
+def test_api_settings_history_next_to_control_plane_db(tmp_path):
+    settings = APISettings(PIKESQUARES_DATA_DIR=tmp_path, METRICS_HISTORY_RETENTION={0: 3600})
+    assert settings.SQLALCHEMY_DATABASE_URI == f"sqlite+aiosqlite:///{tmp_path / 'pikesquares.db'}"
+    # the same file as AppConfig.metrics_db_path
+    assert settings.metrics_db_path == tmp_path / "metrics.db"
+    assert settings.METRICS_HISTORY_RETENTION == {0: 3600}
@@ -0,0 +1,91 @@
+from pikesquares.services.data import AppStats
+from pikesquares.services.metrics import (
+    MetricsStore,
+    RingBuffer,
+    counter_increase,
+    now_ms,
+    percentile,
+)
+
+
+def worker(worker_id: int, requests: int, avg_rt: int = 0) -> dict:
+    return {
+        "id": worker_id, "pid": 100 + worker_id, "accepting": 1, "requests": requests,
+        "delta_requests": 0, "exceptions": 0, "harakiri_count": 0, "signals": 0,
+        "signal_queue": 0, "status": "idle", "rss": 1024, "vsz": 0, "running_time": 0,
+        "last_spawn": 0, "respawn_count": 1, "tx": 0, "avg_rt": avg_rt, "apps": [],
+    }
+
+
+def app_stats(listen_queue: int, workers: list[dict]) -> AppStats:
+    return AppStats.model_validate({
+        "version": "2.0.28", "listen_queue": listen_queue, "listen_queue_errors": 0,
+        "signal_queue": 0, "load": 0, "pid": 100, "uid": 0, "gid": 0, "cwd": "/",
+        "locks": [], "sockets": [], "workers": workers,
+    })
+
+
+def test_ring_buffer_wraps():
+    buf = RingBuffer(3)
+    for i in range(5):
+        buf.append(i, i * 10)
+    timestamps, values = buf.ordered()
+    assert list(timestamps) == [2, 3, 4]
+    assert list(values) == [20, 30, 40]
+    assert list(buf.window(3)[1]) == [30, 40]
+    assert buf.last() == (4, 40)
+    assert buf.nbytes == 48
+
+
+def test_counter_increase_handles_reset():
+    assert counter_increase([10, 20, 35]) == 25
+    assert counter_increase([10, 20, 5, 15]) == 25
+
+
+def test_percentile():
+    values = sorted(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_window_queries():
+    store = MetricsStore(capacity=10)
+    start = now_ms() - 30_000
+    for i in range(4):
+        stats = app_stats(
+            listen_queue=i * 2,
+            workers=[worker(1, 100 * i, avg_rt=1000 * (i + 1)), worker(2, 50 * i, avg_rt=500)],
+        )
+        store.record_app_stats("app", stats, timestamp=start + i * 10_000)
+
+    assert store.delta("app", "requests") == 450
+    assert store.delta("app", "requests", worker_id=1) == 300
+    assert store.rate("app", "requests") == 15.0
+    assert store.max("app", "listen_queue") == 6
+    assert store.percentiles("app", "avg_rt")[50] == 500
+    assert store.percentiles("app", "avg_rt")[99] == 4000
+    assert store.max("missing", "listen_queue") is None
+
+
+def test_series_are_bounded():
+    store = MetricsStore(capacity=4, max_series=2)
+    for i in range(10):
+        store.record("app", "requests", i, worker_id=1)
+        store.record("app", "requests", i, worker_id=2)
+        store.record("app", "requests", i, worker_id=3)
+    assert len(store.series) == 2
+    assert store.dropped_series == 10
+    assert store.nbytes == 2 * 4 * 16
+
+    store.forget("app")
+    assert not store.series
+    assert store.select("app", "requests") == []
+
+
+def test_explicit_zero_timestamp_is_kept():
+    store = MetricsStore(capacity=4)
+    store.record("app", "requests", 1, worker_id=1, timestamp=0)
+    store.record_app_stats("app", app_stats(0, [worker(1, 2)]), timestamp=0)
+    assert store.series[("app", 1, "requests")].last() == (0, 2)
+    assert list(store.series[("app", 1, "requests")].ordered()[0]) == [0, 0]
@@ -0,0 +1,69 @@
+from pikesquares.services.data import AppStats, RouterStats
+from pikesquares.services.openmetrics import MetricsExporter, render_openmetrics
+from pikesquares.services.stats import FleetStats, StatsCollector
+
+WORKER = {
+    "id": 1, "pid": 101, "accepting": 1, "requests": 42, "delta_requests": 0,
+    "exceptions": 3, "harakiri_count": 1, "signals": 0, "signal_queue": 0,
+    "status": "idle", "rss": 2048, "vsz": 0, "running_time": 0, "last_spawn": 0,
+    "respawn_count": 1, "tx": 0, "avg_rt": 1500, "apps": [],
+}
+APP_STATS = {
+    "version": "2.0.28", "listen_queue": 5, "listen_queue_errors": 2,
+    "signal_queue": 0, "load": 0, "pid": 100, "uid": 0, "gid": 0, "cwd": "/",
+    "locks": [], "sockets": [], "workers": [WORKER],
+}
+NODE = {
+    "name": "127.0.0.1:4017", "modifier1": 0, "modifier2": 0, "last_check": 0,
+    "pid": 101, "uid": 0, "gid": 0, "requests": 42, "last_requests": 0, "tx": 0,
+    "rx": 0, "cores": 1, "load": 3, "weight": 1, "wrr": 0, "ref": 0,
+    "failcnt": 1, "death_mark": 0,
+}
+ROUTER_STATS = {
+    "version": "2.0.28", "pid": 1, "uid": 0, "gid": 0, "cwd": "/",
+    "active_sessions": 0, "http": ["0.0.0.0:8034"], "cheap": 0,
+    "subscriptions": [
+        {"key": 'app"1.pikesquares.dev', "hash": 1, "hits": 7, "sni_enabled": 0, "nodes": [NODE]},
+    ],
+}
+
+
+def snapshot() -> FleetStats:
+    return FleetStats(
+        wsgi_apps={"app1": AppStats.model_validate(APP_STATS)},
+        http_routers={"router1": RouterStats.model_validate(ROUTER_STATS)},
+        unavailable=["app2"],
+    )
+
+
+def test_render_openmetrics():
+    text = render_openmetrics(snapshot())
+    lines = text.splitlines()
+
+    assert lines[-1] == "# EOF"
+    assert "# TYPE pikesquares_worker_requests counter" in lines
+    assert 'pikesquares_worker_requests_total{service_id="app1",worker="1"} 42' in lines
+    assert 'pikesquares_worker_avg_rt_microseconds{service_id="app1",worker="1"} 1500' in lines
+    assert "# UNIT pikesquares_worker_rss_bytes bytes" in lines
+    assert 'pikesquares_app_listen_queue{service_id="app1"} 5' in lines
+    assert 'pikesquares_router_subscription_hits_total{service_id="router1",key="app\\"1.pikesquares.dev"} 7' in lines
+    assert 'pikesquares_up{service_id="app2"} 0' in lines
+    # families without samples are not rendered
+    assert "pikesquares_emperor_vassals" not in text
+
+
+async def test_exporter_serves_cached_snapshot():
+    calls = []
+
+    async def collect(collector):
+        calls.append(collector)
+        return snapshot()
+
+    exporter = MetricsExporter(StatsCollector(), collect)
+    assert exporter.rendered == "# EOF\n"
+
+    await exporter.refresh()
+    rendered = exporter.rendered
+    assert "pikesquares_worker_requests_total" in rendered
+    assert exporter.rendered is rendered
+    assert len(calls) == 1
@@ -0,0 +1,67 @@
+from pikesquares.services.data import AppStats
+from pikesquares.services.overload import (
+    QUEUE_ERRORS,
+    QUEUE_HIGH,
+    RECOVERED,
+    OverloadDetector,
+    queue_fill,
+)
+from pikesquares.services.stats import FleetStats
+
+from .test_openmetrics import APP_STATS
+
+SOCKET = {"name": "127.0.0.1:4017", "proto": "uwsgi", "queue": 0, "max_queue": 100, "shared": 0, "can_offload": 0}
+
+
+def app_stats(queue: int, errors: int = 0) -> AppStats:
+    return AppStats.model_validate(
+        APP_STATS | {
+            "listen_queue": queue,
+            "listen_queue_errors": errors,
+            "sockets": [SOCKET | {"queue": queue}],
+        }
+    )
+
+
+def kinds(events) -> list[str]:
+    return [event.kind for event in events]
+
+
+def test_queue_fill():
+    assert queue_fill(app_stats(25)) == (25, 100, 0.25)
+    no_sockets = AppStats.model_validate(APP_STATS | {"sockets": []})
+    assert queue_fill(no_sockets) == (no_sockets.listen_queue, 0, 0.0)
+
+
+def test_saturation_with_hysteresis():
+    events = []
+    detector = OverloadDetector(threshold=0.8, clear_threshold=0.5, on_event=[events.append])
+
+    assert kinds(detector.observe("app1", app_stats(10), 1.0)) == []
+    assert kinds(detector.observe("app1", app_stats(85), 2.0)) == [QUEUE_HIGH]
+    assert detector.saturated("app1")
+    # still above the clear threshold, no new events
+    assert kinds(detector.observe("app1", app_stats(60), 3.0)) == []
+    assert detector.apps["app1"].saturated_since == 2.0
+    assert kinds(detector.observe("app1", app_stats(40), 4.0)) == [RECOVERED]
+    assert not detector.saturated("app1")
+    assert kinds(events) == [QUEUE_HIGH, RECOVERED]
+
+
+def test_new_listen_queue_errors_saturate():
+    detector = OverloadDetector()
+    # errors counted before the first observation are history
+    assert kinds(detector.observe("app1", app_stats(0, errors=7))) == []
+    events = detector.observe("app1", app_stats(0, errors=9))
+    assert kinds(events) == [QUEUE_ERRORS]
+    assert events[0].new_errors == 2
+    assert detector.saturated_apps == ["app1"]
+    assert kinds(detector.observe("app1", app_stats(0, errors=9))) == [RECOVERED]
+
+
+def test_observe_fleet_forgets_stopped_apps():
+    detector = OverloadDetector()
+    detector.observe_fleet(FleetStats(wsgi_apps={"app1": app_stats(90)}, attached_daemons={"redis": app_stats(0)}))
+    assert detector.saturated_apps == ["app1"]
+    detector.observe_fleet(FleetStats(attached_daemons={"redis": app_stats(0)}))
+    assert list(detector.apps) == ["redis"]
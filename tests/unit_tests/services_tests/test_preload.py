@@ -0,0 +1,102 @@
+import gc
+import runpy
+
+import pytest
+
+import pikesquares.adapters.repositories  # noqa: F401 every table model
+from pikesquares.domain.wsgi_app import WsgiApp
+from pikesquares.services.data import AppStats
+from pikesquares.services.preload import (
+    parse_gc_threshold,
+    parse_smaps_rollup,
+    read_app_memory,
+    render_preload_hook,
+)
+
+from .test_sizing import APP_STATS
+
+SMAPS_ROLLUP = """\
+557367fcf000-7ffe3a1ca000 ---p 00000000 00:00 0                          [rollup]
+Rss:                1324 kB
+Pss:                 453 kB
+Shared_Clean:       1164 kB
+Shared_Dirty:          0 kB
+Private_Clean:        56 kB
+Private_Dirty:       104 kB
+Swap:                  8 kB
+"""
+
+
+def wsgi_app(**kwargs) -> WsgiApp:
+    return WsgiApp(
+        **{
+            "service_id": "wsgi-app-abc",
+            "name": "abc",
+            "uwsgi_plugins": "tuntap",
+            "root_dir": "/srv/abc",
+            "wsgi_file": "/srv/abc/repo/abc/wsgi.py",
+            "wsgi_module": "application",
+            "venv_dir": "/srv/abc/.venv",
+        } | kwargs,
+    )
+
+
+def test_parse_gc_threshold():
+    assert parse_gc_threshold("50000,20,20") == (50000, 20, 20)
+    assert parse_gc_threshold("1000") == (1000,)
+    for invalid in ("", "a,b", "1,2,3,4", "-1"):
+        with pytest.raises(ValueError):
+            parse_gc_threshold(invalid)
+
+
+def test_preload_hook_loads_app_and_freezes(tmp_path):
+    wsgi_file = tmp_path / "wsgi.py"
+    wsgi_file.write_text("def application(environ, start_response):\n    return [b'ok']\n")
+    app = wsgi_app(wsgi_file=str(wsgi_file), preload=True, gc_threshold="50000,20,20", data_dir=str(tmp_path))
+
+    hook = render_preload_hook(app)
+    assert "gc.set_threshold(50000, 20, 20)" in hook
+    assert "gc.freeze()" in hook
+
+    hook_file = app.preload_hook_file
+    assert hook_file == tmp_path / "preload" / "wsgi-app-abc.py"
+    hook_file.parent.mkdir()
+    hook_file.write_text(hook)
+    thresholds = gc.get_threshold()
+    try:
+        namespace = runpy.run_path(str(hook_file))
+        assert gc.get_threshold() == (50000, 20, 20)
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+        gc.set_threshold(*thresholds)
+    assert namespace["application"]({}, None) == [b"ok"]
+
+    assert "gc.freeze()" not in render_preload_hook(wsgi_app(gc_threshold="1000"))
+
+
+def test_preload_hook_replaces_wsgi_file_in_config():
+    app = wsgi_app(preload=True)
+    assert f"wsgi-file = {app.preload_hook_file}" in app.render_uwsgi_config()
+
+    assert wsgi_app().preload_hook_file is None
+    assert "wsgi-file = /srv/abc/repo/abc/wsgi.py" in wsgi_app().render_uwsgi_config()
+
+
+def test_read_app_memory(tmp_path):
+    memory = parse_smaps_rollup(42, SMAPS_ROLLUP)
+    assert (memory.rss, memory.pss, memory.swap) == (1324 * 1024, 453 * 1024, 8 * 1024)
+    assert memory.shared == 1164 * 1024
+    assert memory.private == 160 * 1024
+
+    # master 100, a worker 101 and a worker 102 that went away
+    stats = AppStats.model_validate(APP_STATS | {"workers": [APP_STATS["workers"][0] | {"pid": pid} for pid in (101, 102)]})
+    for pid in (100, 101):
+        (tmp_path / str(pid)).mkdir()
+        (tmp_path / str(pid) / "smaps_rollup").write_text(SMAPS_ROLLUP)
+
+    app_memory = read_app_memory(stats, proc=tmp_path)
+    assert app_memory.master.pid == 100
+    assert [worker.pid for worker in app_memory.workers] == [101]
+    assert app_memory.shared == 1164 * 1024
+    assert app_memory.pss == 2 * 453 * 1024
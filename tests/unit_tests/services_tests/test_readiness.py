@@ -0,0 +1,87 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+
+from pikesquares.services.readiness import READY, SUBSCRIBED, Readiness, wait_for_launch
+
+
+def notify(path, message: bytes) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.sendto(message, str(path))
+
+
+async def test_ready_notification_resolves_future(tmp_path):
+    readiness = Readiness()
+    path = tmp_path / "svc-notify.sock"
+    try:
+        ready = await readiness.expect(path, READY)
+        subscribed = await readiness.expect(path, SUBSCRIBED)
+        notify(path, b"READY=1\nSTATUS=uWSGI is ready to serve requests\n")
+        assert await readiness.wait(ready, timeout=1)
+        assert not subscribed.done()
+
+        notify(path, b"[subscription ack] app.pikesquares.dev => new node")
+        assert await readiness.wait(subscribed, timeout=1)
+    finally:
+        readiness.close()
+    assert not path.exists()
+
+
+async def test_only_exact_ready_messages_count(tmp_path):
+    readiness = Readiness()
+    path = tmp_path / "svc-notify.sock"
+    try:
+        ready = await readiness.expect(path, READY)
+        for message in (b"not ready", b"already running", b"STATUS=READY=1 soon", b"ready"):
+            notify(path, message)
+        assert not await readiness.wait(ready, timeout=0.1)
+    finally:
+        readiness.close()
+
+
+async def test_wait_times_out_without_notification(tmp_path):
+    readiness = Readiness()
+    path = tmp_path / "svc-notify.sock"
+    try:
+        ready = await readiness.expect(path)
+        assert not await readiness.wait(ready, timeout=0.05)
+        assert ready.cancelled()
+        await asyncio.sleep(0)
+        # the listener does not keep a future per failed launch
+        assert readiness.listeners[path].waiters == {}
+
+        subscribed = await readiness.expect(path, SUBSCRIBED, timeout=0.05)
+        await asyncio.sleep(0.1)
+        assert subscribed.cancelled()
+        assert readiness.listeners[path].waiters == {}
+    finally:
+        readiness.close()
+
+
+async def test_wait_for_launch_prefers_notification(tmp_path):
+    readiness = Readiness()
+    path = tmp_path / "svc-notify.sock"
+    polls = 0
+
+    async def read_stats():
+        nonlocal polls
+        polls += 1
+        await asyncio.sleep(10)
+
+    service = SimpleNamespace(service_id="svc", handler_name="Project", read_stats=read_stats)
+    try:
+        ready = await readiness.expect(path)
+        asyncio.get_running_loop().call_later(0.05, notify, path, b"uWSGI is ready\n")
+        assert await wait_for_launch(service, ready, timeout=2) == b"uWSGI is ready\n"
+        assert polls == 1
+    finally:
+        readiness.close()
+
+
+async def test_wait_for_launch_falls_back_to_stats():
+    service = SimpleNamespace(
+        service_id="svc",
+        handler_name="Project",
+        read_stats=lambda: asyncio.sleep(0, result={"pid": 1}),
+    )
+    assert await wait_for_launch(service, None, timeout=1) == {"pid": 1}
@@ -0,0 +1,116 @@
+import os
+import time
+from pathlib import Path
+
+from pikesquares.services.data import AppStats
+from pikesquares.services.master_fifo import write_master_fifo
+from pikesquares.services.recycling import MiB, RecyclePolicy, RecyclingController, RssTrend
+from pikesquares.services.stats import FleetStats
+
+from .test_openmetrics import APP_STATS
+
+
+def app_stats(*workers: tuple[int, int]) -> AppStats:
+    """(pid, rss) per worker"""
+    template = APP_STATS["workers"][0]
+    return AppStats.model_validate(
+        APP_STATS | {
+            "workers": [
+                template | {"id": worker_id, "pid": pid, "rss": rss}
+                for worker_id, (pid, rss) in enumerate(workers, 1)
+            ]
+        }
+    )
+
+
+def test_rss_trend_slope_resets_on_respawn():
+    trend = RssTrend(window=10)
+    for t in range(5):
+        trend.add(101, t * 10.0, 100 * MiB + t * 10 * MiB)
+    assert trend.slope() == MiB
+    trend.add(102, 60.0, 80 * MiB)
+    assert len(trend.samples) == 1
+    assert trend.slope() is None
+
+
+def test_budget_and_growth_decisions():
+    controller = RecyclingController(RecyclePolicy(rss_budget=200 * MiB, rss_growth=100 * MiB, min_samples=3))
+
+    assert controller.observe("app1", app_stats((101, 250 * MiB), (102, 50 * MiB)), 0.0).reason.startswith("rss 250MiB")
+
+    # 1MiB per minute is 60MiB/h, under the growth threshold
+    for minute in range(3):
+        assert controller.observe("app2", app_stats((201, 100 * MiB + minute * MiB)), minute * 60.0) is None
+    # 5MiB per minute is 300MiB/h
+    controller = RecyclingController(RecyclePolicy(rss_budget=None, rss_growth=100 * MiB, min_samples=3))
+    decisions = [
+        controller.observe("app2", app_stats((201, 100 * MiB + minute * 5 * MiB)), minute * 60.0)
+        for minute in range(3)
+    ]
+    assert decisions[:2] == [None, None]
+    assert decisions[2].command == "c" and decisions[2].worker_id == 1
+
+
+def test_reloads_are_rate_limited():
+    sent = []
+    controller = RecyclingController(
+        RecyclePolicy(rss_budget=100 * MiB, cooldown=300, reload_timeout=60),
+        write=lambda fifo, command: sent.append((fifo, command)) or True,
+    )
+
+    def snapshot(timestamp, **apps):
+        return FleetStats(
+            wsgi_apps=apps,
+            master_fifos={service_id: Path(f"/run/{service_id}-master-fifo") for service_id in apps},
+            collected_at=timestamp,
+        )
+
+    leaking = app_stats((101, 150 * MiB), (102, 150 * MiB))
+    assert len(controller.observe_fleet(snapshot(1000.0, app1=leaking, app2=leaking))) == 1
+    # a reload is in flight, nothing else is sent until its workers are replaced
+    assert controller.observe_fleet(snapshot(1010.0, app1=leaking, app2=leaking)) == []
+
+    recycled = app_stats((103, 150 * MiB), (104, 150 * MiB))
+    first = sent[0][0].name.removesuffix("-master-fifo")
+    second = "app2" if first == "app1" else "app1"
+    reloads = controller.observe_fleet(snapshot(1020.0, **{first: recycled, second: leaking}))
+    assert [r.service_id for r in reloads] == [second]
+    # the first app is still over budget but in its cooldown
+    assert controller.observe_fleet(snapshot(1030.0, **{first: recycled, second: recycled})) == []
+    assert controller.observe_fleet(snapshot(1400.0, **{first: recycled, second: recycled}))[0].service_id == first
+    assert [command for _, command in sent] == ["c", "c", "c"]
+
+
+def test_cheaped_workers_do_not_hold_a_reload_pending():
+    controller = RecyclingController(
+        RecyclePolicy(rss_budget=100 * MiB, reload_timeout=60),
+        write=lambda fifo, command: True,
+    )
+    leaking = app_stats((101, 150 * MiB), (0, 0))
+    leaking.workers[1].status = "cheap"
+    decision = controller.observe("app1", leaking, 1000.0)
+    assert controller.reload(decision, leaking, Path("/run/app1-master-fifo"), 1000.0)
+    assert controller.pending["app1"] == (1000.0, {101})
+
+    recycled = app_stats((102, 50 * MiB), (0, 0))
+    recycled.workers[1].status = "cheap"
+    controller.observe("app1", recycled, 1010.0)
+    assert "app1" not in controller.pending
+
+
+def test_write_master_fifo(tmp_path):
+    fifo = tmp_path / "app-master-fifo"
+    assert not write_master_fifo(fifo, "w")
+    os.mkfifo(fifo)
+    # nobody is reading, fails instead of blocking
+    started = time.monotonic()
+    assert not write_master_fifo(fifo, "w")
+    assert time.monotonic() - started < 1
+    assert not write_master_fifo(fifo, "x")
+
+    reader = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        assert write_master_fifo(fifo, "c")
+        assert os.read(reader, 1) == b"c"
+    finally:
+        os.close(reader)
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+import tenacity
+
+from pikesquares.domain.process_compose import PCAPIUnavailableError
+from pikesquares.exceptions import ServiceUnavailableError
+from pikesquares.services.retry import (
+    PROCESS_COMPOSE_PING_POLICY,
+    RetryPolicy,
+    deadline_budget,
+    remaining_budget,
+    retry,
+    retry_call,
+)
+
+POLICY = RetryPolicy(
+    name="test",
+    initial=0.01,
+    maximum=0.05,
+    deadline=1.0,
+    retry_on=(OSError, ServiceUnavailableError),
+    fail_fast=(FileNotFoundError,),
+)
+
+
+def flaky(failures: int, exc: BaseException):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc
+        return len(calls)
+
+    return fn, calls
+
+
+async def test_retries_until_success():
+    fn, calls = flaky(3, ConnectionResetError())
+    assert await retry_call(POLICY, fn) == 4
+    assert len(calls) == 4
+
+
+async def test_fail_fast_is_not_retried():
+    fn, calls = flaky(3, FileNotFoundError())
+    with pytest.raises(FileNotFoundError):
+        await retry_call(POLICY, fn)
+    assert len(calls) == 1
+
+
+async def test_max_attempts():
+    fn, calls = flaky(10, ConnectionResetError())
+    with pytest.raises(tenacity.RetryError):
+        await retry_call(POLICY.model_copy(update={"max_attempts": 2}), fn)
+    assert len(calls) == 2
+
+
+async def test_retry_until_result():
+    fn, calls = flaky(0, None)
+    assert await retry_call(POLICY, fn, until=lambda n: n >= 3) == 3
+
+
+async def test_nested_retries_share_the_outer_budget():
+    fn, calls = flaky(1000, ServiceUnavailableError())
+    inner = retry(POLICY.model_copy(update={"deadline": 10.0}))(fn)
+
+    started = time.monotonic()
+    with deadline_budget(0.2):
+        with pytest.raises(tenacity.RetryError):
+            await inner()
+    assert time.monotonic() - started < 0.5
+
+
+async def test_process_compose_ping_retries_api_unavailable():
+    # what ProcessCompose.ping_api raises while a process is still starting
+    fn, calls = flaky(2, PCAPIUnavailableError())
+    policy = PROCESS_COMPOSE_PING_POLICY.model_copy(update={"initial": 0.01, "deadline": 1.0})
+    assert await retry_call(policy, fn) == 3
+
+    fn, calls = flaky(1000, PCAPIUnavailableError())
+    with pytest.raises(tenacity.RetryError):
+        await retry_call(policy.model_copy(update={"deadline": 0.1}), fn)
+    assert len(calls) > 1
+
+
+def test_deadline_budget_never_extends_outer():
+    assert remaining_budget() is None
+    with deadline_budget(1.0):
+        with deadline_budget(60):
+            assert remaining_budget() <= 1.0
+    assert remaining_budget() is None
+
+
+def test_backoff_is_bounded():
+    delays = [POLICY.backoff(attempt) for attempt in range(1, 20)]
+    assert delays[0] >= 0.01
+    assert max(delays) <= 0.05 * (1 + POLICY.jitter)
@@ -0,0 +1,76 @@
+from pikesquares.services.data import RouterStats
+from pikesquares.services.router_analytics import RouterAnalytics, analyze, imbalance
+from pikesquares.services.stats import FleetStats
+
+from .test_openmetrics import NODE, ROUTER_STATS
+
+
+def router_stats(hits: int, nodes: list[dict], key: str = "app1.pikesquares.dev") -> RouterStats:
+    subscription = {"key": key, "hash": 1, "hits": hits, "sni_enabled": 0, "nodes": nodes}
+    return RouterStats.model_validate(ROUTER_STATS | {"subscriptions": [subscription]})
+
+
+def node(name: str, requests: int, load: int = 0, failcnt: int = 0, death_mark: int = 0) -> dict:
+    return NODE | {"name": name, "requests": requests, "load": load, "failcnt": failcnt, "death_mark": death_mark}
+
+
+def test_imbalance():
+    assert imbalance([4, 0, 0, 0]) == 4.0
+    assert imbalance([2, 2]) == 1.0
+    assert imbalance([3]) is None
+    assert imbalance([0, 0]) is None
+
+
+def test_analyze_rates_and_failures():
+    previous = router_stats(100, [node("a", 50), node("b", 50, failcnt=1)])
+    current = router_stats(300, [node("a", 230, load=6), node("b", 70, load=2, failcnt=3)])
+
+    report = analyze("router1", current, previous, interval=2.0)
+
+    key = report.keys[0]
+    assert key.hits_rate == 100.0
+    assert key.requests_rate == 100.0
+    assert key.imbalance == 1.5
+    a, b = key.nodes
+    assert a.requests_rate == 90.0 and not a.failing
+    assert b.failures == 2 and b.failing
+    assert report.failing_nodes() == [("app1.pikesquares.dev", b)]
+
+
+def test_analyze_without_load_uses_request_spread():
+    previous = router_stats(0, [node("a", 0), node("b", 0)])
+    current = router_stats(10, [node("a", 10), node("b", 0)])
+    report = analyze("router1", current, previous, interval=1.0)
+    assert report.keys[0].imbalance == 2.0
+    assert report.skewed_keys() == report.keys
+
+
+def test_analyze_counter_reset_and_death_mark():
+    previous = router_stats(500, [node("a", 500)])
+    current = router_stats(20, [node("a", 20, death_mark=1)])
+    key = analyze("router1", current, previous, interval=1.0).keys[0]
+    assert key.hits_rate == 20.0
+    assert key.nodes[0].failing
+
+
+def test_router_analytics_hot_keys():
+    analytics = RouterAnalytics()
+    fleet = FleetStats(
+        http_routers={"router1": RouterStats.model_validate(ROUTER_STATS | {"subscriptions": []})},
+    )
+
+    def subscription(key, hits):
+        return {"key": key, "hash": 1, "hits": hits, "sni_enabled": 0, "nodes": [node("a", hits)]}
+
+    first = RouterStats.model_validate(ROUTER_STATS | {"subscriptions": [subscription("cold", 0), subscription("hot", 0)]})
+    second = RouterStats.model_validate(ROUTER_STATS | {"subscriptions": [subscription("cold", 5), subscription("hot", 50)]})
+    first_report = analytics.update("router1", first, timestamp=10.0)
+    assert first_report.keys[0].hits_rate == 0.0
+    report = analytics.update("router1", second, timestamp=15.0)
+
+    assert [k.key for k in report.hot_keys(1)] == ["hot"]
+    assert report.hot_keys()[0].hits_rate == 10.0
+
+    fleet.http_routers = {}
+    assert analytics.update_fleet(fleet) == {}
+    assert "router1" not in analytics.snapshots
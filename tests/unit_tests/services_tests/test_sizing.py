@@ -0,0 +1,87 @@
+from pikesquares.services.data import AppStats
+from pikesquares.services.sizing import (
+    MiB,
+    AppProfile,
+    HostResources,
+    SizingPolicy,
+    initial_sizing,
+    listen_backlog_for,
+    size_apps,
+    threads_for,
+)
+
+WORKER = {
+    "id": 1, "pid": 101, "accepting": 1, "requests": 100, "delta_requests": 0,
+    "exceptions": 0, "harakiri_count": 0, "signals": 0, "signal_queue": 0,
+    "status": "idle", "rss": 64 * MiB, "vsz": 0, "running_time": 1_000_000, "last_spawn": 0,
+    "respawn_count": 1, "tx": 0, "avg_rt": 20_000, "apps": [],
+}
+APP_STATS = {
+    "version": "2.0.28", "listen_queue": 0, "listen_queue_errors": 0,
+    "signal_queue": 0, "load": 0, "pid": 100, "uid": 0, "gid": 0, "cwd": "/",
+    "locks": [], "sockets": [],
+    "workers": [
+        WORKER,
+        WORKER | {"id": 2, "requests": 300, "avg_rt": 40_000, "rss": 96 * MiB},
+        WORKER | {"id": 3, "status": "cheap", "requests": 0, "rss": 0},
+    ],
+}
+HOST = HostResources(cpu_count=4, memory_available=8192 * MiB, somaxconn=4096)
+
+
+def test_profile_from_stats():
+    profile = AppProfile.from_stats("app1", AppStats.model_validate(APP_STATS))
+    assert profile.workers == 2
+    assert profile.rss_per_worker == 80 * MiB
+    # weighted by requests served
+    assert profile.avg_rt == 35_000
+    assert profile.busy_time == 2_000_000
+
+    assert AppProfile.from_stats("app2", None) == AppProfile(service_id="app2")
+
+
+def test_threads_and_listen_backlog():
+    policy = SizingPolicy()
+    assert threads_for(None, policy) == 1
+    assert threads_for(5_000, policy) == 1
+    assert threads_for(20_000, policy) == 2
+    assert threads_for(10_000_000, policy) == 8
+
+    assert listen_backlog_for(2, 1, None, policy, 4096) == 100
+    # 4 worker threads at 1ms drain 4000 requests a second
+    assert listen_backlog_for(2, 2, 1_000, policy, 4096) == 4000
+    assert listen_backlog_for(2, 2, 100, policy, 4096) == 4096
+
+
+def test_size_apps_splits_by_busy_time():
+    sizing = size_apps(
+        [
+            AppProfile(service_id="busy", busy_time=3_000_000),
+            AppProfile(service_id="quiet", busy_time=1_000_000),
+            AppProfile(service_id="new"),
+        ],
+        HOST,
+    )
+    assert sum(s.workers for s in sizing.values()) == 8
+    assert sizing["busy"].workers > sizing["quiet"].workers > sizing["new"].workers >= 1
+
+
+def test_size_apps_idle_apps_share_evenly():
+    sizing = size_apps([AppProfile(service_id=f"app{i}") for i in range(4)], HOST)
+    assert [s.workers for s in sizing.values()] == [2, 2, 2, 2]
+
+
+def test_size_apps_respects_memory():
+    host = HostResources(cpu_count=16, memory_available=1024 * MiB)
+    sizing = size_apps([AppProfile(service_id="app1", rss_per_worker=256 * MiB, busy_time=1)], host)
+    # 0.75 of 1GiB fits three 256MiB workers
+    assert sizing["app1"].workers == 3
+
+    # every app keeps one worker even past the budget
+    sizing = size_apps([AppProfile(service_id=f"app{i}", rss_per_worker=1024 * MiB) for i in range(3)], host)
+    assert [s.workers for s in sizing.values()] == [1, 1, 1]
+
+
+def test_initial_sizing_is_conservative():
+    sizing = initial_sizing("app1", HostResources(cpu_count=64, memory_available=65536 * MiB, somaxconn=64))
+    assert (sizing.workers, sizing.threads, sizing.listen_backlog) == (1, 1, 64)
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+from pikesquares.services.data import AppStats
+from pikesquares.services.stats import StatsCache
+
+from .test_stats_collector import APP_STATS
+
+
+async def start_counting_server(path, delay: float = 0.0):
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(1)
+        await asyncio.sleep(delay)
+        writer.write(json.dumps(APP_STATS).encode())
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=str(path))
+    return server, connections
+
+
+async def test_cache_hit_within_ttl(tmp_path):
+    stats_address = tmp_path / "app-stats.sock"
+    server, connections = await start_counting_server(stats_address)
+    cache = StatsCache(ttl=60)
+    async with server:
+        first = await cache.get(stats_address, AppStats)
+        second = await cache.get(stats_address, AppStats)
+        assert await cache.get(stats_address) == APP_STATS
+
+    assert first is second
+    assert len(connections) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+async def test_concurrent_reads_share_one_connection(tmp_path):
+    stats_address = tmp_path / "app-stats.sock"
+    server, connections = await start_counting_server(stats_address, delay=0.1)
+    cache = StatsCache(ttl=60)
+    async with server:
+        results = await asyncio.gather(*(cache.get_payload(stats_address) for _ in range(10)))
+
+    assert len(connections) == 1
+    assert all(payload is results[0] for payload in results)
+    assert not cache.inflight
+
+
+async def test_expired_and_invalidated_entries_are_reread(tmp_path):
+    stats_address = tmp_path / "app1-stats.sock"
+    server, connections = await start_counting_server(stats_address)
+    cache = StatsCache(ttl=0.05)
+    async with server:
+        await cache.get_payload(stats_address)
+        await asyncio.sleep(0.1)
+        await cache.get_payload(stats_address)
+        assert len(connections) == 2
+
+        cache.ttl = 60
+        cache.invalidate(stats_address)
+        await cache.get_payload(stats_address)
+        await cache.get_payload(stats_address)
+        assert len(connections) == 3
+
+        cache.invalidate_service("app1")
+        assert cache.lookup(stats_address) is None
+        await cache.get_payload(stats_address)
+
+    assert len(connections) == 4
+
+
+async def test_failed_reads_are_not_cached(tmp_path):
+    cache = StatsCache(ttl=60)
+    for _ in range(2):
+        with pytest.raises(FileNotFoundError):
+            await cache.get_payload(tmp_path / "missing-stats.sock")
+    assert not cache.entries
+    assert cache.misses == 2
+
+
+async def test_invalidate_service_matches_the_exact_service(tmp_path):
+    stats_address = tmp_path / "myapp-1-stats.sock"
+    server, connections = await start_counting_server(stats_address)
+    cache = StatsCache(ttl=60)
+    async with server:
+        await cache.get_payload(stats_address)
+        cache.invalidate_service("app-1")
+        assert cache.lookup(stats_address) is not None
+        cache.invalidate_service("myapp-1")
+        assert cache.lookup(stats_address) is None
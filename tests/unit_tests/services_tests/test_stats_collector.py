@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pydantic
+import pytest
+
+from pikesquares.services.data import AppStats, RouterStats
+from pikesquares.services.stats import (
+    StatsCollector,
+    decode_stats,
+    read_stats_socket,
+    stats_adapter,
+)
+
+APP_STATS = {
+    "version": "2.0.28",
+    "listen_queue": 0,
+    "listen_queue_errors": 0,
+    "signal_queue": 0,
+    "load": 0,
+    "pid": 100,
+    "uid": 0,
+    "gid": 0,
+    "cwd": "/",
+    "locks": [],
+    "sockets": [],
+    "workers": [],
+}
+
+
+@dataclass
+class FakeService:
+    service_id: str
+    stats_address: Path
+    handler_name: str = "WsgiApp"
+
+    @property
+    def master_fifo_file(self) -> Path:
+        return self.stats_address.with_name(f"{self.service_id}-master-fifo")
+
+
+async def start_stats_server(path: Path, payload: dict, delay: float = 0.0):
+    async def handle(reader, writer):
+        await asyncio.sleep(delay)
+        writer.write(json.dumps(payload).encode())
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_unix_server(handle, path=str(path))
+
+
+async def test_read_stats_socket(tmp_path):
+    stats_address = tmp_path / "app-stats.sock"
+    server = await start_stats_server(stats_address, APP_STATS)
+    async with server:
+        assert await read_stats_socket(stats_address) == APP_STATS
+
+
+async def test_read_stats_socket_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        await read_stats_socket(tmp_path / "missing-stats.sock")
+
+
+async def test_collect_reads_sockets_concurrently(tmp_path):
+    servers = []
+    fleet = []
+    for i in range(5):
+        stats_address = tmp_path / f"app{i}-stats.sock"
+        servers.append(await start_stats_server(stats_address, APP_STATS, delay=0.2))
+        fleet.append(FakeService(service_id=f"app{i}", stats_address=stats_address))
+
+    started = time.monotonic()
+    snapshot = await StatsCollector(timeout=1.0).collect(fleet)
+    elapsed = time.monotonic() - started
+
+    for server in servers:
+        server.close()
+
+    assert elapsed < 0.6
+    assert sorted(snapshot.wsgi_apps) == [f"app{i}" for i in range(5)]
+    assert snapshot.unavailable == []
+    assert snapshot.is_running("app0")
+
+
+async def test_collect_marks_dead_and_slow_sockets_unavailable(tmp_path):
+    live_address = tmp_path / "live-stats.sock"
+    slow_address = tmp_path / "slow-stats.sock"
+    live = await start_stats_server(live_address, APP_STATS)
+    slow = await start_stats_server(slow_address, APP_STATS, delay=2)
+
+    fleet = [
+        FakeService(service_id="live", stats_address=live_address),
+        FakeService(service_id="slow", stats_address=slow_address),
+        FakeService(service_id="dead", stats_address=tmp_path / "dead-stats.sock"),
+    ]
+    started = time.monotonic()
+    snapshot = await StatsCollector(timeout=0.2).collect(fleet)
+    elapsed = time.monotonic() - started
+
+    live.close()
+    slow.close()
+
+    assert elapsed < 1
+    assert list(snapshot.wsgi_apps) == ["live"]
+    assert sorted(snapshot.unavailable) == ["dead", "slow"]
+    assert not snapshot.is_running("dead")
+
+
+async def test_collect_records_invalid_stats(tmp_path):
+    stats_address = tmp_path / "router-stats.sock"
+    server = await start_stats_server(stats_address, {"unexpected": True})
+    async with server:
+        snapshot = await StatsCollector().collect(
+            [FakeService("router", stats_address, handler_name="HttpRouter")]
+        )
+    assert "router" in snapshot.invalid
+    assert not snapshot.is_running("router")
+
+
+async def test_read_stats_socket_large_payload_with_model(tmp_path):
+    worker = {
+        "id": 1, "pid": 101, "accepting": 1, "requests": 10, "delta_requests": 0,
+        "exceptions": 0, "harakiri_count": 0, "signals": 0, "signal_queue": 0,
+        "status": "idle", "rss": 0, "vsz": 0, "running_time": 0, "last_spawn": 0,
+        "respawn_count": 1, "tx": 0, "avg_rt": 0, "apps": [],
+    }
+    payload = {**APP_STATS, "workers": [{**worker, "id": i} for i in range(2000)]}
+    stats_address = tmp_path / "big-stats.sock"
+    server = await start_stats_server(stats_address, payload)
+    async with server:
+        stats = await read_stats_socket(stats_address, model=AppStats)
+    assert isinstance(stats, AppStats)
+    assert len(stats.workers) == 2000
+
+
+def test_decode_stats():
+    payload = bytearray(json.dumps(APP_STATS).encode())
+    assert decode_stats(payload) == APP_STATS
+    assert decode_stats(payload, AppStats) == AppStats.model_validate(APP_STATS)
+    assert stats_adapter(AppStats) is stats_adapter(AppStats)
+    with pytest.raises(pydantic.ValidationError):
+        decode_stats(payload, RouterStats)